@@ -0,0 +1,37 @@
+"""Derive poster/preview/duration/dimensions for videos registered before
+media processing existed (or whose processing failed).
+
+Safe to re-run: only videos without `media_processed_at` are processed.
+
+    python backfill_video_media.py [--limit N] [--dry-run]
+"""
+import sys
+from database import get_db
+from services.video_media import process_video_media
+
+
+def backfill(db, limit: int = 0, dry_run: bool = False) -> int:
+    cursor = db.user_videos.find({"media_processed_at": {"$exists": False}}, {"_id": 1}).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    ids = [str(doc["_id"]) for doc in cursor]
+    if not dry_run:
+        for i, video_id in enumerate(ids, 1):
+            process_video_media(video_id)
+            if i % 50 == 0:
+                print(f"Processed {i}/{len(ids)} videos.")
+    return len(ids)
+
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    import routes.upload  # noqa: F401  configures Cloudinary credentials
+
+    limit = int(sys.argv[sys.argv.index("--limit") + 1]) if "--limit" in sys.argv else 0
+    dry_run = "--dry-run" in sys.argv
+    count = backfill(db, limit=limit, dry_run=dry_run)
+    print(f"{'Would process' if dry_run else 'Processed'} {count} videos.")
@@ -0,0 +1,67 @@
+"""Runtime benchmark for the friend-of-friend suggestion engine.
+
+Builds a synthetic power-law friend graph in memory and times
+`compute_suggestions` over it. No database is needed.
+
+    python -m benchmarks.bench_suggestions --users 100000 --avg-degree 20
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from services.suggestions import compute_suggestions, TOP_K
+
+
+def build_graph(n_users: int, avg_degree: int, seed: int) -> dict:
+    """Preferential-attachment style graph: a few hubs, a long tail of small circles."""
+    rng = random.Random(seed)
+    ids = [f"{i:024x}" for i in range(n_users)]
+    adjacency = defaultdict(set)
+    edges_per_user = max(1, avg_degree // 2)
+    endpoints = []  # each user appears once per edge, so popular users get picked more
+    for i, uid in enumerate(ids):
+        for _ in range(min(edges_per_user, i)):
+            # Mix uniform and preferential picks so hubs emerge without starving the tail
+            other = rng.choice(endpoints) if endpoints and rng.random() < 0.7 else ids[rng.randrange(i)]
+            if other != uid and other not in adjacency[uid]:
+                adjacency[uid].add(other)
+                adjacency[other].add(uid)
+                endpoints.append(uid)
+                endpoints.append(other)
+    return {uid: list(friends) for uid, friends in adjacency.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--avg-degree", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=0, help="only time this many random users (0 = all)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    adjacency = build_graph(args.users, args.avg_degree, args.seed)
+    build_s = time.perf_counter() - t0
+    degrees = sorted(len(v) for v in adjacency.values())
+    print(f"graph: {len(adjacency)} users, {sum(degrees) // 2} edges, "
+          f"median degree {degrees[len(degrees) // 2]}, max degree {degrees[-1]} (built in {build_s:.1f}s)")
+
+    users = list(adjacency)
+    if args.sample:
+        users = random.Random(args.seed).sample(users, min(args.sample, len(users)))
+
+    t0 = time.perf_counter()
+    total = 0
+    for uid in users:
+        total += len(compute_suggestions(adjacency, uid, k=TOP_K))
+    elapsed = time.perf_counter() - t0
+
+    print(f"computed top-{TOP_K} for {len(users)} users in {elapsed:.2f}s "
+          f"({len(users) / elapsed:,.0f} users/s, {elapsed / len(users) * 1e6:.0f} us/user, "
+          f"{total / len(users):.1f} suggestions/user)")
+    if args.sample:
+        print(f"extrapolated full run over {len(adjacency)} users: {elapsed / len(users) * len(adjacency):.1f}s")
+
+
+if __name__ == "__main__":
+    main()
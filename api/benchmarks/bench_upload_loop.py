@@ -0,0 +1,83 @@
+"""Event-loop stall benchmark for server-side video uploads.
+
+Simulates a slow Cloudinary link (blocking sleeps proportional to bytes sent)
+and measures the longest gap seen by a 5 ms ticker coroutine while a large
+spooled file is uploaded, comparing the old inline `cloudinary.uploader.upload`
+call with `services.video_upload.upload_file_in_chunks`.
+
+    python -m benchmarks.bench_upload_loop --size-mb 256 --mbps 50
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from unittest import mock
+import cloudinary.uploader
+from services import video_upload
+
+TICK = 0.005
+
+
+async def ticker(stop: asyncio.Event, gaps: list):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(TICK)
+        now = time.perf_counter()
+        gaps.append(now - last - TICK)
+        last = now
+
+
+async def measure(upload_coro_factory):
+    stop = asyncio.Event()
+    gaps = []
+    tick_task = asyncio.create_task(ticker(stop, gaps))
+    await asyncio.sleep(0.05)
+    t0 = time.perf_counter()
+    await upload_coro_factory()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await tick_task
+    gaps.sort()
+    return elapsed, gaps[-1], gaps[int(len(gaps) * 0.99)] if gaps else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--mbps", type=float, default=50.0, help="simulated upstream bandwidth in MB/s")
+    args = parser.parse_args()
+
+    def fake_transfer(nbytes):
+        time.sleep(nbytes / (args.mbps * 1024 * 1024))
+
+    def fake_upload(fileobj, **options):
+        # Old path: the SDK reads and sends the whole file in one blocking call
+        fake_transfer(len(fileobj.read()))
+        return {"secure_url": "https://res.cloudinary.com/demo/video/upload/v1/x.mp4"}
+
+    def fake_upload_large_part(file, **options):
+        fake_transfer(len(file[1]))
+        return {"public_id": "x", "secure_url": "https://res.cloudinary.com/demo/video/upload/v1/x.mp4"}
+
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as f:
+        block = b"\0" * (1024 * 1024)
+        for _ in range(args.size_mb):
+            f.write(block)
+
+        async def inline():
+            f.seek(0)
+            cloudinary.uploader.upload(f, folder=video_upload.VIDEO_FOLDER, resource_type="video")
+
+        async def chunked():
+            await video_upload.upload_file_in_chunks(f, "bench.mp4")
+
+        with mock.patch.object(cloudinary.uploader, "upload", fake_upload), \
+                mock.patch.object(cloudinary.uploader, "upload_large_part", fake_upload_large_part):
+            for name, factory in (("inline upload()", inline), ("chunked worker thread", chunked)):
+                elapsed, worst, p99 = asyncio.run(measure(factory))
+                print(f"{name:24s} {args.size_mb} MB in {elapsed:.2f}s  "
+                      f"max loop stall {worst * 1000:.1f} ms  p99 stall {p99 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
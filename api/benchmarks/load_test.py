@@ -0,0 +1,394 @@
+"""Load test for the hot API endpoints, with results kept per commit.
+
+Seeds a synthetic dataset (users with a power-law friend graph, posts with
+Zipf-distributed likes and comments, ranked videos) into a throwaway
+database, then drives the FastAPI app in-process with concurrent clients
+over the feed, like toggle, comments, login and video feeds. Reports
+latency percentiles and MongoDB commands per request for each endpoint.
+
+By default the database is mongomock, so it runs anywhere; commands are
+counted by wrapping its collection methods. With --mongo-uri it uses a real
+mongod (declared indexes are built first) and commands come from the query
+profiler's listener, so the counts match production. The target database
+(--db) is dropped and reseeded on every run.
+
+Each run is written to benchmarks/results/<commit>.json and compared with
+the most recent earlier run of the same configuration; --compare picks the
+baseline explicitly and --check exits 1 on a regression.
+
+    python -m benchmarks.load_test --users 500 --clients 16 --requests 1000
+    python -m benchmarks.load_test --mongo-uri mongodb://localhost:27017 --check
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from bson import ObjectId
+from benchmarks.bench_suggestions import build_graph
+from services.ranking import score_video
+
+RESULTS_DIR = Path(__file__).parent / "results"
+PASSWORD = "load-test-password"
+BATCH_SIZE = 5000
+# p95 this much slower (relative) than the baseline counts as a regression
+DEFAULT_THRESHOLD = 0.25
+
+# (route, weight): the route is the request context name, so server-side
+# query counts and client-side latencies line up
+SCENARIOS = [
+    ("GET /api/posts/", 35),
+    ("POST /api/posts/{post_id}/like", 20),
+    ("GET /api/posts/{post_id}/comments", 15),
+    ("POST /api/posts/{post_id}/comments", 5),
+    ("GET /api/videos/", 10),
+    ("GET /api/videos/for-you", 10),
+    ("POST /api/auth/login", 5),
+]
+
+
+def _zipf_index(rng: random.Random, n: int) -> int:
+    """Rank in [0, n) with P(rank < k) = log(k + 1) / log(n + 1): a few hot items, a long tail."""
+    return min(n - 1, int((n + 1) ** rng.random()) - 1)
+
+
+def seed_dataset(db, n_users: int, avg_degree: int, posts_per_user: int, seed: int) -> dict:
+    """Drop and refill the collections the scenarios touch. Returns the ids the clients pick from."""
+    from routes.auth import hash_password
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for name in ("users", "friends", "posts", "likes", "comments", "user_videos",
+                 "video_likes", "video_comments", "notifications", "moderation_events"):
+        db[name].drop()
+
+    password_hash = hash_password(PASSWORD)  # one bcrypt hash shared by every user
+    adjacency = build_graph(n_users, avg_degree, seed)
+    user_ids = [f"{i:024x}" for i in range(n_users)]
+    _insert(db.users, ({
+        "_id": ObjectId(uid),
+        "email": f"user{i}@loadtest.local",
+        "full_name": f"Load Test User {i}",
+        "password_hash": password_hash,
+        "role": "user",
+        "is_verified": True,
+        "profile_pic": f"https://cdn.loadtest.local/avatars/{i}.jpg",
+    } for i, uid in enumerate(user_ids)))
+
+    _insert(db.friends, ({
+        "sender_id": uid,
+        "receiver_id": other,
+        "status": "accepted",
+        "created_at": now,
+        "updated_at": now,
+    } for uid, friends in adjacency.items() for other in friends if uid < other))
+
+    # A few prolific authors, a long tail of occasional ones
+    posts = []
+    for _ in range(n_users * posts_per_user):
+        author = _zipf_index(rng, n_users) if rng.random() < 0.3 else rng.randrange(n_users)
+        posts.append({
+            "_id": ObjectId(),
+            "user_id": user_ids[author],
+            "author_name": f"Load Test User {author}",
+            "content": f"Synthetic post {len(posts)}",
+            "image_url": f"https://cdn.loadtest.local/posts/{len(posts)}.jpg" if rng.random() < 0.4 else None,
+            "status": "approved",
+            "moderation_status": "approved",
+            "moderation_source": "AI",
+            "created_at": (now - timedelta(seconds=rng.randrange(90 * 86400))).isoformat(),
+        })
+    _insert(db.posts, posts)
+    post_ids = [str(p["_id"]) for p in posts]
+
+    likes = set()
+    for _ in range(len(posts) * 4):
+        likes.add((post_ids[_zipf_index(rng, len(posts))], user_ids[rng.randrange(n_users)]))
+    _insert(db.likes, ({"post_id": pid, "user_id": uid, "created_at": now} for pid, uid in likes))
+
+    _insert(db.comments, ({
+        "post_id": post_ids[_zipf_index(rng, len(posts))],
+        "user_id": user_ids[rng.randrange(n_users)],
+        "content": f"Synthetic comment {i}",
+        "created_at": now - timedelta(seconds=rng.randrange(30 * 86400)),
+    } for i in range(len(posts))))
+
+    videos = []
+    for i in range(max(1, n_users // 2)):
+        author = _zipf_index(rng, n_users) if rng.random() < 0.3 else rng.randrange(n_users)
+        views = int(rng.paretovariate(1.2)) - 1
+        video = {
+            "user_id": user_ids[author],
+            "author_name": f"Load Test User {author}",
+            "video_url": f"https://cdn.loadtest.local/videos/{i}.mp4",
+            "poster_url": f"https://cdn.loadtest.local/videos/{i}.jpg",
+            "caption": f"Synthetic video {i}",
+            "status": "approved",
+            "created_at": now - timedelta(seconds=rng.randrange(90 * 86400)),
+            "view_count": views,
+            "like_count": int(views * rng.random() * 0.1),
+            "comment_count": int(views * rng.random() * 0.02),
+        }
+        video["rank_score"] = score_video(video)
+        videos.append(video)
+    _insert(db.user_videos, videos)
+
+    return {"user_ids": user_ids, "post_ids": post_ids, "emails": [f"user{i}@loadtest.local" for i in range(n_users)],
+            "counts": {"users": n_users, "friendships": sum(len(f) for f in adjacency.values()) // 2,
+                       "posts": len(posts), "likes": len(likes), "comments": len(posts), "videos": len(videos)}}
+
+
+def _insert(collection, docs):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def build_request(route: str, rng: random.Random, data: dict) -> tuple[str, str, dict | None]:
+    """(method, url, json body) for one request of `route`, with Zipf-popular posts."""
+    user_id = data["user_ids"][rng.randrange(len(data["user_ids"]))]
+    post_id = data["post_ids"][_zipf_index(rng, len(data["post_ids"]))]
+    if route == "GET /api/posts/":
+        return "GET", f"/api/posts/?user_id={user_id}&limit=15", None
+    if route == "POST /api/posts/{post_id}/like":
+        return "POST", f"/api/posts/{post_id}/like", {"user_id": user_id}
+    if route == "GET /api/posts/{post_id}/comments":
+        return "GET", f"/api/posts/{post_id}/comments", None
+    if route == "POST /api/posts/{post_id}/comments":
+        return "POST", f"/api/posts/{post_id}/comments", {"comment": {"content": "load test comment"}, "user_id": user_id}
+    if route == "GET /api/videos/":
+        return "GET", f"/api/videos/?limit=10&user_id={user_id}", None
+    if route == "GET /api/videos/for-you":
+        return "GET", f"/api/videos/for-you?limit=10&user_id={user_id}", None
+    if route == "POST /api/auth/login":
+        email = data["emails"][rng.randrange(len(data["emails"]))]
+        return "POST", "/api/auth/login", {"email": email, "password": PASSWORD}
+    raise ValueError(f"Unknown scenario {route}")
+
+
+def connect(mongo_uri: str | None, db_name: str):
+    """Point database.get_db() at the load-test database. Returns (db, backend name)."""
+    import database
+    from config import DB_NAME
+    if mongo_uri is None:
+        import mongomock
+        from services.query_profiler import instrument_mongomock
+        instrument_mongomock()
+        client, backend = mongomock.MongoClient(), "mongomock"
+    else:
+        from pymongo import MongoClient
+        from services.query_profiler import QueryProfiler
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000, event_listeners=[QueryProfiler()])
+        client.admin.command("ping")
+        backend = "mongod " + client.server_info().get("version", "")
+    if db_name == DB_NAME:
+        raise SystemExit(f"Refusing to reseed the app database {DB_NAME!r}; pass a different --db")
+    database._client = client
+    database.DB_NAME = db_name
+    return client[db_name], backend
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least pct% of samples at or below it."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+async def run_load(app, data: dict, n_clients: int, n_requests: int, warmup: int, seed: int) -> tuple[dict, float]:
+    import httpx
+    from services.request_context import on_request_end
+
+    samples = defaultdict(lambda: {"latencies": [], "errors": 0, "queries": []})
+    recording = False
+
+    @on_request_end
+    def _count_queries(ctx):
+        if recording:
+            samples[ctx.name]["queries"].append(len(ctx.commands))
+
+    routes, weights = zip(*SCENARIOS)
+    remaining = [warmup]
+
+    async def client_loop(client, rng):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            route = rng.choices(routes, weights)[0]
+            method, url, body = build_request(route, rng, data)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if recording:
+                samples[route]["latencies"].append(time.perf_counter() - started)
+                samples[route]["errors"] += int(not ok)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+        rngs = [random.Random(seed * 1000 + i) for i in range(n_clients)]
+        await asyncio.gather(*(client_loop(client, rng) for rng in rngs))
+        recording = True
+        remaining[0] = n_requests
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, rng) for rng in rngs))
+        elapsed = time.perf_counter() - started
+    return samples, elapsed
+
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    endpoints = {}
+    for route, _ in SCENARIOS:
+        s = samples.get(route)
+        if not s or not s["latencies"]:
+            continue
+        latencies = sorted(s["latencies"])
+        queries = s["queries"]
+        endpoints[route] = {
+            "requests": len(latencies),
+            "errors": s["errors"],
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+            "max_queries": max(queries) if queries else None,
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"endpoints": endpoints, "requests": total, "seconds": round(elapsed, 2),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0}
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def save_results(result: dict, output: str | None) -> Path:
+    path = Path(output) if output else RESULTS_DIR / f"{result['commit'] or 'unknown'}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2) + "\n")
+    return path
+
+
+def find_baseline(result: dict, compare: str | None) -> dict | None:
+    """The --compare run (a commit or a path), else the newest earlier run with the same config."""
+    if compare:
+        path = Path(compare)
+        if not path.exists():
+            path = RESULTS_DIR / f"{compare}.json"
+        if not path.exists():
+            raise SystemExit(f"No results found for {compare!r}")
+        return json.loads(path.read_text())
+    candidates = []
+    for path in RESULTS_DIR.glob("*.json"):
+        try:
+            previous = json.loads(path.read_text())
+        except ValueError:
+            continue
+        if previous.get("config") == result["config"] and previous.get("commit") != result["commit"]:
+            candidates.append(previous)
+    return max(candidates, key=lambda r: r["recorded_at"], default=None)
+
+
+def compare_results(baseline: dict, result: dict, threshold: float) -> list[str]:
+    """Print per-endpoint deltas; return the regressions (p95 over threshold, or >5% more queries)."""
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit') or 'baseline'} ({baseline.get('recorded_at')}):")
+    for route, now in result["endpoints"].items():
+        before = baseline["endpoints"].get(route)
+        if not before:
+            continue
+        change = (now["p95_ms"] - before["p95_ms"]) / before["p95_ms"] if before["p95_ms"] else 0.0
+        line = f"  {route:<38} p95 {before['p95_ms']:>8.2f} -> {now['p95_ms']:>8.2f} ms ({change:+.0%})"
+        if now["queries_per_request"] is not None and before.get("queries_per_request") is not None:
+            line += f"   queries {before['queries_per_request']:.2f} -> {now['queries_per_request']:.2f}"
+            # Like toggles and hot-post picks shift the mean a little between runs
+            if now["queries_per_request"] > before["queries_per_request"] * 1.05 + 0.01:
+                regressions.append(f"{route}: queries per request {before['queries_per_request']} -> {now['queries_per_request']}")
+        if change > threshold:
+            regressions.append(f"{route}: p95 {before['p95_ms']} -> {now['p95_ms']} ms")
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--avg-degree", type=int, default=20)
+    parser.add_argument("--posts-per-user", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests, split across clients")
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-uri", help="run against this mongod instead of mongomock")
+    parser.add_argument("--db", default="mindrise_loadtest", help="database to drop and seed")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline commit or results file (default: latest matching run)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--check", action="store_true", help="exit 1 if any endpoint regressed")
+    args = parser.parse_args()
+
+    db, backend = connect(args.mongo_uri, args.db)
+    import main as app_module
+
+    t0 = time.perf_counter()
+    if args.mongo_uri:
+        from services.schema import apply_indexes
+        apply_indexes(db)
+    data = seed_dataset(db, args.users, args.avg_degree, args.posts_per_user, args.seed)
+    print(f"seeded {', '.join(f'{n:,} {name}' for name, n in data['counts'].items())} "
+          f"into {backend} in {time.perf_counter() - t0:.1f}s")
+
+    samples, elapsed = asyncio.run(run_load(app_module.app, data, args.clients, args.requests, args.warmup, args.seed))
+    result = {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "recorded_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+        "config": {"backend": backend, "users": args.users, "avg_degree": args.avg_degree,
+                   "posts_per_user": args.posts_per_user, "clients": args.clients,
+                   "requests": args.requests, "seed": args.seed},
+        "dataset": data["counts"],
+        **summarize(samples, elapsed),
+    }
+
+    print(f"\n{result['requests']:,} requests from {args.clients} clients in {result['seconds']}s "
+          f"({result['throughput_rps']:,} req/s)")
+    print(f"  {'endpoint':<38} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8}  queries/req")
+    for route, e in result["endpoints"].items():
+        qpr = "-" if e["queries_per_request"] is None else f"{e['queries_per_request']:.2f} (max {e['max_queries']})"
+        print(f"  {route:<38} {e['requests']:>6} {e['errors']:>4} {e['p50_ms']:>8.2f} "
+              f"{e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f}  {qpr}")
+
+    baseline = find_baseline(result, args.compare)
+    path = save_results(result, args.output)
+    print(f"\nresults written to {path}")
+    regressions = compare_results(baseline, result, args.threshold) if baseline else []
+    if regressions:
+        print("\nregressions:\n  " + "\n  ".join(regressions))
+        if args.check:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
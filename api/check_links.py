@@ -0,0 +1,43 @@
+"""Incremental link-health sweep over video URLs (see services.link_health).
+
+    python check_links.py [--full] [--dry-run] [--verbose] [--threshold N] [--concurrency N]
+
+--full re-checks every URL regardless of when it was last checked.
+"""
+import sys
+from database import get_db
+from services.link_health import sweep, FAIL_THRESHOLD, CONCURRENCY
+
+
+def _arg(name: str, default: int) -> int:
+    return int(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+
+def print_result(r: dict):
+    status = "WORKING" if r["ok"] else f"BROKEN ({r['http_status'] or r['error']})"
+    print(f"{status}: {r['url']}")
+
+
+def main(dry_run: bool = False, verbose: bool = False):
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    summary = sweep(
+        db,
+        full="--full" in sys.argv,
+        dry_run=dry_run or "--dry-run" in sys.argv,
+        threshold=_arg("--threshold", FAIL_THRESHOLD),
+        concurrency=_arg("--concurrency", CONCURRENCY),
+        report=print_result if verbose or "--verbose" in sys.argv else None
+    )
+    print(f"Checked {summary['checked']} links in {summary['seconds']}s, {summary['failed']} failed.")
+    for collection, counts in summary["visibility"].items():
+        verb = "Would hide/restore" if dry_run or "--dry-run" in sys.argv else "Hidden/restored"
+        print(f"{collection}: {verb} {counts['hidden']}/{counts['restored']}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
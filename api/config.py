@@ -13,3 +13,32 @@ CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 SIGHTENGINE_API_USER = os.getenv("SIGHTENGINE_API_USER")
 SIGHTENGINE_API_SECRET = os.getenv("SIGHTENGINE_API_SECRET")
+
+# Generic upload storage: "local" (disk), "gridfs" or "s3" (any S3-compatible endpoint)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+UPLOAD_DIR = os.getenv("UPLOAD_DIR") or ("/tmp/uploads" if os.getenv("VERCEL") else "uploads")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("S3_SECRET_KEY")
+S3_REGION = os.getenv("S3_REGION")
+
+# Hosts whose https video URLs ffprobe/ffmpeg may fetch directly (services.video_media);
+# anything else is only processed if it is a file the app stored itself
+MEDIA_FETCH_HOSTS = {h.strip().lower() for h in os.getenv("MEDIA_FETCH_HOSTS", "").split(",") if h.strip()}
+
+# pymongo command profiler (services.query_profiler)
+QUERY_PROFILER = os.getenv("QUERY_PROFILER", "1") != "0"
+EXPLAIN_SAMPLE_RATE = float(os.getenv("EXPLAIN_SAMPLE_RATE", "0.01"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Response cache for public GET endpoints (services.response_cache): "memory", "mongo" or "off".
+# "memory" is per process: invalidation never reaches other workers, which serve stale
+# responses for up to the route's TTL (300 s for community stories). Set "mongo" for any
+# deployment with more than one worker or instance.
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "memory").lower()
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "1000"))
+
+# Bearer token required by GET /api/metrics (open when unset)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -9,23 +9,12 @@ _client: MongoClient | None = None
 
 def init_db(db):
     try:
-        # Create TTL index on notifications collection for 24-hour expiry
-        db.notifications.create_index("created_at", expireAfterSeconds=86400)
-        
-        # Create TTL index on otp_codes collection for 5-minute expiry
-        db.otp_codes.create_index("expires_at", expireAfterSeconds=0)
-        
-        # Performance Indexes for Feed
-        db.posts.create_index([("status", 1), ("created_at", -1)])
-        db.posts.create_index([("user_id", 1)])
-        db.user_videos.create_index([("status", 1), ("created_at", -1)])
-        db.user_videos.create_index([("user_id", 1)])
-        db.likes.create_index([("post_id", 1)])
-        db.comments.create_index([("post_id", 1)])
-
-        print("Initialized database indexes.")
+        # Indexes, validators and startup migrations are declared in services.schema;
+        # unique/TTL indexes are built before serving, the rest on a background thread
+        from services.schema import start_schema_check
+        start_schema_check(db)
     except Exception as e:
-        print(f"Warning: Could not initialize database indexes: {e}")
+        print(f"Warning: Could not start the schema check: {e}")
 
 def get_client() -> MongoClient:
     global _client
@@ -35,7 +24,8 @@ def get_client() -> MongoClient:
              print("Ensure your .env file has a valid MongoDB Atlas URI.")
         
         try:
-            _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+            from services.query_profiler import listeners
+            _client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000, event_listeners=listeners())
             # Verify connection
             _client.admin.command('ping')
             print("Successfully connected to MongoDB.")
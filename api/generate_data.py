@@ -0,0 +1,469 @@
+"""Generate a deterministic synthetic dataset at production scale.
+
+Creates users with a power-law friend graph, posts with media URLs,
+Zipf-distributed likes and comments, videos, journals, rooms with
+attendance and payments, and marketplace products, in the shapes the routes
+write them. Intended for a scratch database: benchmarks, index tuning and
+migration rehearsals.
+
+Work is split into fixed-size chunks, each generated from its own
+`random.Random(f"{seed}:{collection}:{chunk}")` and written with unordered
+`insert_many`, across --workers processes. Every `_id` is derived from the
+collection and the document's index, so the output depends only on the seed
+and the options (not on the worker count), and re-running after an
+interruption skips what is already there. Declared indexes are built after
+the load, which is faster than maintaining them during it.
+
+    python generate_data.py --db mindrise_synthetic --users 250000   # ~10M documents
+    python generate_data.py --db mindrise_synthetic --users 1000 --drop
+    python generate_data.py --users 250000 --dry-run                 # generation speed only
+"""
+import argparse
+import math
+import os
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timedelta
+from multiprocessing import Pool
+from bson import ObjectId
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from config import MONGO_URI, DB_NAME
+
+JOB_ID = "generate_data"
+CHUNK_SIZE = 20_000
+PASSWORD = "synthetic-password"
+MAX_FRIENDS_PER_USER = 5000
+MAX_ATTENDEES = 10_000
+# Zipf-Mandelbrot offset: keeps the head hot without one item taking most of the traffic
+ZIPF_OFFSET = 100
+HOST_EVERY = 100     # every 100th user is a verified host
+SELLER_EVERY = 50    # every 50th user (offset by one) is an approved seller
+ROOMS_PER_HOST = 2
+PRODUCTS_PER_SELLER = 3
+
+# _id layout: 4-byte timestamp, 1-byte collection tag, 7-byte index
+TAGS = {"users": 1, "posts": 2, "user_videos": 3, "rooms": 4, "products": 5, "friends": 6, "likes": 7,
+        "comments": 8, "journals": 9, "session_attendance": 10, "session_payments": 11}
+
+CATEGORIES = ("books", "meditation", "wellness", "art", "apparel", "journals")
+ROOM_TITLES = ("Morning Meditation", "Breathwork Basics", "Mindful Evening", "Gratitude Circle", "Yoga Nidra")
+WORDS = ("calm", "breath", "gratitude", "focus", "journey", "mindful", "peace", "growth", "morning",
+         "reflection", "balance", "kindness", "today", "practice", "energy", "rest", "walk", "light")
+
+_db = None
+_opts: dict = {}
+
+
+def oid(collection: str, index: int, at: datetime) -> ObjectId:
+    return ObjectId(struct.pack(">IB", int(at.timestamp()), TAGS[collection]) + index.to_bytes(7, "big"))
+
+
+def zipf(rng: random.Random, n: int) -> int:
+    """Popularity rank in [0, n): P(k) ~ 1 / (k + ZIPF_OFFSET)."""
+    q = ZIPF_OFFSET
+    return min(n - 1, int(q * ((n + q) / q) ** rng.random()) - q)
+
+
+def scatter(rank: int, n: int) -> int:
+    """Spread popularity ranks over the index space, so hot items are not all the oldest."""
+    return (rank * 2_147_483_647) % n if n > 1 else 0
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def plan(o: dict) -> dict:
+    """Document counts per generated collection (attendance and payments come with rooms)."""
+    users = o["users"]
+    posts = int(users * o["posts_per_user"])
+    return {
+        "users": users,
+        "posts": posts,
+        "likes": int(posts * o["likes_per_post"]),
+        "comments": int(posts * o["comments_per_post"]),
+        "user_videos": int(users * o["videos_per_user"]),
+        "journals": int(users * o["journals_per_user"]),
+        "rooms": math.ceil(users / HOST_EVERY) * ROOMS_PER_HOST,
+        "products": math.ceil(users / SELLER_EVERY) * PRODUCTS_PER_SELLER,
+    }
+
+
+def _at(o: dict, index: int, total: int) -> datetime:
+    """Creation time spread evenly over the window, in index order."""
+    return o["start"] + (o["end"] - o["start"]) * (index / max(1, total))
+
+
+def _user_id(o: dict, index: int) -> str:
+    return str(oid("users", index, _at(o, index, o["users"])))
+
+
+def _author(rng: random.Random, users: int) -> int:
+    # A few prolific authors, a long tail of occasional ones
+    return zipf(rng, users) if rng.random() < 0.3 else rng.randrange(users)
+
+
+def gen_users(rng, o, start, stop) -> dict:
+    users, friends = [], []
+    for i in range(start, stop):
+        created = _at(o, i, o["users"])
+        uid = oid("users", i, created)
+        is_host = i % HOST_EVERY == 0
+        is_seller = i % SELLER_EVERY == 1
+        users.append({
+            "_id": uid,
+            "email": f"user{i}@synthetic.local",
+            "mobile": f"9{i:09d}",
+            "full_name": f"User {i}",
+            "password_hash": o["password_hash"],
+            "role": "host" if is_host else "seller" if is_seller else "user",
+            "is_verified": True,
+            "is_verified_host": is_host,
+            "host_status": "approved" if is_host else "none",
+            "profile_pic": f"https://cdn.synthetic.local/avatars/{i}.jpg" if rng.random() < 0.7 else None,
+            "bio": sentence(rng, 8) if rng.random() < 0.4 else None,
+            "streak_count": int(rng.paretovariate(1.5)) - 1,
+            "created_at": created.isoformat(),
+        })
+        if is_seller:
+            users[-1]["seller_status"] = "approved"
+        # Power-law graph: each user links to earlier users, biased towards the
+        # earliest, so early accounts become hubs (preferential-attachment style)
+        degree = min(i, MAX_FRIENDS_PER_USER, int(o["avg_degree"] / 4 * rng.paretovariate(2.0)))
+        partners = {int(i * rng.random() ** 2) for _ in range(degree)}
+        for j, v in enumerate(sorted(partners)):
+            accepted = rng.random() < 0.9
+            friends.append({
+                "_id": oid("friends", i * MAX_FRIENDS_PER_USER + j, created),
+                "sender_id": str(uid),
+                "receiver_id": _user_id(o, v),
+                "status": "accepted" if accepted else "pending",
+                "created_at": created,
+                "updated_at": created,
+            })
+    return {"users": users, "friends": friends}
+
+
+def gen_posts(rng, o, start, stop) -> dict:
+    posts = []
+    for i in range(start, stop):
+        created = _at(o, i, o["counts"]["posts"])
+        author = _author(rng, o["users"])
+        kind = rng.random()
+        status = "approved" if rng.random() < 0.97 else rng.choice(("pending", "rejected", "flagged"))
+        posts.append({
+            "_id": oid("posts", i, created),
+            "user_id": _user_id(o, author),
+            "author_name": f"User {author}",
+            "content": sentence(rng, rng.randint(4, 30)),
+            "image_url": f"https://cdn.synthetic.local/posts/{i}.jpg" if kind < 0.35 else None,
+            "video_url": f"https://cdn.synthetic.local/posts/{i}.mp4" if 0.35 <= kind < 0.42 else None,
+            "status": status,
+            "moderation_status": status,
+            "moderation_category": "safe",
+            "moderation_score": round(rng.random() * 0.2, 3),
+            "moderation_source": "AI",
+            "rejection_reason": None,
+            "created_at": created.isoformat(),
+        })
+    return {"posts": posts}
+
+
+def _post_ref(rng, o) -> tuple[str, datetime]:
+    n = o["counts"]["posts"]
+    index = scatter(zipf(rng, n), n)
+    created = _at(o, index, n)
+    return str(oid("posts", index, created)), created
+
+
+def gen_likes(rng, o, start, stop) -> dict:
+    likes, seen = [], set()
+    for i in range(start, stop):
+        post_id, posted = _post_ref(rng, o)
+        user = rng.randrange(o["users"])
+        if (post_id, user) in seen:
+            continue
+        seen.add((post_id, user))
+        at = min(o["end"], posted + timedelta(seconds=int(rng.expovariate(1 / 86400))))
+        likes.append({"_id": oid("likes", i, at), "post_id": post_id, "user_id": _user_id(o, user), "created_at": at})
+    return {"likes": likes}
+
+
+def gen_comments(rng, o, start, stop) -> dict:
+    comments = []
+    for i in range(start, stop):
+        post_id, posted = _post_ref(rng, o)
+        at = min(o["end"], posted + timedelta(seconds=int(rng.expovariate(1 / 86400))))
+        comments.append({
+            "_id": oid("comments", i, at),
+            "post_id": post_id,
+            "user_id": _user_id(o, rng.randrange(o["users"])),
+            "content": sentence(rng, rng.randint(2, 15)),
+            "created_at": at,
+        })
+    return {"comments": comments}
+
+
+def gen_videos(rng, o, start, stop) -> dict:
+    from services.ranking import score_video
+    videos = []
+    for i in range(start, stop):
+        created = _at(o, i, o["counts"]["user_videos"])
+        author = _author(rng, o["users"])
+        views = int(rng.paretovariate(1.2)) - 1
+        video = {
+            "_id": oid("user_videos", i, created),
+            "user_id": _user_id(o, author),
+            "author_name": f"User {author}",
+            "title": sentence(rng, 3),
+            "caption": sentence(rng, rng.randint(3, 12)),
+            "video_url": f"https://cdn.synthetic.local/videos/{i}.mp4",
+            "poster_url": f"https://cdn.synthetic.local/videos/{i}.jpg",
+            "preview_url": f"https://cdn.synthetic.local/videos/{i}_preview.mp4",
+            "duration": round(rng.uniform(5, 180), 1),
+            "width": 1080,
+            "height": 1920,
+            "status": "approved" if rng.random() < 0.95 else rng.choice(("pending", "rejected")),
+            "view_count": views,
+            "like_count": int(views * rng.random() * 0.1),
+            "comment_count": int(views * rng.random() * 0.02),
+            "created_at": created,
+        }
+        video["rank_score"] = score_video(video)
+        videos.append(video)
+    return {"user_videos": videos}
+
+
+def gen_journals(rng, o, start, stop) -> dict:
+    journals = []
+    for i in range(start, stop):
+        created = _at(o, i, o["counts"]["journals"])
+        journals.append({
+            "_id": oid("journals", i, created),
+            "user_id": _user_id(o, _author(rng, o["users"])),
+            "title": f"Reflection - {created.strftime('%Y-%m-%d')}",
+            "content": sentence(rng, rng.randint(20, 120)),
+            "date": created.isoformat(),
+            "created_at": created.isoformat(),
+        })
+    return {"journals": journals}
+
+
+def gen_rooms(rng, o, start, stop) -> dict:
+    """Rooms with their attendance and (for paid rooms) payments."""
+    rooms, attendance, payments = [], [], []
+    hosts = math.ceil(o["users"] / HOST_EVERY)
+    for i in range(start, stop):
+        created = _at(o, i, o["counts"]["rooms"])
+        scheduled = created + timedelta(days=rng.randint(1, 14))
+        room_id = oid("rooms", i, created)
+        paid = rng.random() < 0.4
+        price = float(rng.choice((99, 199, 299, 499))) if paid else 0.0
+        status = "ended" if scheduled < o["end"] else rng.choice(("upcoming", "live"))
+        attendees = sorted({rng.randrange(o["users"]) for _ in range(min(o["users"], MAX_ATTENDEES, int(rng.paretovariate(1.3) * 5)))})
+        valid = 0
+        for j, user in enumerate(attendees):
+            stay = int(rng.expovariate(1 / 30))
+            attendance.append({
+                "_id": oid("session_attendance", i * MAX_ATTENDEES + j, scheduled),
+                "room_id": str(room_id),
+                "user_id": _user_id(o, user),
+                "joined_at": scheduled.isoformat(),
+                "left_at": (scheduled + timedelta(minutes=stay)).isoformat() if status == "ended" else None,
+                "stay_duration": stay if status == "ended" else 0,
+                "payment_status": "paid" if paid else "free",
+            })
+            if paid:
+                payments.append({
+                    "_id": oid("session_payments", i * MAX_ATTENDEES + j, created),
+                    "user_id": _user_id(o, user),
+                    "room_id": str(room_id),
+                    "amount": price,
+                    "transaction_id": f"txn_{rng.getrandbits(64):016x}",
+                    "payment_status": "success",
+                    "created_at": created.isoformat(),
+                })
+            valid += int(stay >= 5)
+        gross = valid * price if status == "ended" else 0.0
+        rooms.append({
+            "_id": room_id,
+            "host_id": _user_id(o, (i % hosts) * HOST_EVERY),
+            "title": rng.choice(ROOM_TITLES),
+            "type": "group" if rng.random() < 0.85 else "private",
+            "access": "paid" if paid else "free",
+            "price": price,
+            "scheduled_at": scheduled.isoformat(),
+            "duration": rng.choice((30, 45, 60, 90)),
+            "status": status,
+            "total_attendees": valid if status == "ended" else 0,
+            "total_revenue": gross,
+            "platform_commission": gross * 0.10,
+            "created_at": created.isoformat(),
+        })
+    return {"rooms": rooms, "session_attendance": attendance, "session_payments": payments}
+
+
+def gen_products(rng, o, start, stop) -> dict:
+    products = []
+    sellers = math.ceil(o["users"] / SELLER_EVERY)
+    for i in range(start, stop):
+        created = _at(o, i, o["counts"]["products"])
+        seller = min(o["users"] - 1, (i % sellers) * SELLER_EVERY + 1)
+        products.append({
+            "_id": oid("products", i, created),
+            "seller_id": _user_id(o, seller),
+            "seller_name": f"User {seller}",
+            "title": sentence(rng, 3).rstrip("."),
+            "description": sentence(rng, rng.randint(10, 40)),
+            "price": round(rng.uniform(99, 4999), 2),
+            "stock": rng.randint(0, 200),
+            "images": [f"https://cdn.synthetic.local/products/{i}_{k}.jpg" for k in range(rng.randint(1, 4))],
+            "category": rng.choice(CATEGORIES),
+            "status": "active" if rng.random() < 0.9 else "inactive",
+            "created_at": created.isoformat(),
+        })
+    return {"products": products}
+
+
+GENERATORS = {
+    "users": gen_users,
+    "posts": gen_posts,
+    "likes": gen_likes,
+    "comments": gen_comments,
+    "user_videos": gen_videos,
+    "journals": gen_journals,
+    "rooms": gen_rooms,
+    "products": gen_products,
+}
+
+
+def _init_worker(mongo_uri: str | None, db_name: str, opts: dict):
+    global _db, _opts
+    _opts = opts
+    _db = None if mongo_uri is None else MongoClient(mongo_uri)[db_name]
+
+
+def _insert(collection: str, docs: list) -> int:
+    """Insert, skipping documents already written by an earlier run. Returns the number inserted."""
+    if not docs:
+        return 0
+    try:
+        return len(_db[collection].insert_many(docs, ordered=False, bypass_document_validation=True).inserted_ids)
+    except BulkWriteError as e:
+        fatal = [err for err in e.details["writeErrors"] if err["code"] != 11000]
+        if fatal:
+            raise
+        return e.details["nInserted"]
+
+
+def _run_task(task: tuple) -> dict:
+    name, chunk, start, stop = task
+    rng = random.Random(f"{_opts['seed']}:{name}:{chunk}")
+    written = {}
+    for collection, docs in GENERATORS[name](rng, _opts, start, stop).items():
+        written[collection] = len(docs) if _db is None else _insert(collection, docs)
+    return written
+
+
+def tasks(counts: dict) -> list[tuple]:
+    return [(name, chunk, start, min(start + CHUNK_SIZE, total))
+            for name, total in counts.items()
+            for chunk, start in enumerate(range(0, total, CHUNK_SIZE))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--avg-degree", type=float, default=20)
+    parser.add_argument("--posts-per-user", type=float, default=3)
+    parser.add_argument("--likes-per-post", type=float, default=6)
+    parser.add_argument("--comments-per-post", type=float, default=1.5)
+    parser.add_argument("--videos-per-user", type=float, default=0.5)
+    parser.add_argument("--journals-per-user", type=float, default=2)
+    parser.add_argument("--days", type=int, default=365, help="history window ending at --end")
+    parser.add_argument("--end", help="end of the window, ISO date (default: today, UTC)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mongo-uri", default=MONGO_URI)
+    parser.add_argument("--db", default="mindrise_synthetic")
+    parser.add_argument("--drop", action="store_true", help="drop the generated collections first")
+    parser.add_argument("--no-indexes", action="store_true", help="skip building the declared indexes")
+    parser.add_argument("--dry-run", action="store_true", help="generate without writing (measures generation)")
+    args = parser.parse_args()
+
+    if args.db == DB_NAME and not args.dry_run:
+        print(f"Refusing to write synthetic data into the app database {DB_NAME!r}; pass --db")
+        sys.exit(1)
+
+    from routes.auth import hash_password
+    end = datetime.fromisoformat(args.end) if args.end else datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    opts = {
+        "seed": args.seed, "users": args.users, "avg_degree": args.avg_degree,
+        "posts_per_user": args.posts_per_user, "likes_per_post": args.likes_per_post,
+        "comments_per_post": args.comments_per_post, "videos_per_user": args.videos_per_user,
+        "journals_per_user": args.journals_per_user, "start": end - timedelta(days=args.days), "end": end,
+    }
+    opts["counts"] = plan(opts)
+    # bcrypt is slow by design; every synthetic user shares one hash
+    opts["password_hash"] = hash_password(PASSWORD)
+
+    db = None
+    if not args.dry_run:
+        try:
+            client = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000)
+            client.admin.command("ping")
+        except Exception as e:
+            print(f"Failed to connect to DB: {e}")
+            sys.exit(1)
+        db = client[args.db]
+        if args.drop:
+            for collection in TAGS:
+                db[collection].drop()
+
+    work = tasks(opts["counts"])
+    print(f"Generating {', '.join(f'{n:,} {name}' for name, n in opts['counts'].items())} "
+          f"(plus friendships, attendance, payments) in {len(work)} chunks on {args.workers} workers")
+
+    totals: dict[str, int] = {}
+    started = time.perf_counter()
+    mongo_uri = None if args.dry_run else args.mongo_uri
+    if args.workers > 1:
+        with Pool(args.workers, initializer=_init_worker, initargs=(mongo_uri, args.db, opts)) as pool:
+            results = pool.imap_unordered(_run_task, work)
+            for done, written in enumerate(results, 1):
+                for collection, n in written.items():
+                    totals[collection] = totals.get(collection, 0) + n
+                if done % 20 == 0 or done == len(work):
+                    print(f"  {done}/{len(work)} chunks, {sum(totals.values()):,} documents")
+    else:
+        _init_worker(mongo_uri, args.db, opts)
+        for done, task in enumerate(work, 1):
+            for collection, n in _run_task(task).items():
+                totals[collection] = totals.get(collection, 0) + n
+            if done % 20 == 0 or done == len(work):
+                print(f"  {done}/{len(work)} chunks, {sum(totals.values()):,} documents")
+    elapsed = time.perf_counter() - started
+
+    total = sum(totals.values())
+    print(f"{'Generated' if args.dry_run else 'Inserted'} {total:,} documents in {elapsed:.1f}s "
+          f"({total / max(elapsed, 1e-9):,.0f} docs/s):")
+    for collection, n in sorted(totals.items()):
+        print(f"  {collection}: {n:,}")
+
+    if db is not None:
+        if not args.no_indexes:
+            from services.schema import apply_indexes
+            t0 = time.perf_counter()
+            created = apply_indexes(db, list(TAGS))
+            print(f"Built indexes in {time.perf_counter() - t0:.1f}s: {created or 'none missing'}")
+        db.job_state.update_one({"_id": JOB_ID}, {"$set": {
+            "seed": args.seed, "options": {k: v for k, v in opts.items() if k not in ("password_hash", "counts")},
+            "inserted": totals, "seconds": round(elapsed, 1), "finished_at": datetime.utcnow()
+        }}, upsert=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,10 @@ from routes.marketplace import router as marketplace_router
 
 app = FastAPI(title="MindRise API", version="1.0.0")
 
+# Innermost, so cached responses still get CORS headers and request metrics
+from services.response_cache import ResponseCacheMiddleware
+app.add_middleware(ResponseCacheMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -25,8 +29,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost: tags everything below with the request/route (see services.request_context)
+from services.request_context import RequestContextMiddleware
+import services.query_profiler  # registers its end-of-request hook
+from services import metrics
+app.add_middleware(RequestContextMiddleware)
+
 from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import traceback
 import sys
@@ -57,19 +67,34 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Force /api prefix for consistency with frontend relative paths
 prefix = "/api"
 
-if os.getenv("VERCEL"):
-    UPLOAD_DIR = "/tmp/uploads"
-else:
-    UPLOAD_DIR = "uploads"
+from config import STORAGE_BACKEND, UPLOAD_DIR, METRICS_TOKEN
 
-if not os.path.exists(UPLOAD_DIR):
-    try:
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-    except:
-        pass # Ignore if cannot create
+if STORAGE_BACKEND == "local":
+    if not os.path.exists(UPLOAD_DIR):
+        try:
+            os.makedirs(UPLOAD_DIR, exist_ok=True)
+        except:
+            pass # Ignore if cannot create
 
-if os.path.exists(UPLOAD_DIR):
-    app.mount("/static", StaticFiles(directory=UPLOAD_DIR), name="static")
+    if os.path.exists(UPLOAD_DIR):
+        app.mount("/static", StaticFiles(directory=UPLOAD_DIR), name="static")
+else:
+    from fastapi.responses import StreamingResponse
+    from services.storage import get_storage, content_type_for
+
+    @app.get("/static/{key}")
+    def serve_static(key: str):
+        try:
+            body = get_storage().open(key)
+        except FileNotFoundError:
+            # Files uploaded before switching backends stay reachable
+            legacy_path = os.path.join(UPLOAD_DIR, os.path.basename(key))
+            if not os.path.isfile(legacy_path):
+                raise HTTPException(status_code=404, detail="File not found")
+            body = open(legacy_path, "rb")
+        # Keys are content hashes, so the bytes behind a URL never change
+        return StreamingResponse(body, media_type=content_type_for(key),
+                                 headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 app.include_router(auth_router, prefix=prefix)
 app.include_router(admin_router, prefix=prefix)
@@ -90,6 +115,13 @@ app.include_router(interactions_router, prefix=prefix)
 
 
 
+@app.get(prefix + "/metrics")
+def prometheus_metrics(request: Request):
+    # Scrapers authenticate with METRICS_TOKEN when it is set
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get(prefix + "/health")
 def health():
     try:
@@ -113,6 +145,21 @@ async def startup_event():
     for route in app.routes:
         print(f"{route.path} -> {route.name}")
 
+    from services.activity import start_activity_flusher
+    from services.counters import start_counter_flusher
+    from services.admin_stats import start_stats_reconciler
+    start_activity_flusher()
+    start_counter_flusher()
+    start_stats_reconciler()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    from services.activity import flush_activity
+    from services.counters import flush_counters
+    flush_activity()
+    flush_counters()
+
 @app.get(prefix + "/")
 def root():
     return {"message": "MindRise API", "docs": "/docs", "prefix": prefix}
@@ -0,0 +1,60 @@
+"""Bring the database in line with services.schema.
+
+Runs pending data migrations in version order, builds missing indexes,
+installs validators and prints what still differs from the declaration.
+
+    python migrate.py                 # migrate, build indexes, install validators
+    python migrate.py --check         # report only; exits 1 if anything is missing
+    python migrate.py --stats         # also print $indexStats usage per index
+    python migrate.py --drop-extra    # also drop live indexes that are not declared
+"""
+import sys
+from database import get_db
+from services import schema
+
+
+def print_report(report: dict):
+    for collection, entry in report.items():
+        problems = {k: v for k, v in entry.items() if v and v != "ok"}
+        if problems:
+            print(f"  {collection}: {problems}")
+
+
+def print_usage(usage: dict):
+    for collection, indexes in usage.items():
+        if "error" in indexes:
+            print(f"  {collection}: $indexStats unavailable ({indexes['error']})")
+            continue
+        for name, stats in sorted(indexes.items(), key=lambda item: item[1]["ops"]):
+            print(f"  {collection}.{name}: {stats['ops']} ops since {stats['since']}")
+
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    if "--check" not in sys.argv:
+        applied = schema.run_migrations(db)
+        print(f"Applied migrations: {', '.join(applied) or 'none'}")
+        created = schema.apply_indexes(db)
+        print(f"Created indexes: {created or 'none'}")
+        installed = schema.apply_validators(db)
+        print(f"Installed validators: {', '.join(installed) or 'none'}")
+        if "--drop-extra" in sys.argv:
+            print(f"Dropped indexes: {schema.drop_extra_indexes(db) or 'none'}")
+
+    report = schema.diff(db)
+    pending = [name for _, name, _, _ in schema.pending_migrations(db)]
+    print("Differences from services.schema:")
+    print_report(report)
+    if pending:
+        print(f"  pending migrations: {', '.join(pending)}")
+
+    if "--stats" in sys.argv:
+        print("Index usage:")
+        print_usage(schema.index_usage(db))
+
+    incomplete = pending or any(e["missing"] or e.get("validator") in ("missing", "differs") for e in report.values())
+    sys.exit(1 if "--check" in sys.argv and incomplete else 0)
@@ -0,0 +1,88 @@
+"""One-shot migration: embedded `moderation_logs` -> `moderation_events`.
+
+Walks posts and user_videos that still carry a `moderation_logs` array in
+_id-ordered batches, upserts one event per log entry (keyed on target and
+position, so a re-run after an interruption never duplicates events) and
+then `$unset`s the embedded array. Progress is checkpointed in job_state.
+
+    python migrate_moderation_logs.py [--dry-run] [--batch-size N] [--restart]
+"""
+import sys
+from pymongo import UpdateOne
+from database import get_db
+from services.moderation_log import new_event
+from services.schema import apply_indexes
+from services.video_repository import to_datetime
+
+JOB_ID = "migrate_moderation_logs_v1"
+SOURCES = (("posts", "post"), ("user_videos", "video"))
+
+
+def log_events(target_type: str, doc: dict) -> list[dict]:
+    fallback = doc["_id"].generation_time.replace(tzinfo=None)
+    events = []
+    for index, entry in enumerate(doc.get("moderation_logs") or []):
+        if not isinstance(entry, dict):
+            continue
+        extra = {k: v for k, v in entry.items() if k not in ("action", "operator", "timestamp")}
+        events.append(new_event(
+            target_type, doc["_id"], entry.get("action") or "Unknown", entry.get("operator") or "UNKNOWN",
+            ts=to_datetime(entry.get("timestamp")) or fallback, legacy_index=index, **extra
+        ))
+    return events
+
+
+def migrate(db, batch_size: int = 500, dry_run: bool = False, restart: bool = False) -> int:
+    state = {} if restart else (db.job_state.find_one({"_id": JOB_ID}) or {})
+    if state.get("completed"):
+        print("Migration already completed.")
+        return 0
+
+    if not dry_run:
+        apply_indexes(db, ["moderation_events"])
+    moved = 0
+    for collection, target_type in SOURCES:
+        last_id = state.get(f"last_id_{collection}")
+        while True:
+            query = {"moderation_logs": {"$exists": True}}
+            if last_id:
+                query["_id"] = {"$gt": last_id}
+            batch = list(db[collection].find(query, {"moderation_logs": 1}).sort("_id", 1).limit(batch_size))
+            if not batch:
+                break
+
+            events = [event for doc in batch for event in log_events(target_type, doc)]
+            if events and not dry_run:
+                db.moderation_events.bulk_write([
+                    UpdateOne({"target_id": e["target_id"], "legacy_index": e["legacy_index"]},
+                              {"$setOnInsert": e}, upsert=True)
+                    for e in events
+                ], ordered=False)
+            if not dry_run:
+                db[collection].update_many({"_id": {"$in": [d["_id"] for d in batch]}},
+                                           {"$unset": {"moderation_logs": ""}})
+            moved += len(events)
+
+            last_id = batch[-1]["_id"]
+            if not dry_run:
+                db.job_state.update_one({"_id": JOB_ID}, {"$set": {f"last_id_{collection}": last_id}}, upsert=True)
+            print(f"{collection}: processed up to {last_id}, {len(events)} log entries in this batch.")
+
+    if not dry_run:
+        db.job_state.update_one({"_id": JOB_ID}, {"$set": {"completed": True}}, upsert=True)
+    return moved
+
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    batch_size = 500
+    if "--batch-size" in sys.argv:
+        batch_size = int(sys.argv[sys.argv.index("--batch-size") + 1])
+
+    dry_run = "--dry-run" in sys.argv
+    moved = migrate(db, batch_size=batch_size, dry_run=dry_run, restart="--restart" in sys.argv)
+    print(f"{'Would move' if dry_run else 'Moved'} {moved} moderation log entries.")
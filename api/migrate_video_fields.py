@@ -0,0 +1,71 @@
+"""One-shot migration: canonical status/created_at on user_videos.
+
+Lowercases `status`, converts ISO-string `created_at` values to BSON
+datetimes and backfills a missing `rank_score` (so legacy videos show up in
+/videos/for-you) in _id-ordered batches. Progress is checkpointed in job_state, so
+an interrupted run resumes where it stopped. Once every document is
+migrated, the JSON-schema validator is installed on the collection.
+
+    python migrate_video_fields.py [--dry-run] [--batch-size N] [--restart]
+"""
+import sys
+from pymongo import UpdateOne
+from database import get_db
+from services.ranking import SCORE_FIELDS
+from services.video_repository import migration_updates, VIDEO_VALIDATOR
+
+JOB_ID = "migrate_user_videos_v1"
+
+
+def migrate(db, batch_size: int = 500, dry_run: bool = False, restart: bool = False) -> int:
+    state = {} if restart else (db.job_state.find_one({"_id": JOB_ID}) or {})
+    if state.get("completed"):
+        print("Migration already completed.")
+        return 0
+
+    last_id = state.get("last_id")
+    changed = 0
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = list(db.user_videos.find(query, {**SCORE_FIELDS, "status": 1, "rank_score": 1})
+                     .sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        ops = []
+        for doc in batch:
+            updates = migration_updates(doc)
+            if updates:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if ops and not dry_run:
+            db.user_videos.bulk_write(ops, ordered=False)
+        changed += len(ops)
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            db.job_state.update_one({"_id": JOB_ID}, {"$set": {"last_id": last_id}}, upsert=True)
+        print(f"Processed up to {last_id}: {len(ops)} updated in this batch.")
+
+    if not dry_run:
+        # moderate: documents that somehow still fail are not blocked from updates
+        if "user_videos" in db.list_collection_names():
+            db.command("collMod", "user_videos", validator=VIDEO_VALIDATOR, validationLevel="moderate")
+        else:
+            db.create_collection("user_videos", validator=VIDEO_VALIDATOR, validationLevel="moderate")
+        db.job_state.update_one({"_id": JOB_ID}, {"$set": {"completed": True}}, upsert=True)
+    return changed
+
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    batch_size = 500
+    if "--batch-size" in sys.argv:
+        batch_size = int(sys.argv[sys.argv.index("--batch-size") + 1])
+
+    dry_run = "--dry-run" in sys.argv
+    changed = migrate(db, batch_size=batch_size, dry_run=dry_run, restart="--restart" in sys.argv)
+    print(f"{'Would update' if dry_run else 'Updated'} {changed} videos.")
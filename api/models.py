@@ -56,6 +56,16 @@ class OTPVerifyRequest(BaseModel):
     otp: str
 
 
+class FriendRequestAction(BaseModel):
+    request_id: str
+    action: str  # "accept" or "reject"
+
+
+class BulkFriendRequestResponse(BaseModel):
+    user_id: str  # receiver of the requests
+    responses: list[FriendRequestAction]
+
+
 class PostCreate(BaseModel):
     content: str
     image_url: str | None = None
@@ -82,9 +92,11 @@ class PostResponse(BaseModel):
     author_name: str
     content: str
     image_url: str | None = None
+    image_variants: dict[str, str] = {}  # e.g. {"thumb_webp": url}, see services.images
     video_url: str | None = None
     author_email: str | None = None
     author_profile_pic: str | None = None
+    author_profile_pic_thumb: str | None = None
     status: str  # "pending", "approved", "rejected"
     created_at: str
     rejection_reason: str | None = None
@@ -93,7 +105,7 @@ class PostResponse(BaseModel):
     moderation_category: str | None = None
     moderation_score: float = 0.0
     moderation_source: str = "AI" # AI, admin_override
-    moderation_logs: list[dict] = [] # [{action: str, timestamp: str, operator: str}]
+    moderation_logs: list[dict] = [] # recent moderation_events, filled in for admin views
     # Social Stats
     likes_count: int = 0
     comments_count: int = 0
@@ -115,6 +127,18 @@ class VideoResponse(BaseModel):
     title: str | None = None
     caption: str | None = None
     video_url: str
+    poster_url: str | None = None
+    preview_url: str | None = None
+    duration: float | None = None  # seconds
+    width: int | None = None
+    height: int | None = None
+    rank_score: float | None = None
+    feed_cursor: str | None = None  # pass as `cursor` to /videos/for-you for the next page
+    # Social Stats
+    view_count: int = 0
+    like_count: int = 0
+    comment_count: int = 0
+    is_liked_by_me: bool = False
     status: str  # "pending", "approved", "rejected"
     created_at: str
     rejection_reason: str | None = None
@@ -186,5 +210,6 @@ class ProductResponse(BaseModel):
     price: float
     stock: int
     images: list[str]
+    image_variants: list[dict[str, str]] = []  # one entry per image, same order
     status: str = "active" # "active", "inactive"
     created_at: str
@@ -0,0 +1,17 @@
+"""Recompute "For You" rank scores for approved videos.
+
+Run periodically (cron). Only authors with new or changed videos since the
+last run are re-scored; pass --full to re-score every approved video.
+"""
+import sys
+from database import get_db
+from services.ranking import run_ranking_job
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    written = run_ranking_job(db, full="--full" in sys.argv)
+    print(f"Re-scored {written} videos.")
@@ -0,0 +1,17 @@
+"""Recompute "people you may know" suggestions.
+
+Run periodically (cron). Only users whose friend graph changed since the last
+run are recomputed; pass --full to rebuild every user.
+"""
+import sys
+from database import get_db
+from services.suggestions import run_suggestion_job
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    result = run_suggestion_job(db, full="--full" in sys.argv)
+    print(f"Recomputed suggestions for {result['processed']} users (full={result['full']}).")
@@ -0,0 +1,25 @@
+"""Incremental engagement rollups from the activity ledger.
+
+    python rollup_analytics.py                     # DAU/WAU/MAU + retention since last run
+    python rollup_analytics.py --backfill          # one-time seed of the ledger from journals/posts
+    python rollup_analytics.py --repair-streaks    # rewrite streak fields from the ledger
+"""
+import sys
+from database import get_db
+from services.analytics import backfill_ledger, rollup_daily, rollup_retention, repair_streaks
+
+if __name__ == "__main__":
+    db = get_db()
+    if db is None:
+        print("Failed to connect to DB")
+        sys.exit(1)
+
+    if "--backfill" in sys.argv:
+        print(f"Backfilled {backfill_ledger(db)} user-days into activity_ledger.")
+
+    if "--repair-streaks" in sys.argv:
+        user_ids = [doc["_id"] for doc in db.activity_cohorts.find({}, {"_id": 1})]
+        print(f"Repaired streaks for {repair_streaks(db, user_ids)} users.")
+
+    print(f"Daily rollups: {rollup_daily(db)} days computed.")
+    print(f"Retention rollups: {rollup_retention(db)} cohort-months computed.")
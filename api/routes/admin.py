@@ -1,11 +1,20 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import PlainTextResponse
 from typing import List
 from bson import ObjectId
+from bson.errors import InvalidId
 from pydantic import BaseModel
-from database import get_db, get_client
-from config import DB_NAME
+from database import get_db
 from models import UserResponse, PostResponse, VideoResponse
 from datetime import datetime
+from services.video_repository import VideoRepository
+from services import admin_stats
+from services import moderation_queue
+from services import moderation_log
+from services import schema
+from services import query_profiler
+from services import sampling_profiler
+from services import response_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -16,11 +25,26 @@ class PostStatusUpdate(BaseModel):
     status: str
     rejection_reason: str | None = None
 
+class BulkModerationItem(BaseModel):
+    id: str
+    status: str
+    rejection_reason: str | None = None
+
+class BulkModerationRequest(BaseModel):
+    items: List[BulkModerationItem]
+    operator: str = "ADMIN_OVERRIDE"
+
 class BanRequest(BaseModel):
     reason: str
 
-@router.get("/users", response_model=List[UserResponse])
-def get_all_users(role: str | None = None):
+@router.get("/users")
+def get_all_users(role: str | None = None, search_user: str | None = None,
+                  limit: int = Query(50, ge=1, le=moderation_queue.MAX_PAGE), cursor: str | None = None):
+    """Users page, newest first: {"items": [...], "next_cursor": str | None}.
+
+    Pass `next_cursor` back as `cursor` for the next page. `search_user`
+    filters like the moderation queue's (email, mobile, name or id).
+    """
     if role != "admin":
          raise HTTPException(status_code=403, detail="Forbidden: Admin access required")
     
@@ -28,24 +52,30 @@ def get_all_users(role: str | None = None):
     if db is None:
         raise HTTPException(status_code=503, detail="Database connection not established.")
     
-    users_coll = db.users
-    all_users = []
-    for user in users_coll.find():
-        all_users.append(UserResponse(
-            id=str(user["_id"]),
-            email=user.get("email"),
-            mobile=user.get("mobile"),
-            full_name=user.get("full_name") or None,
-            role=user.get("role", "user"),
-            is_verified=user.get("is_verified", False),
-            is_verified_host=user.get("is_verified_host", False),
-            host_status=user.get("host_status", "none"),
-            seller_status=user.get("seller_status", "none"),
-            business_name=user.get("business_name"),
-            profile_pic=user.get("profile_pic"),
-            last_active_at=user.get("last_active_at")
-        ))
-    return all_users
+    query = moderation_queue.user_search_query(search_user) if search_user else {}
+    if cursor:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = {"$and": [query, {"_id": {"$lt": ObjectId(cursor)}}]}
+    projection = {"password_hash": 0, "otp": 0, "profile_pic_variants": 0}
+    docs = list(db.users.find(query, projection).sort("_id", -1).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    items = [UserResponse(
+        id=str(user["_id"]),
+        email=user.get("email"),
+        mobile=user.get("mobile"),
+        full_name=user.get("full_name") or None,
+        role=user.get("role", "user"),
+        is_verified=user.get("is_verified", False),
+        is_verified_host=user.get("is_verified_host", False),
+        host_status=user.get("host_status", "none"),
+        seller_status=user.get("seller_status", "none"),
+        business_name=user.get("business_name"),
+        profile_pic=user.get("profile_pic"),
+        last_active_at=user.get("last_active_at")
+    ) for user in docs]
+    return {"items": items, "next_cursor": str(docs[-1]["_id"]) if has_more and docs else None}
 
 
 @router.get("/sellers", response_model=List[UserResponse])
@@ -88,6 +118,7 @@ def approve_seller(seller_id: str, role: str):
         raise HTTPException(status_code=400, detail="Invalid Seller ID")
     
     db.users.update_one({"_id": oid}, {"$set": {"seller_status": "approved"}})
+    response_cache.invalidate("marketplace")
     return {"message": "Seller approved"}
 
 
@@ -102,6 +133,7 @@ def reject_seller(seller_id: str, role: str):
         raise HTTPException(status_code=400, detail="Invalid Seller ID")
     
     db.users.update_one({"_id": oid}, {"$set": {"seller_status": "rejected"}})
+    response_cache.invalidate("marketplace")
     return {"message": "Seller rejected"}
 
 @router.post("/users/{user_id}/ban")
@@ -116,6 +148,7 @@ def ban_user(user_id: str, ban_data: BanRequest, role: str):
         {"_id": ObjectId(user_id)}, 
         {"$set": {"role": "banned", "ban_reason": ban_data.reason}}
     )
+    response_cache.invalidate(f"profile:{user_id}")
     
     return {"message": f"User {user_id} banned successfully"}
 
@@ -140,6 +173,7 @@ def toggle_host_verification(user_id: str, role: str):
             "role": user.get("role") if user.get("role") == "admin" else ("host" if new_status else "user")
         }}
     )
+    response_cache.invalidate(f"profile:{user_id}")
     
     return {"message": f"User host verification set to {new_status}"}
 
@@ -148,194 +182,209 @@ def admin_delete_post(post_id: str, role: str):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Forbidden: Admin access required")
     
+    db = get_db()
     # Attempt delete from single posts collection
-    db.posts.delete_one({"_id": ObjectId(post_id)})
+    deleted = db.posts.find_one_and_delete({"_id": ObjectId(post_id)}, {"status": 1, "user_id": 1})
+    if deleted:
+        admin_stats.status_changed(db, "posts", deleted.get("status"), None)
+        response_cache.invalidate(f"profile:{deleted.get('user_id')}")
     
     return {"message": "Post deleted by admin"}
 
 @router.get("/stats")
-def get_stats(role: str):
+def get_stats(role: str, background_tasks: BackgroundTasks):
     if role != "admin":
          raise HTTPException(status_code=403, detail="Admin access required")
     db = get_db()
     if db is None:
         raise HTTPException(status_code=503, detail="Database connection not established.")
     
-    user_count = db.users.count_documents({})
-    email_users = db.users.count_documents({"email": {"$ne": None}})
-    mobile_users = db.users.count_documents({"mobile": {"$ne": None}})
-    
-    pending_posts = db.posts.count_documents({"status": "pending"})
-    flagged_posts = db.posts.count_documents({"status": "flagged"}) 
-    
-    # Count pending videos from MindRiseDB
-    client = get_client()
-    db_videos = client[DB_NAME]
-    pending_videos = db_videos.user_videos.count_documents({"status": {"$in": ["pending", "Pending"]}})
+    # One read of the maintained snapshot; a stale one is recounted after responding
+    snapshot = admin_stats.get_snapshot(db)
+    if admin_stats.is_stale(snapshot):
+        background_tasks.add_task(admin_stats.reconcile, db)
     
     return {
-        "total_users": user_count,
-        "email_users": email_users,
-        "mobile_users": mobile_users,
-        "pending_moderation": pending_posts + pending_videos,
-        "flagged_posts": flagged_posts
+        "total_users": snapshot.get("total_users", 0),
+        "email_users": snapshot.get("email_users", 0),
+        "mobile_users": snapshot.get("mobile_users", 0),
+        "pending_moderation": snapshot.get("pending_posts", 0) + snapshot.get("pending_videos", 0),
+        "flagged_posts": snapshot.get("flagged_posts", 0),
+        "as_of": snapshot["computed_at"].isoformat(),
+        "updated_at": snapshot["updated_at"].isoformat()
+    }
+
+@router.get("/analytics")
+def get_analytics(role: str, days: int = 30):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established.")
+
+    # Served from rollups written by rollup_analytics.py
+    daily = list(db.analytics_daily.find().sort("_id", -1).limit(days))
+    retention = list(db.analytics_retention.find({}, {"_id": 0, "computed_at": 0}).sort([("cohort", -1), ("offset", 1)]))
+
+    return {
+        "daily": [{"date": d["_id"], "dau": d["dau"], "wau": d["wau"], "mau": d["mau"]} for d in reversed(daily)],
+        "retention": retention
     }
 
 @router.get("/posts", response_model=List[PostResponse])
-def get_posts(role: str, status: str = "all", search_user: str | None = None):
+def get_posts(role: str, status: str = "all", search_user: str | None = None,
+              limit: int = Query(50, ge=1, le=moderation_queue.MAX_PAGE), cursor: str | None = None):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     db = get_db()
     if db is None:
         raise HTTPException(status_code=503, detail="Database connection not established")
-    
-    query = {}
-    if status != "all":
-        query["status"] = status
-    
-    if search_user:
-        # Search by user ID or find user by email/mobile first
-        user_query = {"$or": [
-            {"email": {"$regex": search_user, "$options": "i"}},
-            {"mobile": {"$regex": search_user, "$options": "i"}},
-            {"full_name": {"$regex": search_user, "$options": "i"}}
-        ]}
-        try:
-            if len(search_user) == 24: # Likely ObjectId
-                user_query["$or"].append({"_id": ObjectId(search_user)})
-        except: pass
-        
-        users = list(db.users.find(user_query))
-        user_ids = [str(u["_id"]) for u in users]
-        query["user_id"] = {"$in": user_ids} if user_ids else "NONE"
 
-    # Fetch from single collection
-    combined = list(db.posts.find(query))
-    
-    # Sort and return
-    combined.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    results = []
-    for doc in combined:
-        doc["id"] = str(doc["_id"])
-        user = db.users.find_one({"_id": ObjectId(doc["user_id"])})
-        if user:
-            doc["author_email"] = user.get("email")
-            doc["author_profile_pic"] = user.get("profile_pic")
-        results.append(doc)
-    return results
+    # Server-sorted page with batched author lookup; see /admin/queue for next_cursor
+    return _queue_page(db, "posts", limit, cursor, status=status, search_user=search_user)["items"]
+
+def _queue_page(db, kind: str, limit: int, cursor: str | None, **filters) -> dict:
+    try:
+        return moderation_queue.list_queue(db, kind, limit=limit, cursor=cursor, **filters)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/queue/{kind}")
+def get_moderation_queue(kind: str, role: str, status: str = "pending", category: str | None = None,
+                         since: datetime | None = None, until: datetime | None = None,
+                         search_user: str | None = None, moderator_id: str | None = None,
+                         limit: int = Query(50, ge=1, le=moderation_queue.MAX_PAGE), cursor: str | None = None):
+    """Moderation queue page for posts or videos, newest first.
+
+    Pass `next_cursor` back as `cursor` for the next page. `status` may be
+    a comma-separated list or "all". With `moderator_id`, items leased to
+    other moderators are left out.
+    """
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in moderation_queue.QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established")
+    return _queue_page(db, kind, limit, cursor, status=status, category=category, since=since, until=until,
+                       search_user=search_user, moderator_id=moderator_id)
+
+@router.post("/queue/{kind}/claim")
+def claim_moderation_items(kind: str, role: str, moderator_id: str, count: int = Query(5, ge=1, le=moderation_queue.MAX_CLAIM),
+                           status: str = "pending", category: str | None = None):
+    """Lease the oldest unclaimed items to a moderator (see moderation_queue.LEASE)."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in moderation_queue.QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    items = moderation_queue.claim(get_db(), kind, moderator_id, count=count, status=status, category=category)
+    return {"items": items, "lease_seconds": int(moderation_queue.LEASE.total_seconds())}
+
+@router.post("/queue/{kind}/{item_id}/release")
+def release_moderation_item(kind: str, item_id: str, role: str, moderator_id: str):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in moderation_queue.QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    if not moderation_queue.release(get_db(), kind, item_id, moderator_id):
+        raise HTTPException(status_code=404, detail="No claim held on this item")
+    return {"message": "Claim released"}
+
+@router.get("/queue/{kind}/{item_id}/history")
+def get_moderation_history(kind: str, item_id: str, role: str,
+                           limit: int = Query(50, ge=1, le=moderation_log.MAX_PAGE), cursor: str | None = None):
+    """Moderation events for one post or video, newest first (cursor-paginated)."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in moderation_queue.QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established")
+    try:
+        return moderation_log.history(db, moderation_log.TARGET_TYPES[kind], item_id, limit=limit, cursor=cursor)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.post("/queue/{kind}/bulk")
+def bulk_moderate_items(kind: str, payload: BulkModerationRequest, role: str, background_tasks: BackgroundTasks):
+    """Approve/reject up to MAX_BULK posts or videos in one write.
+
+    Returns a per-id result; owner notifications and dashboard counters are
+    updated in the background.
+    """
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if kind not in moderation_queue.QUEUES:
+        raise HTTPException(status_code=404, detail="Unknown queue")
+    if len(payload.items) > moderation_queue.MAX_BULK:
+        raise HTTPException(status_code=400, detail=f"At most {moderation_queue.MAX_BULK} items per request")
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established.")
+
+    results, changes = moderation_queue.bulk_moderate(
+        db, kind, [item.dict() for item in payload.items], operator=payload.operator
+    )
+    if changes:
+        background_tasks.add_task(moderation_queue.apply_moderation_side_effects, db, kind, changes)
+    return {"results": results, "updated": len(changes)}
 
 @router.put("/posts/{post_id}/status")
 def update_post_status(post_id: str, update: PostStatusUpdate, role: str):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     db = get_db()
-    
-    # Find post to get existing logs
-    post = db.posts.find_one({"_id": ObjectId(post_id)})
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    timestamp = datetime.utcnow().isoformat()
-    log_entry = {
-        "action": f"Admin Override: {update.status}",
-        "timestamp": timestamp,
-        "operator": "ADMIN_OVERRIDE",
-        "reason": update.rejection_reason or "Manually updated by admin"
-    }
+    if not ObjectId.is_valid(post_id):
+        raise HTTPException(status_code=400, detail="Invalid Post ID")
 
+    status = update.status.lower()
     moderation_updates = {
+        **moderation_queue.CLEAR_CLAIM,
         "moderation_status": update.status,
         "moderation_source": "admin_override",
-        "moderation_logs": post.get("moderation_logs", []) + [log_entry],
-        "status": update.status.lower(),
+        "status": status,
         "rejection_reason": update.rejection_reason if update.status == "rejected" else None
     }
 
-    # Update in posts collection
-    db.posts.update_one({"_id": ObjectId(post_id)}, {"$set": moderation_updates})
+    # Single atomic write; the previous status only feeds the dashboard counters
+    post = db.posts.find_one_and_update({"_id": ObjectId(post_id)}, {"$set": moderation_updates},
+                                        projection={"status": 1, "user_id": 1})
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    admin_stats.status_changed(db, "posts", post.get("status"), status)
+    response_cache.invalidate(f"profile:{post.get('user_id')}")
+    moderation_queue.log_override(db, "posts", post_id, status, update.rejection_reason)
 
     return {"message": f"Post status updated to {update.status} with override log."}
 
 @router.get("/videos", response_model=List[VideoResponse])
-def get_videos(role: str, status: str = "all"):
+def get_videos(role: str, status: str = "all", search_user: str | None = None,
+               limit: int = Query(50, ge=1, le=moderation_queue.MAX_PAGE), cursor: str | None = None):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    db_mindrise = get_db()  # Use canonical DB for users
-    client = get_client()
-    db_videos = client[DB_NAME]
-    
-    query = {}
-    if status == "approved":
-        query = {"status": {"$in": ["approved", "Approved"]}}
-    elif status == "pending":
-        query = {"status": {"$in": ["pending", "Pending"]}}
-    elif status == "rejected":
-        query = {"status": {"$in": ["rejected", "Rejected"]}}
-        
-    videos_cursor = db_videos.user_videos.find(query).sort("created_at", -1)
-        
-    results = []
-    for doc in videos_cursor:
-        doc["id"] = str(doc["_id"])
-        
-        # 1. Populate author_name/email from users collection
-        user_doc = db_mindrise.users.find_one({"_id": ObjectId(doc["user_id"])})
-        if user_doc:
-            doc["author_name"] = user_doc.get("full_name") or user_doc.get("email") or "MindRise User"
-            doc["author_email"] = user_doc.get("email")
-        else:
-            # Fallback if user doc not found (e.g. deleted or inconsistent)
-            if "author_name" not in doc:
-                doc["author_name"] = "Unknown User"
-        
-        # 2. Ensure status is lowercase for model compliance
-        if "status" in doc:
-            doc["status"] = doc["status"].lower()
-        else:
-            doc["status"] = "pending"
-            
-        # 3. Ensure created_at is a string (ISO format)
-        if isinstance(doc.get("created_at"), datetime):
-            doc["created_at"] = doc["created_at"].isoformat()
-        elif "created_at" not in doc:
-            doc["created_at"] = datetime.utcnow().isoformat()
-            
-        results.append(doc)
-    return results
+    # Server-sorted page with batched author lookup; see /admin/queue for next_cursor
+    return _queue_page(get_db(), "videos", limit, cursor, status=status, search_user=search_user)["items"]
 
 @router.put("/videos/{video_id}/status")
 def update_video_status(video_id: str, update: PostStatusUpdate, role: str):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
-    client = get_client()
-    db = client[DB_NAME]
-    
-    video = db.user_videos.find_one({"_id": ObjectId(video_id)})
-    if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
+    repo = VideoRepository(get_db())
 
-    timestamp = datetime.utcnow().isoformat()
-    log_entry = {
-        "action": f"Admin Override: {update.status}",
-        "timestamp": timestamp,
-        "operator": "ADMIN_OVERRIDE",
-        "reason": update.rejection_reason or "Manually updated by admin"
-    }
-
-    db_status = update.status.lower() 
-    db.user_videos.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$set": {
-            "status": db_status,
-            "moderation_status": update.status,
-            "moderation_source": "admin_override",
-            "moderation_logs": video.get("moderation_logs", []) + [log_entry],
-            "rejection_reason": update.rejection_reason,
-            "updated_at": timestamp
-        }}
+    updated = repo.set_status(
+        video_id, update.status,
+        moderation_status=update.status,
+        moderation_source="admin_override",
+        rejection_reason=update.rejection_reason,
+        updated_at=datetime.utcnow().isoformat(),
+        **moderation_queue.CLEAR_CLAIM
     )
+    if not updated:
+        raise HTTPException(status_code=404, detail="Video not found")
+    moderation_queue.log_override(repo.db, "videos", video_id, update.status, update.rejection_reason)
     return {"message": f"Video {update.status} successfully overridden"}
 
 @router.post("/optimize")
@@ -344,18 +393,85 @@ def optimize_db(role: str):
         raise HTTPException(status_code=403, detail="Admin access required")
     db = get_db()
     
-    # Indexing for performance
-    db.users.create_index([("email", 1)])
-    db.users.create_index([("mobile", 1)])
-    db.posts.create_index([("user_id", 1)])
-    db.posts.create_index([("status", 1)])
-    
-    client = get_client()
-    db_v = client[DB_NAME]
-    db_v.user_videos.create_index([("user_id", 1)])
-    db_v.user_videos.create_index([("status", 1)])
+    # Build any declared index that is missing (see services.schema)
+    created = schema.apply_indexes(db)
     
-    return {"message": "Database optimized with indexes"}
+    return {"message": "Database optimized with indexes", "created": created}
+
+@router.get("/schema")
+def get_schema_status(role: str, usage: bool = False):
+    """Declared vs live indexes/validators, pending migrations and, optionally, $indexStats."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established.")
+
+    report = {
+        "collections": schema.diff(db),
+        "pending_migrations": [name for _, name, _, _ in schema.pending_migrations(db)],
+    }
+    if usage:
+        report["usage"] = schema.index_usage(db)
+    return report
+
+@router.get("/profiler")
+def get_profiler_report(role: str, limit: int = Query(20, ge=1, le=200)):
+    """Per-route query counts and DB time, top query shapes, N+1 patterns and slow queries."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return query_profiler.report(limit)
+
+@router.post("/profiler/reset")
+def reset_profiler(role: str):
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    query_profiler.reset()
+    return {"message": "Profiler statistics cleared"}
+
+@router.post("/profiler/sample")
+def start_sampling(request: Request, role: str, seconds: float = Query(10, gt=0, le=sampling_profiler.MAX_SECONDS),
+                   interval_ms: float = Query(10, ge=1, le=1000), all_threads: bool = False):
+    """Sample every thread's stack for `seconds`; fetch the result from GET /admin/profiler/sample."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    capture = sampling_profiler.start(request.app.routes, seconds, interval_ms / 1000, all_threads)
+    if capture is None:
+        raise HTTPException(status_code=409, detail="A capture is already running")
+    return capture.status()
+
+@router.get("/profiler/sample")
+def get_sampling_result(role: str, format: str = "collapsed"):
+    """Latest capture as collapsed stacks (`format=collapsed`), speedscope JSON or just its status."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    capture = sampling_profiler.latest()
+    if capture is None:
+        raise HTTPException(status_code=404, detail="No capture has been taken")
+    if format == "status" or not capture.done.is_set():
+        return capture.status()
+    if format == "speedscope":
+        return sampling_profiler.speedscope(capture)
+    if format == "collapsed":
+        return PlainTextResponse(sampling_profiler.collapsed(capture))
+    raise HTTPException(status_code=400, detail="format must be collapsed, speedscope or status")
+
+@router.get("/cache")
+def get_cache_stats(role: str):
+    """Response cache backend, entry count, per-route hit/miss/304 counts and policies."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return response_cache.stats()
+
+@router.delete("/cache")
+def clear_response_cache(role: str, tag: str | None = None):
+    """Drop cached responses filed under `tag` (e.g. "marketplace", "profile:<id>"), or all of them."""
+    if role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if tag:
+        return {"message": f"Invalidated {response_cache.invalidate(tag)} cached responses"}
+    response_cache.clear()
+    return {"message": "Response cache cleared"}
 
 @router.get("/debug-ai-keys")
 def debug_ai_keys():
@@ -379,19 +495,15 @@ def approve_video_standard(payload: dict, role: str = "admin"):
     if role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    client = get_client()
-    db = client[DB_NAME]
-    
-    result = db.user_videos.update_one(
-        {"_id": ObjectId(video_id)},
-        {"$set": {
-            "status": status.lower(),
-            "rejection_reason": rejection_reason,
-            "updated_at": datetime.utcnow().isoformat()
-        }}
+    repo = VideoRepository(get_db())
+    updated = repo.set_status(
+        video_id, status,
+        rejection_reason=rejection_reason,
+        updated_at=datetime.utcnow().isoformat()
     )
     
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Video not found")
+    moderation_queue.log_override(repo.db, "videos", video_id, status, rejection_reason)
         
     return {"success": True, "message": f"Video {status} successfully"}
@@ -6,6 +6,7 @@ import string
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from bson import ObjectId
 from database import get_db
+from services.response_cache import invalidate
 from models import UserRegister, UserLogin, UserResponse, PasswordResetRequest, PasswordResetConfirm, OTPRequest, OTPVerifyRequest
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 from pydantic import BaseModel, EmailStr
@@ -15,6 +16,8 @@ load_dotenv(override=True)
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 from datetime import datetime, timedelta
+from services.images import process_profile_pic
+from services.admin_stats import user_created
 
 # Email Configuration (Optimized for Deliverability)
 conf = ConnectionConfig(
@@ -100,6 +103,7 @@ async def register(data: UserRegister, background_tasks: BackgroundTasks):
             users.update_one({"mobile": data.mobile}, {"$set": doc})
     else:
         users.insert_one(doc)
+        user_created(db, doc)
 
 
     # Send OTP
@@ -371,7 +375,7 @@ class ProfilePicUpdate(BaseModel):
     profile_pic: str # Base64 string
 
 @router.put("/user/{user_id}/profile-pic", response_model=UserResponse)
-def update_profile_pic(user_id: str, data: ProfilePicUpdate):
+def update_profile_pic(user_id: str, data: ProfilePicUpdate, background_tasks: BackgroundTasks):
     db = get_db()
     if db is None:
         raise HTTPException(status_code=503, detail="Database not available")
@@ -384,12 +388,14 @@ def update_profile_pic(user_id: str, data: ProfilePicUpdate):
     
     result = db.users.find_one_and_update(
         {"_id": oid},
-        {"$set": {"profile_pic": data.profile_pic}},
+        {"$set": {"profile_pic": data.profile_pic, "profile_pic_variants": {}}},
         return_document=True
     )
     
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate(f"profile:{user_id}")
+    background_tasks.add_task(process_profile_pic, user_id)
     
     return UserResponse(
         id=str(result["_id"]),
@@ -421,12 +427,13 @@ def delete_profile_pic(user_id: str):
     
     result = db.users.find_one_and_update(
         {"_id": oid},
-        {"$set": {"profile_pic": None}},
+        {"$set": {"profile_pic": None, "profile_pic_variants": {}}},
         return_document=True
     )
     
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate(f"profile:{user_id}")
     
     return UserResponse(
         id=str(result["_id"]),
@@ -467,6 +474,7 @@ def update_bio(user_id: str, data: BioUpdate):
     
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate(f"profile:{user_id}")
     
     return UserResponse(
         id=str(result["_id"]),
@@ -525,6 +533,7 @@ def update_profile(user_id: str, data: UserUpdate):
     
     if not result:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate(f"profile:{user_id}")
     
     return UserResponse(
         id=str(result["_id"]),
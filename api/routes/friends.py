@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, Query
 from database import get_db
-from models import UserResponse
+from models import UserResponse, BulkFriendRequestResponse
+from pymongo import UpdateOne, DeleteOne
 from bson import ObjectId
+from bson.errors import InvalidId
 from typing import List
 from datetime import datetime
+from services.notifications import notify, notify_many, list_notifications, unread_count, mark_read
+from services.response_cache import invalidate
+from services.suggestions import record_graph_changes, TOP_K
 
 router = APIRouter(prefix="/friends", tags=["friends"])
 
@@ -79,81 +84,183 @@ def send_friend_request(from_user_id: str, to_user_id: str):
         "status": "pending",
         "created_at": datetime.utcnow()
     })
+    # Suggestions leave out users with a pending request either way
+    record_graph_changes(db, [(from_user_id, to_user_id)])
 
     # Send notification
     sender = db.users.find_one({"_id": ObjectId(from_user_id)})
     sender_name = sender.get("full_name") or sender.get("email", "Someone")
     
-    db.notifications.insert_one({
-        "user_id": to_user_id,
-        "message": f"{sender_name} sent you a friend request",
-        "type": "friend_request",
-        "sender_id": from_user_id,
-        "created_at": datetime.utcnow()
-    })
+    notify(db, to_user_id, "friend_request", f"{sender_name} sent you a friend request", sender_id=from_user_id)
 
     return {"message": "Friend request sent"}
 
 @router.get("/requests")
-def get_friend_requests(user_id: str):
+def get_friend_requests(user_id: str, limit: int = Query(50, ge=1, le=200)):
     db = get_db()
-    requests_cursor = db.friends.find({
-        "receiver_id": user_id,
-        "status": "pending"
-    }).sort("created_at", -1)
-    
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    # One aggregation hydrates every sender instead of a find_one per request
+    pipeline = [
+        {"$match": {"receiver_id": user_id, "status": "pending"}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": limit},
+        {"$addFields": {"sender_oid": {"$convert": {"input": "$sender_id", "to": "objectId", "onError": None}}}},
+        {"$lookup": {"from": "users", "localField": "sender_oid", "foreignField": "_id", "as": "sender"}},
+        {"$unwind": "$sender"},
+        {"$project": {
+            "sender_id": 1,
+            "created_at": 1,
+            "sender.full_name": 1,
+            "sender.email": 1,
+            "sender.profile_pic": 1
+        }}
+    ]
+
     results = []
-    for req in requests_cursor:
-        user_info = db.users.find_one({"_id": ObjectId(req["sender_id"])})
-        if user_info:
-            results.append({
-                "request_id": str(req["_id"]),
-                "from_user_id": req["sender_id"],
-                "from_user_name": user_info.get("full_name") or user_info["email"],
-                "created_at": req["created_at"].isoformat() if isinstance(req["created_at"], datetime) else req["created_at"]
-            })
+    for req in db.friends.aggregate(pipeline):
+        sender = req["sender"]
+        results.append({
+            "request_id": str(req["_id"]),
+            "from_user_id": req["sender_id"],
+            "from_user_name": sender.get("full_name") or sender.get("email"),
+            "from_user_profile_pic": sender.get("profile_pic"),
+            "created_at": req["created_at"].isoformat() if isinstance(req["created_at"], datetime) else req["created_at"]
+        })
     return results
 
 @router.post("/respond")
 def respond_to_request(request_id: str, action: str): # action: "accept" or "reject"
     db = get_db()
-    req = db.friends.find_one({"_id": ObjectId(request_id)})
-    if not req:
-        raise HTTPException(status_code=404, detail="Request not found")
-    
+    try:
+        oid = ObjectId(request_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid Request ID")
+
     if action == "accept":
-        db.friends.update_one(
-            {"_id": ObjectId(request_id)},
-            {"$set": {"status": "accepted", "updated_at": datetime.utcnow()}}
+        # Read and write in one round trip
+        req = db.friends.find_one_and_update(
+            {"_id": oid, "status": "pending"},
+            {"$set": {"status": "accepted", "updated_at": datetime.utcnow()}},
+            projection={"sender_id": 1, "receiver_id": 1}
         )
+        if not req:
+            raise HTTPException(status_code=404, detail="Request not found")
+        invalidate(f"profile:{req['sender_id']}", f"profile:{req['receiver_id']}")
+
         # Notify sender
-        receiver = db.users.find_one({"_id": ObjectId(req["receiver_id"])})
-        receiver_name = receiver.get("full_name") or receiver.get("email", "Someone")
+        receiver = db.users.find_one({"_id": ObjectId(req["receiver_id"])}, {"full_name": 1, "email": 1})
+        receiver_name = (receiver.get("full_name") or receiver.get("email", "Someone")) if receiver else "Someone"
         
-        db.notifications.insert_one({
-            "user_id": req["sender_id"],
-            "message": f"{receiver_name} accepted your friend request!",
-            "type": "request_accepted",
-            "created_at": datetime.utcnow()
-        })
+        notify(db, req["sender_id"], "request_accepted", f"{receiver_name} accepted your friend request!")
         return {"message": "Friend request accepted"}
     else:
-        db.friends.delete_one({"_id": ObjectId(request_id)})
+        req = db.friends.find_one_and_delete({"_id": oid, "status": "pending"}, {"sender_id": 1, "receiver_id": 1})
+        if not req:
+            raise HTTPException(status_code=404, detail="Request not found")
+        record_graph_changes(db, [(req["sender_id"], req["receiver_id"])])
         return {"message": "Friend request rejected"}
 
+@router.post("/respond/bulk")
+def respond_to_requests_bulk(payload: BulkFriendRequestResponse):
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    results = {}
+    wanted = {}
+    for item in payload.responses:
+        if item.action not in ("accept", "reject"):
+            results[item.request_id] = "invalid_action"
+        elif not ObjectId.is_valid(item.request_id):
+            results[item.request_id] = "invalid_id"
+        else:
+            wanted[ObjectId(item.request_id)] = item.action
+
+    # Only pending requests addressed to this user can be answered
+    pending = {}
+    if wanted:
+        cursor = db.friends.find(
+            {"_id": {"$in": list(wanted)}, "receiver_id": payload.user_id, "status": "pending"},
+            {"sender_id": 1}
+        )
+        pending = {req["_id"]: req["sender_id"] for req in cursor}
+
+    now = datetime.utcnow()
+    # Millisecond precision, as stored, so the re-read below can match it exactly
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    accepts, rejects = [], []
+    for oid, action in wanted.items():
+        if oid not in pending:
+            results[str(oid)] = "not_found"
+        elif action == "accept":
+            accepts.append(oid)
+        else:
+            rejects.append(oid)
+
+    ops = [UpdateOne({"_id": oid, "status": "pending"}, {"$set": {"status": "accepted", "updated_at": now}})
+           for oid in accepts] + [DeleteOne({"_id": oid, "status": "pending"}) for oid in rejects]
+    accepted, rejected = set(accepts), set(rejects)
+    if ops:
+        write = db.friends.bulk_write(ops, ordered=False)
+        # A concurrent response can win between the read and the write; only
+        # report (and notify) what this call actually changed
+        if write.modified_count != len(accepts):
+            accepted = set(doc["_id"] for doc in db.friends.find(
+                {"_id": {"$in": accepts}, "status": "accepted", "updated_at": now}, {"_id": 1}
+            ))
+        if write.deleted_count != len(rejects):
+            # Gone either way; one that was accepted meanwhile was not rejected
+            rejected -= set(doc["_id"] for doc in db.friends.find({"_id": {"$in": rejects}}, {"_id": 1}))
+    for oid in accepts:
+        results[str(oid)] = "accepted" if oid in accepted else "not_found"
+    for oid in rejects:
+        results[str(oid)] = "rejected" if oid in rejected else "not_found"
+    accepted_senders = [pending[oid] for oid in accepts if oid in accepted]
+    record_graph_changes(db, [(pending[oid], payload.user_id) for oid in rejects if oid in rejected])
+
+    if accepted_senders:
+        invalidate(f"profile:{payload.user_id}", *(f"profile:{sender_id}" for sender_id in accepted_senders))
+        receiver = db.users.find_one({"_id": ObjectId(payload.user_id)}, {"full_name": 1, "email": 1})
+        receiver_name = (receiver.get("full_name") or receiver.get("email", "Someone")) if receiver else "Someone"
+        notify_many(db, [{
+            "user_id": sender_id,
+            "type": "request_accepted",
+            "message": f"{receiver_name} accepted your friend request!"
+        } for sender_id in accepted_senders])
+
+    return {"results": results}
+
 @router.get("/notifications")
-def get_notifications(user_id: str):
+def get_notifications(user_id: str, limit: int = Query(20, ge=1, le=100), before: str | None = None):
+    """Newest first; pass `next_cursor` back as `before` for the next page."""
     db = get_db()
-    notifications = db.notifications.find({"user_id": user_id}).sort("created_at", -1)
-    results = []
-    for n in notifications:
-        results.append({
-            "id": str(n["_id"]),
-            "message": n["message"],
-            "type": n["type"],
-            "created_at": n["created_at"].isoformat() if isinstance(n["created_at"], datetime) else n["created_at"]
-        })
-    return results
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    try:
+        return list_notifications(db, user_id, limit=limit, before=before)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/notifications/unread-count")
+def get_unread_count(user_id: str):
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    return {"unread": unread_count(db, user_id)}
+
+@router.post("/notifications/read")
+def mark_notifications_read(user_id: str, notification_id: str | None = None):
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+    if notification_id and not ObjectId.is_valid(notification_id):
+        raise HTTPException(status_code=400, detail="Invalid notification ID")
+
+    updated = mark_read(db, user_id, notification_id)
+    return {"marked_read": updated, "unread": unread_count(db, user_id)}
 
 @router.get("/list")
 def list_friends(user_id: str):
@@ -183,6 +290,18 @@ def list_friends(user_id: str):
             })
     return friends_info
 
+@router.get("/suggestions")
+def get_suggestions(user_id: str, limit: int = Query(10, ge=1, le=TOP_K)):
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not available")
+
+    # Precomputed by refresh_suggestions.py; a single read on the request path
+    doc = db.friend_suggestions.find_one({"_id": user_id}, {"suggestions": {"$slice": limit}})
+    if not doc:
+        return []
+    return doc.get("suggestions", [])
+
 @router.get("/status")
 def get_friend_status(user1_id: str, user2_id: str):
     db = get_db()
@@ -4,6 +4,10 @@ from models import CommentCreate, CommentResponse
 from bson import ObjectId
 from datetime import datetime
 from typing import List
+from services.notifications import notify, notify_like
+from services.admin_stats import status_changed
+from services.moderation_log import record
+from services.response_cache import invalidate
 
 router = APIRouter(prefix="/posts", tags=["interactions"])
 
@@ -38,14 +42,7 @@ def toggle_like(post_id: str, user_id: str = Body(..., embed=True)):
             liker = db.users.find_one({"_id": ObjectId(user_id)})
             liker_name = liker.get("full_name") or liker.get("email", "Someone")
             
-            db.notifications.insert_one({
-                "user_id": post["user_id"],
-                "message": f"{liker_name} liked your post",
-                "type": "like",
-                "post_id": post_id,
-                "sender_id": user_id,
-                "created_at": datetime.utcnow()
-            })
+            notify_like(db, post["user_id"], post_id, user_id, liker_name)
             
         return {"message": "Post liked", "is_liked": True}
 
@@ -95,14 +92,8 @@ def add_comment(post_id: str, comment: CommentCreate, user_id: str = Body(..., e
         commenter = db.users.find_one({"_id": ObjectId(user_id)})
         commenter_name = commenter.get("full_name") or commenter.get("email", "Someone")
         
-        db.notifications.insert_one({
-            "user_id": post["user_id"],
-            "message": f"{commenter_name} commented on your post",
-            "type": "comment",
-            "post_id": post_id,
-            "sender_id": user_id,
-            "created_at": datetime.utcnow()
-        })
+        notify(db, post["user_id"], "comment", f"{commenter_name} commented on your post",
+               sender_id=user_id, post_id=post_id)
 
     # Fetch author details for response
     author = db.users.find_one({"_id": ObjectId(user_id)})
@@ -141,13 +132,13 @@ def report_post(post_id: str, user_id: str = Body(..., embed=True)):
         }}
     )
     
+    status_changed(db, "posts", post.get("status"), "rejected")
+    invalidate(f"profile:{post.get('user_id')}")
+    record(db, "post", post_id, "Reported: rejected", "USER_REPORT", status="rejected",
+           reason="Reported by user", reporter_id=user_id, source="automatic_report_v2")
+
     # 3. Notify owner
-    db.notifications.insert_one({
-        "user_id": post["user_id"],
-        "message": "The post has been deleted for violating the app's guidelines",
-        "type": "system_violation",
-        "post_id": post_id,
-        "created_at": datetime.utcnow()
-    })
+    notify(db, post["user_id"], "system_violation",
+           "The post has been deleted for violating the app's guidelines", post_id=post_id)
     
     return {"message": "Post reported and removed for review"}
@@ -33,6 +33,7 @@ async def get_marketplace():
             price=p.get("price"),
             stock=p.get("stock"),
             images=p.get("images", []),
+            image_variants=p.get("image_variants", []),
             status=p.get("status", "active"),
             created_at=p.get("created_at")
         ))
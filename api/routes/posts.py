@@ -4,6 +4,10 @@ from models import PostCreate, PostResponse
 from bson import ObjectId
 from datetime import datetime
 from services.moderation import check_content
+from services.images import process_post_images
+from services.admin_stats import status_changed
+from services.moderation_log import record
+from services.response_cache import invalidate
 
 router = APIRouter(prefix="/posts", tags=["posts"])
 
@@ -13,26 +17,18 @@ def process_post_moderation(post_id: str):
         db = get_db()
         if db is None: return
 
-        post = db.posts.find_one({"_id": ObjectId(post_id)})
+        post = db.posts.find_one({"_id": ObjectId(post_id)},
+                                 {"content": 1, "image_url": 1, "video_url": 1, "status": 1, "user_id": 1})
         if not post: return
 
         # AI Check
         result = check_content(post.get("content", ""), post.get("image_url"), post.get("video_url"))
-        
-        timestamp = datetime.utcnow().isoformat()
-        log_entry = {
-            "action": f"AI Moderation: {result['status']}",
-            "timestamp": timestamp,
-            "operator": "AI_SYSTEM",
-            "details": result["details"]
-        }
 
         updates = {
             "moderation_score": result["score"],
             "moderation_status": result["status"],
             "moderation_category": result["category"],
             "moderation_source": "AI",
-            "moderation_logs": post.get("moderation_logs", []) + [log_entry],
             "status": result["status"]
         }
 
@@ -40,6 +36,10 @@ def process_post_moderation(post_id: str):
             updates["rejection_reason"] = f"AI Rejection ({result['category']}): {', '.join(result['details'])}"
         
         db.posts.update_one({"_id": ObjectId(post_id)}, {"$set": updates})
+        status_changed(db, "posts", post.get("status"), updates["status"])
+        invalidate(f"profile:{post.get('user_id')}")
+        record(db, "post", post_id, f"AI Moderation: {result['status']}", "AI_SYSTEM",
+               status=result["status"], details=result["details"])
             
     except Exception as e:
         print(f"Moderation error for post {post_id}: {e}")
@@ -65,23 +65,24 @@ def create_post(post: PostCreate, user_id: str, author_name: str, background_tas
         "moderation_status": mod_result["status"],
         "moderation_category": mod_result["category"],
         "moderation_source": "AI",
-        "moderation_logs": [{
-            "action": f"Heuristic/AI Start: {mod_result['status']}",
-            "timestamp": datetime.utcnow().isoformat(),
-            "operator": "AI_SYSTEM",
-            "details": mod_result["details"]
-        }],
         "rejection_reason": mod_result["details"][0] if mod_result["status"] == "rejected" else None
     }
 
     # Always insert into posts collection
     doc["status"] = mod_result["status"]
     result = db.posts.insert_one(doc)
+    status_changed(db, "posts", None, doc["status"])
+    if doc["status"] == "approved":
+        invalidate(f"profile:{user_id}")
+    record(db, "post", result.inserted_id, f"Heuristic/AI Start: {mod_result['status']}", "AI_SYSTEM",
+           status=mod_result["status"], details=mod_result["details"])
     
     # If it was returned as 'pending' or 'flagged' (meaning a real API call or rate limit happened),
     # or if we want to ensure any 'flagged' status gets an AI re-pass in background:
     if mod_result["status"] in ["flagged", "pending"] and mod_result["category"] != "safe":
          background_tasks.add_task(process_post_moderation, str(result.inserted_id))
+    if post.image_url:
+        background_tasks.add_task(process_post_images, str(result.inserted_id))
     
     doc["id"] = str(result.inserted_id)
 
@@ -128,7 +129,7 @@ def get_feed(user_id: str | None = None, limit: int = 15, skip: int = 0):
     author_ids = list(set(ObjectId(p["user_id"]) for p in posts_list if p.get("user_id") and p["user_id"] != "system"))
     authors_map = {}
     if author_ids:
-        authors = db.users.find({"_id": {"$in": author_ids}}, {"profile_pic": 1, "full_name": 1})
+        authors = db.users.find({"_id": {"$in": author_ids}}, {"profile_pic": 1, "profile_pic_variants": 1, "full_name": 1})
         authors_map = {str(a["_id"]): a for a in authors}
 
     # Get all post IDs for stats
@@ -165,6 +166,7 @@ def get_feed(user_id: str | None = None, limit: int = 15, skip: int = 0):
         author = authors_map.get(uid)
         if author:
             doc["author_profile_pic"] = author.get("profile_pic")
+            doc["author_profile_pic_thumb"] = (author.get("profile_pic_variants") or {}).get("avatar_webp")
             if not doc.get("author_name"): # Use DB name if missing in post doc
                  doc["author_name"] = author.get("full_name", "Bodham User")
         
@@ -187,6 +189,7 @@ def get_my_posts(user_id: str):
     # Fetch user for profile pic
     user = db.users.find_one({"_id": ObjectId(user_id)})
     profile_pic = user.get("profile_pic") if user else None
+    profile_pic_thumb = ((user or {}).get("profile_pic_variants") or {}).get("avatar_webp")
 
     # Sort by newest first
     combined_posts.sort(key=lambda x: x.get("created_at", ""), reverse=True)
@@ -219,6 +222,7 @@ def get_my_posts(user_id: str):
         pid = str(doc["_id"])
         doc["id"] = pid
         doc["author_profile_pic"] = profile_pic
+        doc["author_profile_pic_thumb"] = profile_pic_thumb
         doc["likes_count"] = likes_counts.get(pid, 0)
         doc["comments_count"] = comments_counts.get(pid, 0)
         doc["is_liked_by_me"] = pid in my_likes
@@ -233,10 +237,12 @@ def delete_post(post_id: str, user_id: str):
         raise HTTPException(status_code=503, detail="Database connection not established")
     
     # Attempt deletion in single collection
-    result = db.posts.delete_one({"_id": ObjectId(post_id), "user_id": user_id})
+    deleted = db.posts.find_one_and_delete({"_id": ObjectId(post_id), "user_id": user_id}, {"status": 1})
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Post not found or unauthorized")
+    status_changed(db, "posts", deleted.get("status"), None)
+    invalidate(f"profile:{user_id}")
     
     return {"message": "Post deleted"}
 
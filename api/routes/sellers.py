@@ -9,6 +9,9 @@ import string
 import os
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 from datetime import datetime, timedelta
+from services.images import process_product_images
+from services.admin_stats import user_created
+from services.response_cache import invalidate
 
 router = APIRouter(prefix="/sellers", tags=["sellers"])
 
@@ -130,13 +133,14 @@ async def verify_seller_otp(data: SellerOTPVerify):
         update_doc["password_hash"] = seller_data["password_hash"]
         update_doc["created_at"] = datetime.utcnow().isoformat()
         db.users.insert_one(update_doc)
+        user_created(db, update_doc)
     
     db.seller_registrations.delete_one({"email": data.email})
     return {"message": "Seller registration successful. Please wait for admin approval."}
 
 # Product Management
 @router.post("/products", response_model=ProductResponse)
-async def add_product(data: ProductCreate, seller_id: str):
+async def add_product(data: ProductCreate, seller_id: str, background_tasks: BackgroundTasks):
     db = get_db()
     try:
         oid = ObjectId(seller_id)
@@ -158,6 +162,8 @@ async def add_product(data: ProductCreate, seller_id: str):
     
     result = db.products.insert_one(product_doc)
     product_doc["id"] = str(result.inserted_id)
+    invalidate("marketplace")
+    background_tasks.add_task(process_product_images, product_doc["id"])
     return product_doc
 
 @router.get("/products", response_model=list[ProductResponse])
@@ -169,7 +175,7 @@ async def get_seller_products(seller_id: str):
     return products
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
-async def update_product(product_id: str, data: ProductCreate, seller_id: str):
+async def update_product(product_id: str, data: ProductCreate, seller_id: str, background_tasks: BackgroundTasks):
     db = get_db()
     try:
         pid = ObjectId(product_id)
@@ -180,7 +186,12 @@ async def update_product(product_id: str, data: ProductCreate, seller_id: str):
     if not product or product["seller_id"] != seller_id:
         raise HTTPException(status_code=403, detail="You can only edit your own products")
     
-    db.products.update_one({"_id": pid}, {"$set": data.dict()})
+    updates = data.dict()
+    if data.images != product.get("images"):
+        updates["image_variants"] = []
+        background_tasks.add_task(process_product_images, product_id)
+    db.products.update_one({"_id": pid}, {"$set": updates})
+    invalidate("marketplace")
     updated = db.products.find_one({"_id": pid})
     updated["id"] = str(updated["_id"])
     return updated
@@ -198,4 +209,5 @@ async def delete_product(product_id: str, seller_id: str):
         raise HTTPException(status_code=403, detail="You can only delete your own products")
     
     db.products.delete_one({"_id": pid})
+    invalidate("marketplace")
     return {"message": "Product deleted"}
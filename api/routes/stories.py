@@ -4,6 +4,7 @@ from database import get_db
 from models import CommunityStory, CommunityStoryCreate
 from bson import ObjectId
 from datetime import datetime
+from services.response_cache import invalidate
 
 router = APIRouter()
 
@@ -52,5 +53,6 @@ async def create_story(story: CommunityStoryCreate):
     new_story["created_at"] = datetime.utcnow().isoformat()
     
     result = db.community_stories.insert_one(new_story)
+    invalidate("community-stories")
     created_story = db.community_stories.find_one({"_id": result.inserted_id})
     return story_helper(created_story)
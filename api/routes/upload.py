@@ -1,10 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Request, BackgroundTasks
+from pymongo import ReturnDocument
 import os
 import cloudinary
 import cloudinary.uploader
-from config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET, DB_NAME
-from database import get_client
+from config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+from database import get_db
 from datetime import datetime
+from services.video_repository import VideoRepository, new_video_doc
+from services.storage import store_upload, public_url, content_type_for
+from services.images import generate_derivatives
+from services.video_media import process_video_media
+from starlette.concurrency import run_in_threadpool
+from services.video_upload import (
+    CHUNK_SIZE, upload_file_in_chunks, create_session, get_session, session_progress,
+    append_chunk, verify_upload_signature, is_upload_url
+)
 
 router = APIRouter(tags=["upload"])
 
@@ -50,7 +60,7 @@ def get_upload_signature(folder: str = "MindRise_Videos"):
     }
 
 @router.post("/upload-video/register")
-async def register_video(payload: dict):
+async def register_video(payload: dict, background_tasks: BackgroundTasks):
     video_url = payload.get("video_url")
     user_id = payload.get("user_id")
     author_name = payload.get("author_name", "MindRise User")
@@ -58,33 +68,30 @@ async def register_video(payload: dict):
     
     if not video_url or not user_id:
         raise HTTPException(status_code=400, detail="Missing video_url or user_id")
+
+    # Verify the direct upload before trusting the URL: either the signed
+    # response from Cloudinary (and the URL must be that upload's), or at
+    # least that it lives in our cloud
+    public_id, version, signature = payload.get("public_id"), payload.get("version"), payload.get("signature")
+    if signature:
+        configure_cloudinary()
+        if not (public_id and version and verify_upload_signature(public_id, version, signature)):
+            raise HTTPException(status_code=400, detail="Invalid upload signature")
+        if not is_upload_url(video_url, CLOUDINARY_CLOUD_NAME, public_id, version):
+            raise HTTPException(status_code=400, detail="video_url does not match the signed upload")
+    elif CLOUDINARY_CLOUD_NAME and not video_url.startswith(f"https://res.cloudinary.com/{CLOUDINARY_CLOUD_NAME}/"):
+        raise HTTPException(status_code=400, detail="video_url is not a Cloudinary upload for this app")
     
-    client = get_client()
-    db = client[DB_NAME]
-    collection = db["user_videos"]
-    
-    record = {
-        "user_id": user_id,
-        "author_name": author_name,
-        "video_url": video_url,
-        "caption": caption,
-        "status": "Pending",
-        "created_at": datetime.utcnow()
-    }
-    
-    result = collection.insert_one(record)
+    record = new_video_doc(user_id, video_url, author_name=author_name, caption=caption)
+    video_id = VideoRepository(get_db()).insert(record)
+    background_tasks.add_task(process_video_media, video_id)
     
     return {
         "success": True,
-        "videoId": str(result.inserted_id)
+        "videoId": video_id
     }
 
-@router.post("/upload-video")
-async def upload_video(
-    file: UploadFile = File(...),
-    user_id: str = Form(...),
-    caption: str = Form("")
-):
+def require_cloudinary():
     missing_keys = []
     if not CLOUDINARY_CLOUD_NAME: missing_keys.append("CLOUDINARY_CLOUD_NAME")
     if not CLOUDINARY_API_KEY: missing_keys.append("CLOUDINARY_API_KEY")
@@ -99,36 +106,99 @@ async def upload_video(
     
     # Re-verify config in case env vars were set but not used at module load
     configure_cloudinary()
+
+@router.post("/upload-video/sessions")
+def create_upload_session(payload: dict):
+    """Start a resumable server-side upload; chunks go to PUT .../chunk."""
+    user_id = payload.get("user_id")
+    total_size = payload.get("total_size")
+    if not user_id or not isinstance(total_size, int) or total_size <= 0:
+        raise HTTPException(status_code=400, detail="Missing user_id or total_size")
+    require_cloudinary()
+
+    db = get_db()
+    session = create_session(db, user_id, payload.get("filename"), total_size, payload.get("caption", ""))
+    return session_progress(session)
+
+@router.get("/upload-video/sessions/{session_id}")
+def get_upload_session(session_id: str):
+    db = get_db()
+    session = get_session(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session_progress(session)
+
+@router.put("/upload-video/sessions/{session_id}/chunk")
+async def upload_session_chunk(session_id: str, offset: int, request: Request, background_tasks: BackgroundTasks):
+    """Append one chunk (raw request body) starting at `offset`.
+
+    Chunks must be CHUNK_SIZE bytes except the last. A 409 returns the
+    session's current offset so the client can resume from there.
+    """
+    db = get_db()
+    session = get_session(db, session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session["status"] != "uploading":
+        return session_progress(session)
+    if offset != session["bytes_received"]:
+        raise HTTPException(status_code=409, detail=session_progress(session))
+
+    chunk = await request.body()
+    is_last = offset + len(chunk) >= session["total_size"]
+    if not chunk or offset + len(chunk) > session["total_size"] or (not is_last and len(chunk) < CHUNK_SIZE):
+        raise HTTPException(status_code=400, detail="Invalid chunk size")
+
+    require_cloudinary()
+    try:
+        session, result = await append_chunk(db, session, offset, chunk)
+    except Exception as e:
+        print(f"Cloudinary Chunk Error: {e}")
+        raise HTTPException(status_code=502, detail=f"Could not upload chunk: {str(e)}")
+    if session is None:
+        # Another request advanced the session first
+        raise HTTPException(status_code=409, detail=session_progress(get_session(db, session_id)))
+
+    if is_last:
+        video_url = result.get("secure_url")
+        record = new_video_doc(session["user_id"], video_url, caption=session.get("caption", ""))
+        video_id = VideoRepository(db).insert(record)
+        background_tasks.add_task(process_video_media, video_id, result)
+        session = db.upload_sessions.find_one_and_update(
+            {"_id": session["_id"]},
+            {"$set": {"status": "completed", "video_url": video_url, "video_id": video_id}},
+            return_document=ReturnDocument.AFTER
+        )
+    return session_progress(session)
+
+@router.post("/upload-video")
+async def upload_video(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    user_id: str = Form(...),
+    caption: str = Form("")
+):
+    # Direct signed uploads (GET /upload/signature, then /upload-video/register)
+    # are preferred; this path streams the spooled file to Cloudinary in chunks
+    # from a worker thread so the event loop never blocks on the transfer.
+    require_cloudinary()
     
     try:
         # 1. Upload to Cloudinary -> MindRise_Videos folder
-        upload_result = cloudinary.uploader.upload(
-            file.file,
-            folder="MindRise_Videos",
-            resource_type="video"
-        )
+        upload_result = await upload_file_in_chunks(file.file, file.filename or "stream")
         
         video_url = upload_result.get("secure_url")
         
-        # 2. Store in MindRiseDB.user_videos
-        client = get_client()
-        db = client[DB_NAME]
-        collection = db["user_videos"]
-        
-        record = {
-            "user_id": user_id,
-            "video_url": video_url,
-            "caption": caption,
-            "status": "Pending",
-            "created_at": datetime.utcnow()
-        }
-        
-        result = collection.insert_one(record)
+        # 2. Store in user_videos
+        record = new_video_doc(user_id, video_url, caption=caption)
+        video_id = VideoRepository(get_db()).insert(record)
+        # The upload result already carries duration and dimensions
+        background_tasks.add_task(process_video_media, video_id, upload_result)
         
         return {
             "success": True,
             "videoUrl": video_url,
-            "videoId": str(result.inserted_id)
+            "videoId": video_id
         }
     except Exception as e:
         print(f"Cloudinary Upload Error: {e}")
@@ -136,25 +206,16 @@ async def upload_video(
 
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
-    # Keep original logic for generic files (like profile pics/images for now)
-    import shutil
-    import uuid
-    
-    if os.getenv("VERCEL"):
-        UPLOAD_DIR = "/tmp/uploads"
-    else:
-        UPLOAD_DIR = "uploads"
-        
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-    
+    # Generic files (profile pics/images) go to content-addressed storage;
+    # identical uploads resolve to the same key and are stored once
     try:
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, unique_filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        return {"url": f"/static/{unique_filename}"}
+        key = await store_upload(file)
+        variants = {}
+        if content_type_for(key).startswith("image/"):
+            # Cached by content hash, so re-uploads skip the encode
+            variants = await run_in_threadpool(generate_derivatives, key)
+        return {"url": public_url(key), "variants": variants}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not upload file: {str(e)}")
@@ -73,6 +73,7 @@ async def get_public_profile(user_id: str, current_user_id: str = None):
             "author_name": p.get("author_name", user_data.full_name),
             "content": p.get("content", ""),
             "image_url": p.get("image_url"),
+            "image_variants": p.get("image_variants") or {},
             "video_url": p.get("video_url"),
             "status": p.get("status", "approved"),
             "created_at": p.get("created_at"),
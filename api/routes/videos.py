@@ -1,222 +1,192 @@
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, BackgroundTasks
 from database import get_db
-from models import VideoCreate, VideoResponse
-from config import DB_NAME
+from models import VideoCreate, VideoResponse, CommentCreate, CommentResponse
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
+from services.notifications import notify, notify_like
+from services.counters import increment
+from services.video_repository import VideoRepository, new_video_doc, normalize_status
+from services.video_media import process_video_media
+from services.ranking import encode_cursor
+from services.moderation_log import record
 
 router = APIRouter(prefix="/videos", tags=["videos"])
 
-@router.get("/", response_model=list[VideoResponse])
-def get_all_videos(limit: int = 10, skip: int = 0):
-    from database import get_client
-    client = get_client()
-    if client is None:
+def get_videos_repo() -> VideoRepository:
+    db = get_db()
+    if db is None:
         raise HTTPException(status_code=503, detail="Database connection not established")
-    
-    db_mindrise = get_db()
-    db_videos = client[DB_NAME]
-    
-    # 1. Fetch approved videos with pagination
-    videos_cursor = db_videos.user_videos.find({"status": "approved"}).sort("created_at", -1).skip(skip).limit(limit)
-    videos_list = list(videos_cursor)
-    
-    if not videos_list:
-        return []
-
-    # 2. BULK FETCH Authors
-    author_ids = list(set(ObjectId(v["user_id"]) for v in videos_list if v.get("user_id") and v["user_id"] != "system"))
-    authors_map = {}
-    if author_ids:
-        authors = db_mindrise.users.find({"_id": {"$in": author_ids}}, {"profile_pic": 1, "full_name": 1, "email": 1})
-        authors_map = {str(a["_id"]): a for a in authors}
+    return VideoRepository(db)
 
-    # 3. Assembly
-    results = []
-    for doc in videos_list:
-        doc["id"] = str(doc["_id"])
-        uid = doc.get("user_id")
-        
-        # Populate author data from map
-        author = authors_map.get(uid)
-        if author:
-            doc["author_name"] = author.get("full_name") or author.get("email") or "Bodham User"
-            doc["author_email"] = author.get("email")
-        elif "author_name" not in doc:
-            doc["author_name"] = "Bodham User"
-            
-        if "title" not in doc: doc["title"] = "Inspirational Moment"
-        if "caption" not in doc: doc["caption"] = ""
-        
-        doc["status"] = doc.get("status", "approved").lower()
-
-        if isinstance(doc.get("created_at"), datetime):
-            doc["created_at"] = doc["created_at"].isoformat()
-        elif "created_at" not in doc:
-            doc["created_at"] = datetime.utcnow().isoformat()
-            
-        results.append(doc)
+@router.get("/", response_model=list[VideoResponse])
+def get_all_videos(limit: int = 10, skip: int = 0, user_id: str | None = None):
+    repo = get_videos_repo()
+    return repo.hydrate(repo.latest(limit, skip), viewer_id=user_id)
+
+@router.get("/for-you", response_model=list[VideoResponse])
+def get_for_you_videos(limit: int = Query(10, ge=1, le=50), cursor: str | None = None, user_id: str | None = None):
+    """Approved videos by precomputed rank score (see services.ranking).
+
+    Each item carries `feed_cursor`; pass the last one as `cursor` for the next page.
+    """
+    repo = get_videos_repo()
+    try:
+        videos_list = repo.ranked(limit, cursor)
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    cursors = [encode_cursor(doc) for doc in videos_list]
+    results = repo.hydrate(videos_list, viewer_id=user_id)
+    for video, cursor_value in zip(results, cursors):
+        video["feed_cursor"] = cursor_value
     return results
 
 @router.post("/", response_model=VideoResponse)
-def create_video(video: VideoCreate):
-    from database import get_client
-    client = get_client()
-    db = client[DB_NAME]
-    
-    doc = {
-        "user_id": video.user_id,
-        "author_name": video.author_name,
-        "title": video.title,
-        "video_url": video.video_url,
-        "status": "pending",
-        "created_at": datetime.utcnow().isoformat(),
-        "rejection_reason": None
-    }
-    
-    result = db.user_videos.insert_one(doc)
-    doc["id"] = str(result.inserted_id)
+def create_video(video: VideoCreate, background_tasks: BackgroundTasks):
+    repo = get_videos_repo()
+    doc = new_video_doc(video.user_id, video.video_url, author_name=video.author_name,
+                        title=video.title, caption=video.caption)
+    video_id = repo.insert(doc)
+    background_tasks.add_task(process_video_media, video_id)
 
     # Update Activity/Streak
     from services.activity import update_last_active
     update_last_active(video.user_id)
 
-    return doc
+    return repo.hydrate([doc], author={})[0]
 
 @router.get("/my", response_model=list[VideoResponse])
 def get_my_videos(user_id: str):
-    from database import get_client
-    client = get_client()
-    db_mindrise = get_db()
-    db_videos = client[DB_NAME]
-    
+    repo = get_videos_repo()
     # Return all videos for the user from the single collection
-    videos_list = list(db_videos.user_videos.find({"user_id": user_id}).sort("created_at", -1))
-    
-    # Fetch author once
-    user_doc = db_mindrise.users.find_one({"_id": ObjectId(user_id)})
-    author_name = "Bodham User"
-    author_email = None
-    if user_doc:
-        author_name = user_doc.get("full_name") or user_doc.get("email") or "Bodham User"
-        author_email = user_doc.get("email")
-
-    results = []
-    for doc in videos_list:
-        doc["id"] = str(doc["_id"])
-        doc["author_name"] = author_name
-        doc["author_email"] = author_email
-
-        # Ensure status is lowercase for frontend compatibility
-        doc["status"] = doc.get("status", "pending").lower()
-            
-        if isinstance(doc.get("created_at"), datetime):
-            doc["created_at"] = doc["created_at"].isoformat()
-        elif "created_at" not in doc:
-            doc["created_at"] = datetime.utcnow().isoformat()
-            
-        results.append(doc)
-    return results
+    author = repo.db.users.find_one({"_id": ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+    return repo.hydrate(repo.by_user(user_id), author=author or {})
 
 @router.get("/user/{user_id}", response_model=list[VideoResponse])
 def get_user_videos(user_id: str):
-    from database import get_client
-    client = get_client()
-    db_mindrise = get_db()
-    db_videos = client[DB_NAME]
-    
+    repo = get_videos_repo()
     # Return only approved videos for the profile view
-    videos_list = list(db_videos.user_videos.find({
-        "user_id": user_id, 
-        "status": "approved"
-    }).sort("created_at", -1))
-    
-    # Fetch author once
-    user_doc = db_mindrise.users.find_one({"_id": ObjectId(user_id)})
-    author_name = "Bodham User"
-    author_email = None
-    if user_doc:
-        author_name = user_doc.get("full_name") or user_doc.get("email") or "Bodham User"
-        author_email = user_doc.get("email")
+    author = repo.db.users.find_one({"_id": ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+    return repo.hydrate(repo.by_user(user_id, approved_only=True), author=author or {})
+
+@router.post("/{video_id}/view")
+def record_view(video_id: str):
+    # Buffered: views are flushed as batched $inc writes, not one write per view
+    if not ObjectId.is_valid(video_id):
+        raise HTTPException(status_code=400, detail="Invalid Video ID")
+    increment("user_videos", video_id, "view_count")
+    return {"message": "View recorded"}
+
+@router.post("/{video_id}/like")
+def toggle_video_like(video_id: str, user_id: str = Body(..., embed=True)):
+    repo = get_videos_repo()
+    video = repo.get(video_id, {"user_id": 1})
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    # The unique (video_id, user_id) index makes the toggle safe under double taps
+    if repo.unlike(video_id, user_id):
+        return {"message": "Video unliked", "is_liked": False}
+
+    if repo.like(video_id, user_id) and video["user_id"] != user_id and ObjectId.is_valid(user_id):
+        liker = repo.db.users.find_one({"_id": ObjectId(user_id)}, {"full_name": 1, "email": 1}) or {}
+        notify_like(repo.db, video["user_id"], video_id, user_id, liker.get("full_name") or liker.get("email", "Someone"),
+                    target="video")
+    return {"message": "Video liked", "is_liked": True}
+
+@router.get("/{video_id}/comments", response_model=list[CommentResponse])
+def get_video_comments(video_id: str, limit: int = Query(50, ge=1, le=200), skip: int = 0):
+    db = get_db()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database connection not established")
+
+    comments = list(db.video_comments.find({"video_id": video_id}).sort("created_at", 1).skip(skip).limit(limit))
+    author_ids = list(set(ObjectId(c["user_id"]) for c in comments if ObjectId.is_valid(c.get("user_id"))))
+    authors_map = {}
+    if author_ids:
+        authors = db.users.find({"_id": {"$in": author_ids}}, {"full_name": 1, "email": 1, "profile_pic": 1})
+        authors_map = {str(a["_id"]): a for a in authors}
 
     results = []
-    for doc in videos_list:
-        doc["id"] = str(doc["_id"])
-        doc["author_name"] = author_name
-        doc["author_email"] = author_email
-        doc["status"] = "approved"
-        
-        if isinstance(doc.get("created_at"), datetime):
-            doc["created_at"] = doc["created_at"].isoformat()
-        elif "created_at" not in doc:
-            doc["created_at"] = datetime.utcnow().isoformat()
-            
-        results.append(doc)
+    for doc in comments:
+        author = authors_map.get(doc["user_id"])
+        results.append(CommentResponse(
+            id=str(doc["_id"]),
+            user_id=doc["user_id"],
+            author_name=author.get("full_name") or author.get("email", "Unknown") if author else "Unknown",
+            author_profile_pic=author.get("profile_pic") if author else None,
+            content=doc["content"],
+            created_at=doc["created_at"].isoformat()
+        ))
     return results
 
+@router.post("/{video_id}/comments", response_model=CommentResponse)
+def add_video_comment(video_id: str, comment: CommentCreate, user_id: str = Body(..., embed=True)):
+    repo = get_videos_repo()
+    db = repo.db
+    video = repo.get(video_id, {"user_id": 1})
+    if not video:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    doc = {"video_id": video_id, "user_id": user_id, "content": comment.content, "created_at": datetime.utcnow()}
+    result = db.video_comments.insert_one(doc)
+    repo.increment_stat(video_id, "comment_count", 1)
+
+    author = db.users.find_one({"_id": ObjectId(user_id)}) if ObjectId.is_valid(user_id) else None
+    if video["user_id"] != user_id:
+        name = (author or {}).get("full_name") or (author or {}).get("email", "Someone")
+        notify(db, video["user_id"], "comment", f"{name} commented on your video",
+               sender_id=user_id, post_id=video_id)
+
+    return CommentResponse(
+        id=str(result.inserted_id),
+        user_id=user_id,
+        author_name=author.get("full_name") or author.get("email", "Unknown") if author else "Unknown",
+        author_profile_pic=author.get("profile_pic") if author else None,
+        content=comment.content,
+        created_at=doc["created_at"].isoformat()
+    )
+
 @router.delete("/{video_id}")
 def delete_video(video_id: str, user_id: str):
-    from database import get_client
-    client = get_client()
-    db = client[DB_NAME]
-    
-    result = db.user_videos.delete_one({"_id": ObjectId(video_id), "user_id": user_id})
-    
-    if result.deleted_count == 0:
+    if not get_videos_repo().delete_owned(video_id, user_id):
         raise HTTPException(status_code=404, detail="Video not found or unauthorized")
-    
+
     return {"message": "Video deleted"}
 
 @router.get("/{video_id}/status")
 def get_video_status(video_id: str):
-    from database import get_client
-    client = get_client()
-    db = client[DB_NAME]
-    
-    video = db.user_videos.find_one({"_id": ObjectId(video_id)})
+    video = get_videos_repo().get(video_id, {"status": 1, "rejection_reason": 1})
     if video:
-        return {"status": video.get("status", "pending").lower(), "rejection_reason": video.get("rejection_reason")}
-    
+        return {"status": normalize_status(video.get("status")), "rejection_reason": video.get("rejection_reason")}
+
     raise HTTPException(status_code=404, detail="Video not found")
 @router.post("/{video_id}/report")
 def report_video(video_id: str, user_id: str = Body(..., embed=True)):
-    from database import get_client
-    client = get_client()
-    db_mindrise = get_db()
-    db_videos = client[DB_NAME]
-    
-    try:
-        vid = ObjectId(video_id)
-    except:
+    repo = get_videos_repo()
+    if not ObjectId.is_valid(video_id):
         raise HTTPException(status_code=400, detail="Invalid Video ID")
 
     # 1. Find the video
-    video = db_videos.user_videos.find_one({"_id": vid})
+    video = repo.get(video_id, {"user_id": 1, "status": 1})
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    
-    if video.get("status") == "rejected":
+
+    if normalize_status(video.get("status")) == "rejected":
         return {"message": "Video already reported or removed"}
 
     # 2. Update status and set rejection reason
     timestamp = datetime.utcnow().isoformat()
-    db_videos.user_videos.update_one(
-        {"_id": vid},
-        {"$set": {
-            "status": "rejected",
-            "rejection_reason": "The post has been deleted for violating the app's guidelines",
-            "moderated_at": timestamp,
-            "moderation_source": "automatic_report_v2"
-        }}
-    )
-    
+    repo.set_status(video_id, "rejected",
+                    rejection_reason="The post has been deleted for violating the app's guidelines",
+                    moderated_at=timestamp,
+                    moderation_source="automatic_report_v2")
+    record(repo.db, "video", video_id, "Reported: rejected", "USER_REPORT", status="rejected",
+           reason="Reported by user", reporter_id=user_id, source="automatic_report_v2")
+
     # 3. Notify owner
-    db_mindrise.notifications.insert_one({
-        "user_id": video["user_id"],
-        "message": "The post has been deleted for violating the app's guidelines",
-        "type": "system_violation",
-        "post_id": video_id,
-        "created_at": datetime.utcnow()
-    })
-    
+    notify(repo.db, video["user_id"], "system_violation",
+           "The post has been deleted for violating the app's guidelines", post_id=video_id)
+
     return {"message": "Video reported and removed from public view"}
@@ -1,39 +1,169 @@
-from datetime import datetime, timedelta
-from database import get_db
+"""Buffered last-active and streak tracking.
+
+`update_last_active` runs on every feed load, post, video, journal and login,
+so it only records the touch in memory. Touches are coalesced per user and
+flushed as one `bulk_write` every FLUSH_INTERVAL seconds, and each flushed
+touch is a single conditional update pipeline (no read first). The same
+flush records each user-day in the activity ledger (see services.analytics).
+
+Both writes are idempotent, so touches that fail to write are merged back
+into the buffer and retried on the next flush, up to MAX_RETRIES times.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, date
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import get_db
+from services.analytics import record_activity
+
+FLUSH_INTERVAL = 30  # seconds between flushes
+MIN_TOUCH_INTERVAL = 300  # a user's activity is recorded at most once per 5 minutes (plus once per new day)
+MAX_RETRIES = 3  # flushes a failed touch is retried in before it's dropped
+
+_lock = threading.Lock()
+_pending: dict[str, dict] = {}  # user_id -> {"last_active": datetime, "days": [iso dates]}
+_last_recorded: dict[str, tuple[str, float]] = {}  # user_id -> (day, monotonic time)
+_attempts: dict[str, int] = {}  # user_id -> failed flushes so far
+_last_flush = time.monotonic()
+_flusher: threading.Thread | None = None
+
+
+def streak_update(day: str, last_active_at: str) -> list[dict]:
+    """Update pipeline applying one day of activity to a user's streak."""
+    yesterday = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+    return [{"$set": {
+        "streak_count": {"$switch": {
+            "branches": [
+                # Already counted today, or a late flush for an older day
+                {"case": {"$gte": ["$last_streak_date", day]}, "then": {"$ifNull": ["$streak_count", 1]}},
+                {"case": {"$eq": ["$last_streak_date", yesterday]},
+                 "then": {"$add": [{"$ifNull": ["$streak_count", 0]}, 1]}}
+            ],
+            "default": 1
+        }},
+        "last_streak_date": {"$max": ["$last_streak_date", day]},
+        "last_active_at": {"$max": ["$last_active_at", last_active_at]}
+    }}]
+
 
 def update_last_active(user_id: str):
-    """Updates the last_active_at timestamp and daily streak for a user."""
+    """Record activity for a user; written to the DB on the next flush."""
+    if not user_id:
+        return
+    now = datetime.utcnow()
+    today = now.date().isoformat()
+    mono = time.monotonic()
+
+    with _lock:
+        seen = _last_recorded.get(user_id)
+        if not seen or seen[0] != today or mono - seen[1] >= MIN_TOUCH_INTERVAL:
+            _last_recorded[user_id] = (today, mono)
+            entry = _pending.setdefault(user_id, {"days": []})
+            entry["last_active"] = now
+            if today not in entry["days"]:
+                entry["days"].append(today)
+        due = mono - _last_flush >= FLUSH_INTERVAL
+
+    # Serverless instances may never run the background flusher, so requests
+    # also flush once the interval has passed
+    if due:
+        flush_activity()
+
+
+def flush_activity() -> int:
+    """Write all buffered activity in one bulk_write. Returns the number of updates."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, {}
+        _last_flush = mono = time.monotonic()
+        # Forget throttle entries that can no longer suppress a write
+        for uid in [uid for uid, (_, t) in _last_recorded.items() if mono - t >= MIN_TOUCH_INTERVAL]:
+            del _last_recorded[uid]
+
+    if not pending:
+        return 0
+
+    ops = []
+    owners = []
+    touches = []
+    for user_id, entry in pending.items():
+        if not ObjectId.is_valid(user_id):
+            continue
+        last_active_at = entry["last_active"].isoformat()
+        for day in sorted(entry["days"]):
+            ops.append(UpdateOne({"_id": ObjectId(user_id)}, streak_update(day, last_active_at)))
+            owners.append(user_id)
+            touches.append((user_id, day))
+    if not ops:
+        return 0
+
+    failed = {}
     try:
         db = get_db()
-        if db is not None:
-            user = db.users.find_one({"_id": ObjectId(user_id)})
-            if not user:
-                return
-
-            now = datetime.utcnow()
-            today_str = now.date().isoformat()
-            
-            updates = {"last_active_at": now.isoformat()}
-            
-            # Streak Logic
-            last_streak_date = user.get("last_streak_date")
-            current_streak = user.get("streak_count", 0)
-            
-            if last_streak_date != today_str:
-                # If last active was yesterday, increment streak
-                yesterday_str = (now.date() - timedelta(days=1)).isoformat()
-                
-                if last_streak_date == yesterday_str:
-                    updates["streak_count"] = current_streak + 1
-                else:
-                    updates["streak_count"] = 1
-                
-                updates["last_streak_date"] = today_str
-
-            db.users.update_one(
-                {"_id": ObjectId(user_id)},
-                {"$set": updates}
-            )
+        if db is None:
+            failed = pending
+        else:
+            # Ordered so a user's days apply oldest first. A failed op stops
+            # the batch, so the rest is resubmitted without it.
+            start = 0
+            while start < len(ops):
+                try:
+                    db.users.bulk_write(ops[start:], ordered=True)
+                    break
+                except BulkWriteError as e:
+                    errors = e.details.get("writeErrors") or []
+                    if not errors:
+                        break  # write concern error only: the ops were applied
+                    index = start + errors[0]["index"]
+                    failed[owners[index]] = pending[owners[index]]
+                    start = index + 1
+            record_activity(db, touches)
     except Exception as e:
-        print(f"Failed to update activity for {user_id}: {e}")
+        print(f"Failed to flush activity for {len(pending)} users: {e}")
+        failed = pending
+
+    if failed:
+        _requeue(failed)
+    if _attempts:
+        with _lock:
+            for user_id in pending:
+                if user_id not in failed:
+                    _attempts.pop(user_id, None)
+    return len(ops)
+
+
+def _requeue(entries: dict[str, dict]):
+    """Merge touches that failed to write back into the buffer, dropping those out of retries."""
+    dropped = 0
+    with _lock:
+        for user_id, entry in entries.items():
+            attempts = _attempts.get(user_id, 0) + 1
+            if attempts > MAX_RETRIES:
+                _attempts.pop(user_id, None)
+                dropped += 1
+                continue
+            _attempts[user_id] = attempts
+            live = _pending.setdefault(user_id, {"days": []})
+            live["last_active"] = max(live.get("last_active", entry["last_active"]), entry["last_active"])
+            live["days"] = sorted(set(live["days"]) | set(entry["days"]))
+    if dropped:
+        print(f"Dropped activity for {dropped} users after {MAX_RETRIES} failed flushes")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush_activity()
+        except Exception as e:
+            print(f"Activity flusher error: {e}")
+
+
+def start_activity_flusher():
+    """Start the background flush thread (idempotent)."""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_flush_loop, name="activity-flusher", daemon=True)
+        _flusher.start()
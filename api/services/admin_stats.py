@@ -0,0 +1,98 @@
+"""Admin dashboard counters served from a cached snapshot.
+
+The dashboard numbers live in one `admin_stats` document. Write paths that
+change them (user signup, post/video creation, status changes, deletes) apply
+a `$inc` to the snapshot, and a reconciler recounts everything every
+RECONCILE_INTERVAL seconds to correct drift from writes that bypass those
+paths. Reading the stats is a single `find_one`, independent of collection
+size; `computed_at` says when the snapshot was last fully recounted.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+SNAPSHOT_ID = "dashboard"
+RECONCILE_INTERVAL = 300  # seconds between full recounts
+STALE_AFTER = timedelta(seconds=2 * RECONCILE_INTERVAL)
+
+# counter -> (collection, filter) used by the reconciler
+COUNTERS = {
+    "total_users": ("users", {}),
+    "email_users": ("users", {"email": {"$ne": None}}),
+    "mobile_users": ("users", {"mobile": {"$ne": None}}),
+    "pending_posts": ("posts", {"status": "pending"}),
+    "flagged_posts": ("posts", {"status": "flagged"}),
+    # Legacy spelling until migrate_video_fields has run
+    "pending_videos": ("user_videos", {"status": {"$in": ["pending", "Pending"]}}),
+}
+
+# (collection, status) -> counter kept in step with status transitions
+STATUS_COUNTERS = {
+    ("posts", "pending"): "pending_posts",
+    ("posts", "flagged"): "flagged_posts",
+    ("user_videos", "pending"): "pending_videos",
+}
+
+_reconciler: threading.Thread | None = None
+
+
+def adjust(db, **deltas: int):
+    """Apply counter deltas to the snapshot (no-op until the first reconcile creates it)."""
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        db.admin_stats.update_one({"_id": SNAPSHOT_ID}, {"$inc": deltas, "$set": {"updated_at": datetime.utcnow()}})
+
+
+def status_changed(db, collection: str, old: str | None, new: str | None):
+    """Record a document moving from status `old` to `new` (None = created/deleted)."""
+    if old == new:
+        return
+    deltas = {}
+    if (collection, old) in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[(collection, old)]] = -1
+    if (collection, new) in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[(collection, new)]] = deltas.get(STATUS_COUNTERS[(collection, new)], 0) + 1
+    adjust(db, **deltas)
+
+
+def user_created(db, doc: dict):
+    adjust(db, total_users=1, email_users=int(doc.get("email") is not None),
+           mobile_users=int(doc.get("mobile") is not None))
+
+
+def reconcile(db) -> dict:
+    """Recount every counter and replace the snapshot."""
+    now = datetime.utcnow()
+    snapshot = {name: db[coll].count_documents(query) for name, (coll, query) in COUNTERS.items()}
+    snapshot.update(computed_at=now, updated_at=now)
+    db.admin_stats.replace_one({"_id": SNAPSHOT_ID}, snapshot, upsert=True)
+    return snapshot
+
+
+def get_snapshot(db) -> dict:
+    return db.admin_stats.find_one({"_id": SNAPSHOT_ID}) or reconcile(db)
+
+
+def is_stale(snapshot: dict) -> bool:
+    computed_at = snapshot.get("computed_at")
+    return not computed_at or datetime.utcnow() - computed_at > STALE_AFTER
+
+
+def _reconcile_loop():
+    from database import get_db
+    while True:
+        try:
+            db = get_db()
+            if db is not None:
+                reconcile(db)
+        except Exception as e:
+            print(f"Admin stats reconciler error: {e}")
+        time.sleep(RECONCILE_INTERVAL)
+
+
+def start_stats_reconciler():
+    """Start the background reconcile thread (idempotent)."""
+    global _reconciler
+    if _reconciler is None or not _reconciler.is_alive():
+        _reconciler = threading.Thread(target=_reconcile_loop, name="admin-stats-reconciler", daemon=True)
+        _reconciler.start()
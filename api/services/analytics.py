@@ -0,0 +1,194 @@
+"""Activity ledger and engagement rollups.
+
+Every active user-day sets one bit in a compact per-user, per-month ledger
+document (`activity_ledger`, `_id` = "<user_id>:<YYYY-MM>", bit d-1 = day d).
+The first month a user is seen is kept in `activity_cohorts`. Streak repair,
+DAU/WAU/MAU and retention cohorts are computed from these two collections,
+so none of them scan `journals` or `posts`.
+"""
+from datetime import date, datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+
+DAILY_JOB_ID = "analytics_daily"
+RETENTION_JOB_ID = "analytics_retention"
+MAX_BACKFILL_DAYS = 400
+STREAK_LOOKBACK_MONTHS = 13
+
+
+def _month(d: date) -> str:
+    return d.strftime("%Y-%m")
+
+
+def ledger_ops(user_id: str, day: str) -> tuple[UpdateOne, UpdateOne]:
+    """(ledger, cohort) upserts recording that `user_id` was active on `day` (ISO date)."""
+    d = date.fromisoformat(day)
+    month = _month(d)
+    ledger = UpdateOne(
+        {"_id": f"{user_id}:{month}"},
+        {"$bit": {"days": {"or": 1 << (d.day - 1)}},
+         "$setOnInsert": {"user_id": user_id, "month": month}},
+        upsert=True
+    )
+    cohort = UpdateOne({"_id": user_id}, {"$min": {"cohort_month": month}}, upsert=True)
+    return ledger, cohort
+
+
+def record_activity(db, touches: list[tuple[str, str]]):
+    """Write (user_id, day) touches to the ledger in two bulk writes."""
+    if not touches:
+        return
+    ledger, cohorts = [], []
+    for user_id, day in touches:
+        l_op, c_op = ledger_ops(user_id, day)
+        ledger.append(l_op)
+        cohorts.append(c_op)
+    db.activity_ledger.bulk_write(ledger, ordered=False)
+    db.activity_cohorts.bulk_write(cohorts, ordered=False)
+
+
+def _range_filter(start: date, end: date) -> list[dict]:
+    """Ledger filters matching any activity between start and end (inclusive)."""
+    masks = {}
+    d = start
+    while d <= end:
+        masks[_month(d)] = masks.get(_month(d), 0) | (1 << (d.day - 1))
+        d += timedelta(days=1)
+    return [{"month": month, "days": {"$bitsAnySet": mask}} for month, mask in masks.items()]
+
+
+def active_users(db, start: date, end: date) -> int:
+    """Distinct users active between start and end (inclusive)."""
+    filters = _range_filter(start, end)
+    if len(filters) == 1:
+        return db.activity_ledger.count_documents(filters[0])
+    pipeline = [
+        {"$match": {"$or": filters}},
+        {"$group": {"_id": "$user_id"}},
+        {"$count": "n"}
+    ]
+    result = list(db.activity_ledger.aggregate(pipeline))
+    return result[0]["n"] if result else 0
+
+
+def rollup_daily(db, through: date | None = None) -> int:
+    """Compute DAU/WAU/MAU for every day since the last run. Returns days computed."""
+    through = through or datetime.utcnow().date()
+    state = db.job_state.find_one({"_id": DAILY_JOB_ID}) or {}
+    if state.get("last_day"):
+        # Re-run the last day: it may have been partial when last computed
+        start = date.fromisoformat(state["last_day"])
+    else:
+        first = db.activity_ledger.find_one({}, {"month": 1}, sort=[("month", 1)])
+        if not first:
+            return 0
+        start = max(date.fromisoformat(first["month"] + "-01"), through - timedelta(days=MAX_BACKFILL_DAYS))
+
+    ops = []
+    day = start
+    while day <= through:
+        ops.append(UpdateOne({"_id": day.isoformat()}, {"$set": {
+            "dau": active_users(db, day, day),
+            "wau": active_users(db, day - timedelta(days=6), day),
+            "mau": active_users(db, day - timedelta(days=29), day),
+            "computed_at": datetime.utcnow()
+        }}, upsert=True))
+        day += timedelta(days=1)
+
+    if ops:
+        db.analytics_daily.bulk_write(ops, ordered=False)
+    db.job_state.update_one({"_id": DAILY_JOB_ID}, {"$set": {"last_day": through.isoformat()}}, upsert=True)
+    return len(ops)
+
+
+def rollup_retention(db, through: date | None = None) -> int:
+    """Active users per (cohort month, activity month) for months since the last run."""
+    through_month = _month(through or datetime.utcnow().date())
+    state = db.job_state.find_one({"_id": RETENTION_JOB_ID}) or {}
+    months_query = {"month": {"$gte": state["last_month"], "$lte": through_month}} if state.get("last_month") \
+        else {"month": {"$lte": through_month}}
+    months = sorted(db.activity_ledger.distinct("month", months_query))
+
+    ops = []
+    for month in months:
+        pipeline = [
+            {"$match": {"month": month}},
+            {"$lookup": {"from": "activity_cohorts", "localField": "user_id", "foreignField": "_id", "as": "c"}},
+            {"$unwind": "$c"},
+            {"$group": {"_id": "$c.cohort_month", "active": {"$sum": 1}}}
+        ]
+        for row in db.activity_ledger.aggregate(pipeline):
+            cohort = row["_id"]
+            cy, cm = map(int, cohort.split("-"))
+            my, mm = map(int, month.split("-"))
+            ops.append(UpdateOne({"_id": f"{cohort}:{month}"}, {"$set": {
+                "cohort": cohort,
+                "month": month,
+                "offset": (my - cy) * 12 + (mm - cm),
+                "active": row["active"],
+                "computed_at": datetime.utcnow()
+            }}, upsert=True))
+
+    if ops:
+        db.analytics_retention.bulk_write(ops, ordered=False)
+    db.job_state.update_one({"_id": RETENTION_JOB_ID}, {"$set": {"last_month": through_month}}, upsert=True)
+    return len(ops)
+
+
+def compute_streak(db, user_id: str, today: date | None = None) -> tuple[int, str | None]:
+    """(streak_count, last_streak_date) for a user from their ledger bitmaps."""
+    today = today or datetime.utcnow().date()
+    bitmaps = {doc["month"]: doc.get("days", 0) for doc in db.activity_ledger.find(
+        {"user_id": user_id}, {"month": 1, "days": 1}
+    ).sort("month", -1).limit(STREAK_LOOKBACK_MONTHS)}
+
+    def active(d: date) -> bool:
+        return bool(bitmaps.get(_month(d), 0) & (1 << (d.day - 1)))
+
+    # A streak is still alive if the user hasn't been active yet today
+    day = today if active(today) else today - timedelta(days=1)
+    if not active(day):
+        return 0, None
+    last = day
+    streak = 0
+    while active(day):
+        streak += 1
+        day -= timedelta(days=1)
+    return streak, last.isoformat()
+
+
+def repair_streaks(db, user_ids: list[str]) -> int:
+    """Rewrite streak fields for the given users from the ledger."""
+    ops = []
+    for user_id in user_ids:
+        if not ObjectId.is_valid(user_id):
+            continue
+        streak, last = compute_streak(db, user_id)
+        ops.append(UpdateOne({"_id": ObjectId(user_id)},
+                             {"$set": {"streak_count": streak, "last_streak_date": last}}))
+    if ops:
+        db.users.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def backfill_ledger(db, batch_size: int = 1000) -> int:
+    """One-time seed of the ledger from existing journals and posts."""
+    touches = set()
+    written = 0
+    for collection in ("journals", "posts"):
+        for doc in db[collection].find({}, {"user_id": 1, "created_at": 1, "_id": 0}):
+            created_at = doc.get("created_at")
+            if isinstance(created_at, str):
+                try:
+                    created_at = datetime.fromisoformat(created_at)
+                except ValueError:
+                    continue
+            if not doc.get("user_id") or not isinstance(created_at, datetime):
+                continue
+            touches.add((doc["user_id"], created_at.date().isoformat()))
+            if len(touches) >= batch_size:
+                record_activity(db, list(touches))
+                written += len(touches)
+                touches.clear()
+    record_activity(db, list(touches))
+    return written + len(touches)
@@ -0,0 +1,124 @@
+"""Write-behind counter buffer for high-volume increments (video views).
+
+`increment` only adds to an in-memory tally. Tallies are coalesced per
+document and flushed as one `$inc` per document in a single unordered
+`bulk_write` every FLUSH_INTERVAL seconds (from a background thread, or from
+the next request once the interval has passed on serverless instances).
+Each flushed document also gets `stats_updated_at`, which the ranking job
+uses to find videos whose score may have changed.
+
+Increments whose write fails are merged back into the buffer and retried on
+the next flush, up to MAX_RETRIES times. A network error after the server
+applied a batch can therefore count it twice, and a crash loses at most one
+interval of buffered increments; both are accepted trade-offs for view counts.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import get_db
+
+FLUSH_INTERVAL = 10  # seconds between flushes
+MAX_RETRIES = 3  # flushes a failed increment is retried in before it's dropped
+
+_lock = threading.Lock()
+_pending: dict[str, dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))  # collection -> id -> field -> n
+_attempts: dict[tuple[str, str], int] = {}  # (collection, id) -> failed flushes so far
+_last_flush = time.monotonic()
+_flusher: threading.Thread | None = None
+
+
+def increment(collection: str, doc_id: str, field: str, amount: int = 1):
+    """Buffer `$inc: {field: amount}` for one document."""
+    if not ObjectId.is_valid(doc_id):
+        return
+    with _lock:
+        _pending[collection][doc_id][field] += amount
+        due = time.monotonic() - _last_flush >= FLUSH_INTERVAL
+    if due:
+        flush_counters()
+
+
+def pending_counts(collection: str, doc_ids) -> dict[str, Counter]:
+    """Buffered, not yet flushed increments for the given documents."""
+    with _lock:
+        buffered = _pending.get(collection, {})
+        return {doc_id: Counter(buffered[doc_id]) for doc_id in doc_ids if doc_id in buffered}
+
+
+def flush_counters() -> int:
+    """Write all buffered increments. Returns the number of documents updated."""
+    global _pending, _last_flush
+    with _lock:
+        pending, _pending = _pending, defaultdict(lambda: defaultdict(Counter))
+        _last_flush = time.monotonic()
+
+    if not pending:
+        return 0
+
+    now = datetime.utcnow()
+    written = 0
+    db = get_db()
+    for collection, docs in pending.items():
+        docs = {doc_id: fields for doc_id, fields in docs.items() if fields}
+        if not docs:
+            continue
+        ids = list(docs)
+        failed = ids
+        try:
+            if db is not None:
+                db[collection].bulk_write([
+                    UpdateOne({"_id": ObjectId(doc_id)}, {"$inc": dict(docs[doc_id]), "$set": {"stats_updated_at": now}})
+                    for doc_id in ids
+                ], ordered=False)
+                failed = []
+        except BulkWriteError as e:
+            # Unordered: everything but the reported ops was applied
+            failed = [ids[err["index"]] for err in e.details.get("writeErrors") or []]
+            print(f"Failed to flush counters for {len(failed)} {collection} documents: {e}")
+        except Exception as e:
+            print(f"Failed to flush counters for {len(ids)} {collection} documents: {e}")
+        written += len(ids) - len(failed)
+        _requeue(collection, {doc_id: docs[doc_id] for doc_id in failed}, ids)
+    return written
+
+
+def _requeue(collection: str, failed: dict[str, Counter], flushed: list[str]):
+    """Merge failed increments back into the buffer and reset retries for the rest."""
+    if not failed and not _attempts:
+        return
+    dropped = 0
+    with _lock:
+        for doc_id in flushed:
+            if doc_id not in failed:
+                _attempts.pop((collection, doc_id), None)
+        for doc_id, fields in failed.items():
+            key = (collection, doc_id)
+            _attempts[key] = _attempts.get(key, 0) + 1
+            if _attempts[key] > MAX_RETRIES:
+                del _attempts[key]
+                dropped += 1
+                continue
+            _pending[collection][doc_id].update(fields)
+    if dropped:
+        print(f"Dropped buffered counts for {dropped} {collection} documents after {MAX_RETRIES} failed flushes")
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush_counters()
+        except Exception as e:
+            print(f"Counter flusher error: {e}")
+
+
+def start_counter_flusher():
+    """Start the background flush thread (idempotent)."""
+    global _flusher
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_flush_loop, name="counter-flusher", daemon=True)
+        _flusher.start()
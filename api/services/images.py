@@ -0,0 +1,186 @@
+"""Image derivatives: fixed-width thumbnails in WebP (and AVIF when available).
+
+Feed cards, marketplace tiles and avatars only need a small image, so each
+distinct image gets derivatives keyed by the original's content hash
+(`<sha256>_<size>.<format>`), generated once and stored next to the upload.
+Cloudinary URLs need no local work: their variants are transformation URLs
+that Cloudinary renders and caches on its CDN.
+
+Variants are returned as a flat dict, e.g. {"thumb_webp": url, "card_avif": url}.
+"""
+import base64
+import binascii
+import io
+import os
+import re
+import tempfile
+from bson import ObjectId
+from config import MAX_UPLOAD_BYTES
+from services.storage import get_storage, store_bytes, read_bytes, is_durable, public_url
+from services.response_cache import invalidate
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError, features
+except ImportError:  # optional: without Pillow only Cloudinary variants are produced
+    Image = None
+
+DERIVATIVE_SIZES = {"avatar": 96, "thumb": 320, "card": 640}
+QUALITY = {"webp": 80, "avif": 60}
+MAX_SOURCE_PIXELS = 40_000_000
+
+_STATIC_KEY_RE = re.compile(r"(?:^|/)static/([0-9a-f]{64})(\.[a-z0-9]{1,10})?$")
+_DATA_URL_RE = re.compile(r"^data:image/([a-z0-9.+-]+);base64,", re.IGNORECASE)
+_CLOUDINARY_MARKER = "/image/upload/"
+
+
+def available_formats() -> tuple[str, ...]:
+    if Image is None:
+        return ()
+    return tuple(fmt for fmt in ("webp", "avif") if features.check(fmt))
+
+
+def derivative_key(digest: str, size: str, fmt: str) -> str:
+    return f"{digest}_{size}.{fmt}"
+
+
+def cloudinary_variants(url: str) -> dict[str, str]:
+    head, sep, tail = url.partition(_CLOUDINARY_MARKER)
+    if not sep or "res.cloudinary.com" not in head:
+        return {}
+    return {
+        f"{size}_{fmt}": f"{head}{sep}w_{width},c_limit,f_{fmt},q_auto/{tail}"
+        for size, width in DERIVATIVE_SIZES.items()
+        for fmt in ("webp", "avif")
+    }
+
+
+def _encode(img, width: int, fmt: str) -> bytes:
+    copy = img.copy()
+    if copy.width > width:
+        copy = copy.resize((width, max(1, round(copy.height * width / copy.width))), Image.LANCZOS)
+    buf = io.BytesIO()
+    copy.save(buf, format=fmt.upper(), quality=QUALITY[fmt])
+    return buf.getvalue()
+
+
+def generate_derivatives(key: str) -> dict[str, str]:
+    """Create any missing derivatives of a stored image and return all their URLs.
+
+    Blocking; call from a worker thread or background task. Returns {} if
+    Pillow is missing or the file isn't a decodable image.
+    """
+    formats = available_formats()
+    if not formats:
+        return {}
+    storage = get_storage()
+    digest = os.path.splitext(key)[0]
+    wanted = {(size, fmt): derivative_key(digest, size, fmt)
+              for size in DERIVATIVE_SIZES for fmt in formats}
+    missing = {k: dkey for k, dkey in wanted.items() if not storage.exists(dkey)}
+
+    if missing:
+        try:
+            img = Image.open(io.BytesIO(read_bytes(key)))
+            if img.width * img.height > MAX_SOURCE_PIXELS:
+                return {}
+            img = ImageOps.exif_transpose(img)
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        except (FileNotFoundError, UnidentifiedImageError, OSError, Image.DecompressionBombError):
+            return {}
+
+        for (size, fmt), dkey in missing.items():
+            data = _encode(img, DERIVATIVE_SIZES[size], fmt)
+            with tempfile.NamedTemporaryFile(dir=storage.temp_dir(), prefix=".upload-", delete=False) as tmp:
+                tmp.write(data)
+            storage.save(dkey, tmp.name)
+
+    return {f"{size}_{fmt}": public_url(dkey) for (size, fmt), dkey in wanted.items()}
+
+
+def _store_data_url(url: str) -> str | None:
+    match = _DATA_URL_RE.match(url)
+    if not match:
+        return None
+    try:
+        data = base64.b64decode(url[match.end():], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+    if not data or len(data) > MAX_UPLOAD_BYTES:
+        return None
+    subtype = match.group(1).lower()
+    ext = ".jpg" if subtype in ("jpeg", "pjpeg") else f".{subtype}" if subtype.isalnum() else ""
+    return store_bytes(data, ext)
+
+
+def stored_image(url: str | None) -> tuple[str | None, dict[str, str]]:
+    """(url, variants) for an image URL. Blocking.
+
+    Inline base64 images are stored content-addressed, unless the storage
+    would not outlive this instance, and come back as the stored original's
+    URL so documents can drop the data URL; other URLs are returned as is.
+    """
+    if not url:
+        return url, {}
+    if _CLOUDINARY_MARKER in url:
+        return url, cloudinary_variants(url)
+
+    match = _STATIC_KEY_RE.search(url.split("?", 1)[0])
+    if match:
+        key = match.group(1) + (match.group(2) or "")
+        return url, generate_derivatives(key) if get_storage().exists(key) else {}
+
+    if url.startswith("data:") and is_durable() and available_formats():
+        key = _store_data_url(url)
+        variants = generate_derivatives(key) if key else {}
+        if variants:
+            return public_url(key), variants
+    return url, {}
+
+
+def image_variants(url: str | None) -> dict[str, str]:
+    """Derivative URLs for an image URL ({} if none can be produced). Blocking."""
+    return stored_image(url)[1]
+
+
+def process_post_images(post_id: str):
+    """Background task: attach image_variants to a post, replacing an inline image with its stored URL."""
+    from database import get_db
+    try:
+        db = get_db()
+        post = db.posts.find_one({"_id": ObjectId(post_id)}, {"image_url": 1, "user_id": 1}) if db is not None else None
+        if post and post.get("image_url"):
+            url, variants = stored_image(post["image_url"])
+            if variants:
+                # Guarded on the old URL so a concurrent edit isn't overwritten
+                db.posts.update_one({"_id": post["_id"], "image_url": post["image_url"]},
+                                    {"$set": {"image_url": url, "image_variants": variants}})
+                invalidate(f"profile:{post.get('user_id')}")
+    except Exception as e:
+        print(f"Image derivative error for post {post_id}: {e}")
+
+
+def process_product_images(product_id: str):
+    """Background task: attach image_variants (one dict per image) to a product."""
+    from database import get_db
+    try:
+        db = get_db()
+        product = db.products.find_one({"_id": ObjectId(product_id)}, {"images": 1}) if db is not None else None
+        if product:
+            variants = [image_variants(url) for url in product.get("images") or []]
+            db.products.update_one({"_id": product["_id"]}, {"$set": {"image_variants": variants}})
+            invalidate("marketplace")
+    except Exception as e:
+        print(f"Image derivative error for product {product_id}: {e}")
+
+
+def process_profile_pic(user_id: str):
+    """Background task: attach profile_pic_variants to a user."""
+    from database import get_db
+    try:
+        db = get_db()
+        user = db.users.find_one({"_id": ObjectId(user_id)}, {"profile_pic": 1}) if db is not None else None
+        if user:
+            variants = image_variants(user.get("profile_pic"))
+            db.users.update_one({"_id": user["_id"]}, {"$set": {"profile_pic_variants": variants}})
+    except Exception as e:
+        print(f"Image derivative error for user {user_id}: {e}")
@@ -0,0 +1,185 @@
+"""Incremental health checks for stored media links.
+
+Each distinct URL has one `link_health` document (`_id` = url) holding the
+last result and the number of consecutive failures. A sweep only re-checks
+URLs whose record is stale, issues HEAD requests concurrently (bounded
+overall and per host, over pooled keep-alive connections), and soft-hides
+videos and posts only after FAIL_THRESHOLD failures in a row. Hidden content
+keeps its previous status in `hidden_from_status` and is restored as soon as
+its link checks out again; nothing is deleted.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+import httpx
+from pymongo import UpdateOne
+from services.response_cache import invalidate
+
+FAIL_THRESHOLD = 3
+RECHECK_OK_AFTER = timedelta(days=7)
+RECHECK_FAILED_AFTER = timedelta(hours=6)
+CONCURRENCY = 64
+PER_HOST = 8
+TIMEOUT = 5.0
+BATCH_SIZE = 1000
+HIDDEN_REASON = "broken_link"
+# updated_at in the same ISO string form the admin status writes use
+UPDATED_AT_NOW = {"$dateToString": {"date": "$$NOW", "format": "%Y-%m-%dT%H:%M:%S"}}
+
+# (collection, query) pairs whose `video_url` is checked. Hidden documents are
+# included so that recovered links can be restored.
+TARGETS = (
+    ("user_videos", {"status": {"$in": ["approved", "hidden"]}, "video_url": {"$nin": [None, ""]}}),
+    ("posts", {"status": {"$in": ["approved", "hidden"]}, "video_url": {"$nin": [None, ""]}}),
+)
+
+
+def collect_urls(db) -> set[str]:
+    urls = set()
+    for collection, query in TARGETS:
+        for doc in db[collection].find(query, {"video_url": 1, "_id": 0}):
+            urls.add(doc["video_url"])
+    return urls
+
+
+def stale_urls(db, urls, now: datetime | None = None, full: bool = False) -> list[str]:
+    """URLs with no record, or whose record is older than its recheck interval."""
+    urls = list(urls)
+    if full:
+        return urls
+    now = now or datetime.utcnow()
+    fresh = set()
+    for i in range(0, len(urls), BATCH_SIZE):
+        batch = urls[i:i + BATCH_SIZE]
+        for rec in db.link_health.find({"_id": {"$in": batch}}, {"last_checked": 1, "failures": 1}):
+            interval = RECHECK_FAILED_AFTER if rec.get("failures") else RECHECK_OK_AFTER
+            if rec.get("last_checked") and now - rec["last_checked"] < interval:
+                fresh.add(rec["_id"])
+    return [url for url in urls if url not in fresh]
+
+
+async def _check(client: httpx.AsyncClient, url: str, limit: asyncio.Semaphore,
+                 host_limits: dict[str, asyncio.Semaphore]) -> dict:
+    host = urlsplit(url).netloc.lower()
+    host_limit = host_limits.setdefault(host, asyncio.Semaphore(PER_HOST))
+    # Wait for the host's slot first so a busy host doesn't hold global slots idle
+    async with host_limit, limit:
+        try:
+            res = await client.head(url)
+            if res.status_code in (405, 501):
+                # Some hosts don't support HEAD; ask for a single byte instead
+                res = await client.get(url, headers={"Range": "bytes=0-0"})
+            return {"url": url, "ok": res.status_code < 400, "http_status": res.status_code, "error": None}
+        except (httpx.HTTPError, ValueError) as e:
+            return {"url": url, "ok": False, "http_status": None, "error": f"{type(e).__name__}: {e}"[:200]}
+
+
+async def check_urls(urls: list[str], concurrency: int = CONCURRENCY, timeout: float = TIMEOUT) -> list[dict]:
+    limit = asyncio.Semaphore(concurrency)
+    host_limits: dict[str, asyncio.Semaphore] = {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True) as client:
+        return await asyncio.gather(*(_check(client, url, limit, host_limits) for url in urls))
+
+
+def record_results(db, results: list[dict], now: datetime | None = None):
+    now = now or datetime.utcnow()
+    ops = []
+    for r in results:
+        fields = {"last_checked": now, "http_status": r["http_status"], "error": r["error"]}
+        if r["ok"]:
+            fields.update(status="ok", failures=0, last_ok=now)
+            ops.append(UpdateOne({"_id": r["url"]}, {"$set": fields}, upsert=True))
+        else:
+            fields["status"] = "broken"
+            ops.append(UpdateOne({"_id": r["url"]}, {"$set": fields, "$inc": {"failures": 1}}, upsert=True))
+    if ops:
+        db.link_health.bulk_write(ops, ordered=False)
+
+
+def _batches(values, size: int | None = None):
+    size = size or BATCH_SIZE
+    batch = []
+    for value in values:
+        batch.append(value)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _broken_among(db, urls: list[str], threshold: int) -> set[str]:
+    return set(db.link_health.distinct("_id", {"_id": {"$in": urls}, "failures": {"$gte": threshold}}))
+
+
+def apply_visibility(db, threshold: int = FAIL_THRESHOLD, dry_run: bool = False) -> dict:
+    """Soft-hide content whose link failed `threshold` times in a row; restore recovered content.
+
+    Broken links and hidden documents are walked in BATCH_SIZE pages so no
+    query carries an unbounded `$in` list.
+    """
+    summary = {collection: {"hidden": 0, "restored": 0} for collection, _ in TARGETS}
+    broken = (rec["_id"] for rec in db.link_health.find({"failures": {"$gte": threshold}}, {"_id": 1}))
+    for batch in _batches(broken):
+        for collection, _ in TARGETS:
+            hide_query = {"status": "approved", "video_url": {"$in": batch}}
+            if dry_run:
+                summary[collection]["hidden"] += db[collection].count_documents(hide_query)
+                continue
+            summary[collection]["hidden"] += db[collection].update_many(hide_query, [{"$set": {
+                "hidden_from_status": "$status", "status": "hidden",
+                "hidden_reason": HIDDEN_REASON, "hidden_at": "$$NOW", "updated_at": UPDATED_AT_NOW,
+                "status_changed_at": "$$NOW"
+            }}]).modified_count
+
+    for collection, _ in TARGETS:
+        coll = db[collection]
+        hidden = coll.find({"status": "hidden", "hidden_reason": HIDDEN_REASON}, {"video_url": 1, "_id": 0})
+        for batch in _batches(doc["video_url"] for doc in hidden):
+            batch = list(set(batch))
+            recovered = list(set(batch) - _broken_among(db, batch, threshold))
+            if not recovered:
+                continue
+            restore_query = {"status": "hidden", "hidden_reason": HIDDEN_REASON, "video_url": {"$in": recovered}}
+            if dry_run:
+                summary[collection]["restored"] += coll.count_documents(restore_query)
+                continue
+            summary[collection]["restored"] += coll.update_many(restore_query, [
+                {"$set": {"status": {"$ifNull": ["$hidden_from_status", "approved"]}, "updated_at": UPDATED_AT_NOW,
+                          "status_changed_at": "$$NOW"}},
+                {"$unset": ["hidden_from_status", "hidden_reason", "hidden_at"]}
+            ]).modified_count
+
+    if not dry_run and any(s["hidden"] or s["restored"] for s in summary.values()):
+        # Hidden posts may sit on any profile; those entries expire within their TTL
+        invalidate("videos")
+    return summary
+
+
+def sweep(db, full: bool = False, dry_run: bool = False, threshold: int = FAIL_THRESHOLD,
+          concurrency: int = CONCURRENCY, report=None) -> dict:
+    """Check every stale link, record the results and update visibility.
+
+    With dry_run nothing is written; visibility counts are computed from
+    the failure counts already stored.
+    """
+    started = time.monotonic()
+    urls = stale_urls(db, collect_urls(db), full=full)
+    failed = []
+    for i in range(0, len(urls), BATCH_SIZE):
+        results = asyncio.run(check_urls(urls[i:i + BATCH_SIZE], concurrency=concurrency))
+        failed.extend(r for r in results if not r["ok"])
+        if report:
+            for r in results:
+                report(r)
+        if not dry_run:
+            record_results(db, results)
+
+    return {
+        "checked": len(urls),
+        "failed": len(failed),
+        "visibility": apply_visibility(db, threshold, dry_run=dry_run),
+        "seconds": round(time.monotonic() - started, 1)
+    }
@@ -0,0 +1,174 @@
+"""Request metrics in Prometheus text format (GET /api/metrics).
+
+Recorded per (method, route template):
+  http_requests_total{status}            responses by status code
+  http_request_duration_seconds          latency histogram
+  http_request_db_seconds_total          time spent in MongoDB commands
+  http_request_external_seconds_total    time spent calling external APIs
+plus http_requests_in_flight and external_request_duration_seconds{service}.
+
+Each thread updates its own shard (plain dicts only that thread mutates)
+and the exposition sums all shards when scraped. Updating an existing series
+takes no lock; only adding a new key, which can resize the dict, takes the
+shard's lock, which a scrape holds while it copies the shard, so no shard
+is ever skipped and counters never go backwards.
+DB time comes from the query profiler's per-request command log, so it
+reads zero with QUERY_PROFILER=0. Outbound calls are timed with
+`external_call(service)` or, for requests sessions, `requests_hook`.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from services.request_context import current, on_request_start, on_request_end
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "http_requests_total": ("counter", "HTTP responses by route and status code."),
+    "http_requests_in_flight": ("gauge", "HTTP requests currently being served."),
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route."),
+    "http_request_db_seconds_total": ("counter", "Time spent in MongoDB commands by route."),
+    "http_request_external_seconds_total": ("counter", "Time spent calling external APIs by route."),
+    "external_request_duration_seconds": ("histogram", "Latency of external API calls by service."),
+}
+
+_local = threading.local()
+_shards: list["_Shard"] = []
+_shards_lock = threading.Lock()  # guards the shard list only: registration and scrapes
+
+
+class _Shard:
+    __slots__ = ("values", "histograms", "lock")
+
+    def __init__(self):
+        self.values = {}      # (name, labels) -> float
+        self.histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()  # held for inserts (dict resizes) and scrapes only
+
+    def add(self, name: str, labels: tuple, amount: float = 1.0):
+        key = (name, labels)
+        if key in self.values:
+            self.values[key] += amount
+        else:
+            with self.lock:
+                self.values[key] = amount
+
+    def observe(self, name: str, labels: tuple, value: float):
+        key = (name, labels)
+        hist = self.histograms.get(key)
+        if hist is None:
+            with self.lock:
+                hist = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        hist[bisect_left(LATENCY_BUCKETS, value)] += 1
+        hist[-1] += value
+
+
+def _shard() -> _Shard:
+    shard = getattr(_local, "shard", None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+
+@on_request_start
+def _request_started(ctx):
+    _shard().add("http_requests_in_flight", ())
+
+
+@on_request_end
+def _request_finished(ctx):
+    shard = _shard()
+    labels = (("method", ctx.method), ("route", ctx.route))
+    shard.add("http_requests_in_flight", (), -1)
+    shard.add("http_requests_total", labels + (("status", str(ctx.status or 500)),))
+    shard.observe("http_request_duration_seconds", labels, ctx.seconds)
+    db_micros = sum(command[1] for command in ctx.commands)
+    if db_micros:
+        shard.add("http_request_db_seconds_total", labels, db_micros / 1e6)
+    if ctx.external_seconds:
+        shard.add("http_request_external_seconds_total", labels, ctx.external_seconds)
+
+
+def record_external(service: str, seconds: float):
+    """Attribute `seconds` of outbound API time to `service` and the current request."""
+    _shard().observe("external_request_duration_seconds", (("service", service),), seconds)
+    ctx = current()
+    if ctx is not None:
+        ctx.external_seconds += seconds
+
+
+@contextmanager
+def external_call(service: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_external(service, time.perf_counter() - started)
+
+
+def requests_hook(response, *args, **kwargs):
+    """requests response hook: time every call made through a Session."""
+    record_external(urlparse(response.url).hostname or "unknown", response.elapsed.total_seconds())
+
+
+def _snapshot() -> tuple[dict, dict]:
+    values, histograms = {}, {}
+    with _shards_lock:
+        shards = list(_shards)
+    for shard in shards:
+        with shard.lock:
+            shard_values = list(shard.values.items())
+            shard_histograms = [(k, list(v)) for k, v in shard.histograms.items()]
+        for key, value in shard_values:
+            values[key] = values.get(key, 0.0) + value
+        for key, hist in shard_histograms:
+            total = histograms.setdefault(key, [0] * len(hist))
+            for i, n in enumerate(hist):
+                total[i] += n
+    return values, histograms
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    values, histograms = _snapshot()
+    values.setdefault(("http_requests_in_flight", ()), 0.0)
+    lines = []
+    for name, (kind, help_text) in HELP.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), hist in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, hist):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_labels(labels, (('le', repr(bound)),))} {cumulative}")
+                count = cumulative + hist[len(LATENCY_BUCKETS)]
+                lines.append(f"{name}_bucket{_labels(labels, (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(hist[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
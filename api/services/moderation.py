@@ -27,6 +27,8 @@ def is_obviously_harmful(text: str) -> bool:
 session = requests.Session()
 retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504])
 session.mount('https://', HTTPAdapter(max_retries=retries))
+from services.metrics import requests_hook
+session.hooks["response"].append(requests_hook)
 
 import base64
 import io
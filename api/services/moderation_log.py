@@ -0,0 +1,92 @@
+"""Append-only moderation audit log (`moderation_events`).
+
+Every moderation decision on a post or video (AI pass, admin override,
+report, bulk action) is inserted as its own event instead of being appended
+to an array embedded in the item, so feed reads don't carry the history and
+concurrent moderators can't overwrite each other's entries. Events are read
+newest first from the (target_id, ts) index, with a "<ts iso>|<id>" cursor.
+
+Admin views still receive a `moderation_logs` list in the legacy shape
+({action, timestamp, operator, reason/details}), built by `attach_logs` in one
+query per page. `migrate_moderation_logs.py` moves existing embedded logs
+into this collection.
+"""
+from datetime import datetime
+from bson import ObjectId
+
+MAX_PAGE = 100
+RECENT_PER_ITEM = 20
+
+TARGET_TYPES = {"posts": "post", "videos": "video"}
+
+
+def new_event(target_type: str, target_id: str, action: str, operator: str,
+              ts: datetime | None = None, **details) -> dict:
+    event = {"target_type": target_type, "target_id": str(target_id), "action": action,
+             "operator": operator, "ts": ts or datetime.utcnow()}
+    event.update({k: v for k, v in details.items() if v is not None})
+    return event
+
+
+def record(db, target_type: str, target_id: str, action: str, operator: str, **details):
+    """Append one event (details: status, reason, details, source, ...)."""
+    db.moderation_events.insert_one(new_event(target_type, target_id, action, operator, **details))
+
+
+def record_many(db, events: list[dict]):
+    if events:
+        db.moderation_events.insert_many(events, ordered=False)
+
+
+def as_log_entry(event: dict) -> dict:
+    """An event in the legacy embedded `moderation_logs` shape."""
+    entry = {"action": event.get("action"), "timestamp": event["ts"].isoformat(), "operator": event.get("operator")}
+    for field in ("reason", "details", "status"):
+        if event.get(field) is not None:
+            entry[field] = event[field]
+    return entry
+
+
+def encode_cursor(event: dict) -> str:
+    return f"{event['ts'].isoformat()}|{event['_id']}"
+
+
+def history(db, target_type: str, target_id: str, limit: int = 50, cursor: str | None = None) -> dict:
+    """One page of an item's events, newest first: {"items": [...], "next_cursor": str | None}.
+
+    Raises ValueError/InvalidId on a malformed cursor.
+    """
+    limit = max(1, min(limit, MAX_PAGE))
+    query = {"target_type": target_type, "target_id": target_id}
+    if cursor:
+        raw_ts, _, raw_id = cursor.rpartition("|")
+        ts, oid = datetime.fromisoformat(raw_ts), ObjectId(raw_id)
+        query["$or"] = [{"ts": {"$lt": ts}}, {"ts": ts, "_id": {"$lt": oid}}]
+    events = list(db.moderation_events.find(query).sort([("ts", -1), ("_id", -1)]).limit(limit + 1))
+    has_more = len(events) > limit
+    events = events[:limit]
+    items = [{"id": str(e["_id"]), **as_log_entry(e)} for e in events]
+    return {"items": items, "next_cursor": encode_cursor(events[-1]) if has_more and events else None}
+
+
+def attach_logs(db, docs: list[dict], per_item: int = RECENT_PER_ITEM) -> list[dict]:
+    """Set `moderation_logs` (oldest first) on each doc from its most recent events.
+
+    Logs still embedded in un-migrated documents are kept in front, as they
+    predate any event.
+    """
+    ids = [str(d["_id"]) for d in docs if d.get("_id") is not None]
+    recent = {}
+    if ids:
+        # $topN (MongoDB 5.2+) keeps only per_item events per group, however long the history
+        pipeline = [
+            {"$match": {"target_id": {"$in": ids}}},
+            {"$group": {"_id": "$target_id", "events": {"$topN": {
+                "n": per_item, "sortBy": {"ts": -1, "_id": -1}, "output": "$$ROOT"
+            }}}}
+        ]
+        recent = {row["_id"]: row["events"] for row in db.moderation_events.aggregate(pipeline)}
+    for doc in docs:
+        events = recent.get(str(doc.get("_id")), [])
+        doc["moderation_logs"] = (doc.get("moderation_logs") or []) + [as_log_entry(e) for e in reversed(events)]
+    return docs
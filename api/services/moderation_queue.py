@@ -0,0 +1,325 @@
+"""Admin moderation queue over `posts` and `user_videos`.
+
+Listing is server-filtered (status, moderation category, created_at range,
+author) and sorted by (created_at, _id) descending on indexes that cover
+those filters, with an opaque cursor instead of skip, so each page costs the
+same regardless of queue depth. Authors are hydrated in one `$in` lookup per
+page.
+
+Moderators can claim items: a claim is a lease (`claimed_by`,
+`claim_expires_at`) taken with an atomic find_one_and_update, so two
+moderators never receive the same item, and an abandoned claim becomes
+available again when its lease runs out. Status changes clear the claim.
+
+`bulk_moderate` applies many status changes in one unordered `bulk_write`
+and one `moderation_events` insert; owner notifications and dashboard
+counter updates run afterwards via `apply_moderation_side_effects`.
+Video writes (claims, releases, status changes) go through VideoRepository,
+which also invalidates the cached video feeds.
+Queue pages carry each item's recent `moderation_logs` from that audit log.
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from services import admin_stats, moderation_log
+from services.notifications import notify_many
+from services.response_cache import invalidate
+from services.video_repository import (
+    CLEAR_CLAIM, VideoRepository, VIDEO_STATUSES, normalize_status, status_query, to_datetime
+)
+
+LEASE = timedelta(minutes=10)
+MAX_PAGE = 100
+MAX_CLAIM = 25
+MAX_SEARCH_USERS = 200
+MAX_BULK = 500
+
+QUEUES = ("posts", "videos")
+COLLECTIONS = {"posts": "posts", "videos": "user_videos"}
+
+STATUSES = {"posts": ("pending", "approved", "rejected", "flagged"), "videos": VIDEO_STATUSES}
+
+
+def _created_at_value(kind: str, value):
+    # Posts store created_at as an ISO string, videos as a datetime
+    if kind == "videos":
+        return to_datetime(value)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(doc: dict) -> str:
+    created_at = doc.get("created_at")
+    created_at = created_at.isoformat() if isinstance(created_at, datetime) else (created_at or "")
+    return f"{created_at}|{doc['_id']}"
+
+
+def _cursor_filter(kind: str, cursor: str) -> dict:
+    """Raises ValueError/InvalidId on a malformed cursor."""
+    raw_created, _, raw_id = cursor.rpartition("|")
+    oid = ObjectId(raw_id)
+    created_at = _created_at_value(kind, raw_created)
+    if created_at is None:
+        raise ValueError("Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": oid}}
+    ]}
+
+
+def user_search_query(search: str) -> dict:
+    """Users whose email, mobile or name contains `search` (case-insensitive), or with that id."""
+    user_query = {"$or": [
+        {"email": {"$regex": search, "$options": "i"}},
+        {"mobile": {"$regex": search, "$options": "i"}},
+        {"full_name": {"$regex": search, "$options": "i"}}
+    ]}
+    if ObjectId.is_valid(search):
+        user_query["$or"].append({"_id": ObjectId(search)})
+    return user_query
+
+
+def search_user_ids(db, search: str) -> list[str]:
+    return [str(u["_id"]) for u in db.users.find(user_search_query(search), {"_id": 1}).limit(MAX_SEARCH_USERS)]
+
+
+def build_query(db, kind: str, status: str | None = None, category: str | None = None,
+                since: datetime | None = None, until: datetime | None = None,
+                search_user: str | None = None, moderator_id: str | None = None) -> dict:
+    query = {}
+    if status and status != "all":
+        # A comma-separated list matches any of them (e.g. "approved,rejected")
+        statuses = [s.strip() for s in status.split(",") if s.strip()]
+        if kind == "videos":
+            query["status"] = status_query(db, *statuses)
+        else:
+            query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if category:
+        query["moderation_category"] = category
+    if since or until:
+        bounds = {}
+        if since:
+            bounds["$gte"] = _created_at_value(kind, since)
+        if until:
+            bounds["$lt"] = _created_at_value(kind, until)
+        query["created_at"] = bounds
+    if search_user:
+        query["user_id"] = {"$in": search_user_ids(db, search_user)}
+    if moderator_id:
+        # Hide items currently leased to someone else
+        query["$nor"] = [{"claimed_by": {"$nin": [None, moderator_id]},
+                          "claim_expires_at": {"$gt": datetime.utcnow()}}]
+    return query
+
+
+def hydrate(db, kind: str, docs: list[dict]) -> list[dict]:
+    moderation_log.attach_logs(db, docs)
+    repo = VideoRepository(db)
+    if kind == "videos":
+        return repo.hydrate(docs, default_author="Unknown User")
+
+    authors = {}
+    author_ids = list(set(ObjectId(d["user_id"]) for d in docs if ObjectId.is_valid(d.get("user_id"))))
+    if author_ids:
+        authors = {str(a["_id"]): a for a in db.users.find(
+            {"_id": {"$in": author_ids}}, {"email": 1, "profile_pic": 1, "full_name": 1}
+        )}
+    for doc in docs:
+        doc["id"] = str(doc["_id"])
+        author = authors.get(doc.get("user_id"))
+        if author:
+            doc["author_email"] = author.get("email")
+            doc["author_profile_pic"] = author.get("profile_pic")
+            doc["author_name"] = doc.get("author_name") or author.get("full_name") or "Bodham User"
+    return docs
+
+
+def _serialize(doc: dict) -> dict:
+    doc.pop("_id", None)
+    for field in ("claim_expires_at", "created_at"):
+        if isinstance(doc.get(field), datetime):
+            doc[field] = doc[field].isoformat()
+    return doc
+
+
+def list_queue(db, kind: str, limit: int = 50, cursor: str | None = None, **filters) -> dict:
+    """One page of the queue, newest first: {"items": [...], "next_cursor": str | None}."""
+    limit = max(1, min(limit, MAX_PAGE))
+    query = build_query(db, kind, **filters)
+    if cursor:
+        query = {"$and": [query, _cursor_filter(kind, cursor)]}
+    docs = list(db[COLLECTIONS[kind]].find(query)
+                .sort([("created_at", -1), ("_id", -1)]).limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = encode_cursor(docs[-1]) if has_more and docs else None
+    return {"items": [_serialize(d) for d in hydrate(db, kind, docs)], "next_cursor": next_cursor}
+
+
+def claim(db, kind: str, moderator_id: str, count: int = 5, status: str = "pending",
+          category: str | None = None) -> list[dict]:
+    """Lease up to `count` of the oldest unclaimed items to `moderator_id`."""
+    coll = db[COLLECTIONS[kind]]
+    query = {"status": status_query(db, status) if kind == "videos" else status, "$or": [
+        {"claimed_by": None},
+        {"claim_expires_at": {"$lte": datetime.utcnow()}},
+        {"claimed_by": moderator_id}
+    ]}
+    if category:
+        query["moderation_category"] = category
+    repo = VideoRepository(db) if kind == "videos" else None
+    claimed = []
+    for _ in range(max(1, min(count, MAX_CLAIM))):
+        now = datetime.utcnow()
+        query["$or"][1]["claim_expires_at"]["$lte"] = now
+        unclaimed = {**query, "_id": {"$nin": [d["_id"] for d in claimed]}}
+        if repo:
+            doc = repo.claim(unclaimed, moderator_id, now + LEASE)
+        else:
+            doc = coll.find_one_and_update(
+                unclaimed, {"$set": {"claimed_by": moderator_id, "claim_expires_at": now + LEASE}},
+                sort=[("created_at", 1), ("_id", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+        if doc is None:
+            break
+        claimed.append(doc)
+    return [_serialize(d) for d in hydrate(db, kind, claimed)]
+
+
+def release(db, kind: str, item_id: str, moderator_id: str) -> bool:
+    if not ObjectId.is_valid(item_id):
+        return False
+    if kind == "videos":
+        return VideoRepository(db).release(item_id, moderator_id)
+    result = db[COLLECTIONS[kind]].update_one(
+        {"_id": ObjectId(item_id), "claimed_by": moderator_id}, {"$set": CLEAR_CLAIM}
+    )
+    return result.matched_count > 0
+
+
+def override_event(kind: str, item_id, status: str, operator: str, reason: str | None) -> dict:
+    status = normalize_status(status) if kind == "videos" else str(status).lower()
+    return moderation_log.new_event(
+        moderation_log.TARGET_TYPES[kind], item_id, f"Admin Override: {status}", operator,
+        status=status, reason=reason or "Manually updated by admin", source="admin_override"
+    )
+
+
+def log_override(db, kind: str, item_id, status: str, reason: str | None, operator: str = "ADMIN_OVERRIDE"):
+    db.moderation_events.insert_one(override_event(kind, item_id, status, operator, reason))
+
+
+def bulk_moderate(db, kind: str, actions: list[dict], operator: str = "ADMIN_OVERRIDE") -> tuple[dict, list[dict]]:
+    """Apply status changes to many posts or videos in one bulk_write.
+
+    `actions` are {"id", "status", "rejection_reason"} dicts (a repeated id
+    keeps its last action). Returns (results, changes): results maps each id
+    to "updated", "not_found", "conflict" (its status changed between our
+    read and write, e.g. another moderator got there first), "invalid_id" or
+    "invalid_status"; changes lists {"id", "user_id", "old", "new"} for
+    apply_moderation_side_effects, only for writes that were applied.
+    """
+    results = {}
+    wanted = {}
+    for action in actions:
+        item_id = action["id"]
+        status = str(action.get("status") or "").strip().lower()
+        if not ObjectId.is_valid(item_id):
+            results[item_id] = "invalid_id"
+        elif status not in STATUSES[kind]:
+            results[item_id] = "invalid_status"
+            wanted.pop(ObjectId(item_id), None)
+        else:
+            wanted[ObjectId(item_id)] = (status, action.get("rejection_reason"))
+
+    coll = db[COLLECTIONS[kind]]
+    existing = {}
+    if wanted:
+        existing = {d["_id"]: d for d in coll.find({"_id": {"$in": list(wanted)}}, {"status": 1, "user_id": 1})}
+
+    now = datetime.utcnow().isoformat()
+    updates = {}
+    pending = {}
+    for oid, (status, reason) in wanted.items():
+        doc = existing.get(oid)
+        if doc is None:
+            results[str(oid)] = "not_found"
+            continue
+        # Conditional on the status we read, so a concurrent moderator's
+        # change is never overwritten or counted twice
+        updates[oid] = (doc.get("status"), {
+            **CLEAR_CLAIM,
+            "status": status,
+            "moderation_status": status,
+            "moderation_source": "admin_override",
+            "rejection_reason": reason if status == "rejected" else None,
+            "updated_at": now
+        })
+        pending[oid] = (doc, status, reason)
+
+    if kind == "videos":
+        applied = VideoRepository(db).set_statuses(updates)
+    else:
+        applied = _set_post_statuses(coll, updates, now)
+
+    events = []
+    changes = []
+    for oid, (doc, status, reason) in pending.items():
+        if oid not in applied:
+            results[str(oid)] = "conflict"
+            continue
+        events.append(override_event(kind, oid, status, operator, reason))
+        old = normalize_status(doc.get("status")) if kind == "videos" else doc.get("status")
+        changes.append({"id": str(oid), "user_id": doc.get("user_id"), "old": old, "new": status})
+        results[str(oid)] = "updated"
+
+    if changes:
+        moderation_log.record_many(db, events)
+        if kind == "posts":
+            invalidate(*{f"profile:{change['user_id']}" for change in changes})
+    return results, changes
+
+
+def _set_post_statuses(coll, updates: dict, now: str) -> set:
+    """The posts half of bulk_moderate's write (videos go through VideoRepository.set_statuses)."""
+    if not updates:
+        return set()
+    write = coll.bulk_write([
+        UpdateOne({"_id": oid, "status": read}, {"$set": fields}) for oid, (read, fields) in updates.items()
+    ], ordered=False)
+    if write.matched_count == len(updates):
+        return set(updates)
+    # `now` is unique to this call, so it identifies the writes that were applied
+    return set(d["_id"] for d in coll.find({"_id": {"$in": list(updates)}, "updated_at": now}, {"_id": 1}))
+
+
+MODERATION_MESSAGES = {
+    "approved": "Your {label} has been approved and is now visible.",
+    "rejected": "Your {label} was removed for violating the app's guidelines.",
+}
+
+
+def apply_moderation_side_effects(db, kind: str, changes: list[dict]):
+    """Background half of bulk_moderate: dashboard counters and owner notifications."""
+    try:
+        collection = COLLECTIONS[kind]
+        deltas = {}
+        for change in changes:
+            if change["old"] == change["new"]:
+                continue
+            for status, sign in ((change["old"], -1), (change["new"], 1)):
+                counter = admin_stats.STATUS_COUNTERS.get((collection, status))
+                if counter:
+                    deltas[counter] = deltas.get(counter, 0) + sign
+        admin_stats.adjust(db, **deltas)
+
+        label = "post" if kind == "posts" else "video"
+        notify_many(db, [{
+            "user_id": change["user_id"],
+            "type": "moderation",
+            "message": MODERATION_MESSAGES[change["new"]].format(label=label),
+            "post_id": change["id"]
+        } for change in changes
+            if change["user_id"] and change["old"] != change["new"] and change["new"] in MODERATION_MESSAGES])
+    except Exception as e:
+        print(f"Bulk moderation side effects failed for {len(changes)} {kind}: {e}")
@@ -0,0 +1,225 @@
+"""Notification inbox: writes, like aggregation and unread counters.
+
+Like events are collapsed into one unread document per (recipient, post), so
+a viral post updates a single row instead of inserting one per like. Unread
+state is mirrored in `notification_counters` for an O(1) badge count; the
+counter also keeps the earliest expiry among the unread rows, and once that
+passes (the TTL index has removed, or is about to remove, unread rows) the
+next read recounts instead of trusting the cached number.
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+UNREAD_RETENTION = timedelta(days=30)
+READ_RETENTION = timedelta(hours=24)
+# Actors remembered per like row for re-like dedup; older ones only count
+MAX_TRACKED_ACTORS = 200
+
+
+def _bump_unread(db, user_id: str, n: int = 1, expires_at: datetime | None = None):
+    update = {"$inc": {"unread": n}}
+    if expires_at is not None:
+        update["$min"] = {"next_expiry": expires_at}
+    db.notification_counters.update_one({"_id": user_id}, update, upsert=True)
+
+
+def notify(db, user_id: str, type: str, message: str, sender_id: str | None = None, post_id: str | None = None):
+    """Insert a single (non-aggregated) notification."""
+    now = datetime.utcnow()
+    doc = {
+        "user_id": user_id,
+        "message": message,
+        "type": type,
+        "is_read": False,
+        "count": 1,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": now + UNREAD_RETENTION
+    }
+    if sender_id:
+        doc["sender_id"] = sender_id
+    if post_id:
+        doc["post_id"] = post_id
+    db.notifications.insert_one(doc)
+    _bump_unread(db, user_id, expires_at=doc["expires_at"])
+
+
+def notify_many(db, entries: list[dict]):
+    """Insert several notifications in one round trip.
+
+    Each entry takes the same fields as `notify` (user_id, type, message and
+    optional sender_id/post_id).
+    """
+    if not entries:
+        return
+    now = datetime.utcnow()
+    docs = []
+    unread = {}
+    for entry in entries:
+        doc = {k: v for k, v in entry.items() if v is not None}
+        doc.update({"is_read": False, "count": 1, "created_at": now, "updated_at": now,
+                    "expires_at": now + UNREAD_RETENTION})
+        docs.append(doc)
+        unread[doc["user_id"]] = unread.get(doc["user_id"], 0) + 1
+    db.notifications.insert_many(docs, ordered=False)
+    db.notification_counters.bulk_write(
+        [UpdateOne({"_id": uid}, {"$inc": {"unread": n}, "$min": {"next_expiry": now + UNREAD_RETENTION}},
+                   upsert=True)
+         for uid, n in unread.items()],
+        ordered=False
+    )
+
+
+def notify_like(db, user_id: str, post_id: str, actor_id: str, actor_name: str, target: str = "post"):
+    """Fold a like into the recipient's unread like notification for this post (or video)."""
+    now = datetime.utcnow()
+    query = {
+        "user_id": user_id,
+        "type": "like",
+        "post_id": post_id,
+        "is_read": False,
+        # Re-liking after an unlike must not count the same person twice
+        "actor_ids": {"$ne": actor_id}
+    }
+    update = {
+        "$inc": {"count": 1},
+        # Bounded so a viral post doesn't grow one document without limit
+        "$push": {"actor_ids": {"$each": [actor_id], "$slice": -MAX_TRACKED_ACTORS}},
+        "$set": {"sender_id": actor_id, "actor_name": actor_name, "updated_at": now,
+                 "expires_at": now + UNREAD_RETENTION},
+        "$setOnInsert": {"created_at": now, "target": target}
+    }
+    # The unique partial index on unread likes turns an upsert into a duplicate
+    # key error when the actor is already counted or when two first likes
+    # race; one retry tells the two apart.
+    for _ in range(2):
+        try:
+            result = db.notifications.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            continue
+        if result.upserted_id is not None:
+            _bump_unread(db, user_id, expires_at=now + UNREAD_RETENTION)
+        return
+
+
+def render_message(n: dict) -> str:
+    if n.get("type") == "like" and "actor_name" in n:
+        others = n.get("count", 1) - 1
+        if others <= 0:
+            return f"{n['actor_name']} liked your {n.get('target', 'post')}"
+        return (f"{n['actor_name']} and {others} {'other' if others == 1 else 'others'} "
+                f"liked your {n.get('target', 'post')}")
+    return n.get("message", "")
+
+
+def encode_cursor(n: dict) -> str:
+    return f"{n['updated_at']}|{n['id']}"
+
+
+def list_notifications(db, user_id: str, limit: int = 20, before: str | None = None) -> dict:
+    """One page, newest first by (updated_at, _id): {"items": [...], "next_cursor": str | None}.
+
+    Pass `next_cursor` back as `before` for the next page. Raises
+    ValueError/InvalidId on a malformed cursor.
+    """
+    query = {"user_id": user_id}
+    if before:
+        raw_updated, _, raw_id = before.rpartition("|")
+        updated_at, oid = datetime.fromisoformat(raw_updated), ObjectId(raw_id)
+        query["$or"] = [{"updated_at": {"$lt": updated_at}}, {"updated_at": updated_at, "_id": {"$lt": oid}}]
+    cursor = db.notifications.find(query, {"actor_ids": 0}).sort([("updated_at", -1), ("_id", -1)]).limit(limit + 1)
+
+    results = []
+    for n in cursor:
+        created_at = n.get("created_at")
+        updated_at = n.get("updated_at", created_at)
+        results.append({
+            "id": str(n["_id"]),
+            "message": render_message(n),
+            "type": n["type"],
+            "post_id": n.get("post_id"),
+            "sender_id": n.get("sender_id"),
+            "count": n.get("count", 1),
+            "is_read": n.get("is_read", True),
+            "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at,
+            "updated_at": updated_at.isoformat() if isinstance(updated_at, datetime) else updated_at
+        })
+    has_more = len(results) > limit
+    results = results[:limit]
+    return {"items": results, "next_cursor": encode_cursor(results[-1]) if has_more and results else None}
+
+
+def unread_count(db, user_id: str) -> int:
+    counter = db.notification_counters.find_one({"_id": user_id})
+    if not counter:
+        return 0
+    next_expiry = counter.get("next_expiry")
+    # Counters from before next_expiry was tracked get one recount too
+    if (next_expiry is None and counter.get("unread", 0) > 0) or \
+            (next_expiry is not None and next_expiry <= datetime.utcnow()):
+        return recount_unread(db, user_id)
+    return max(counter.get("unread", 0), 0)
+
+
+def recount_unread(db, user_id: str) -> int:
+    """Reset the counter from the unread rows that haven't expired."""
+    unread = {"user_id": user_id, "is_read": False, "expires_at": {"$gt": datetime.utcnow()}}
+    count = db.notifications.count_documents(unread)
+    oldest = db.notifications.find_one(unread, {"expires_at": 1}, sort=[("expires_at", 1)])
+    update = {"$set": {"unread": count}}
+    if oldest:
+        update["$set"]["next_expiry"] = oldest["expires_at"]
+    else:
+        update["$unset"] = {"next_expiry": ""}
+    db.notification_counters.update_one({"_id": user_id}, update, upsert=True)
+    return count
+
+
+def mark_read(db, user_id: str, notification_id: str | None = None) -> int:
+    """Mark one notification (or the whole inbox) read and resync the counter."""
+    now = datetime.utcnow()
+    query = {"user_id": user_id, "is_read": False}
+    if notification_id:
+        query["_id"] = ObjectId(notification_id)
+    result = db.notifications.update_many(
+        query,
+        {"$set": {"is_read": True, "read_at": now, "expires_at": now + READ_RETENTION}}
+    )
+
+    if notification_id:
+        if result.modified_count:
+            _bump_unread(db, user_id, -result.modified_count)
+    else:
+        db.notification_counters.update_one(
+            {"_id": user_id}, {"$set": {"unread": 0}, "$unset": {"next_expiry": ""}}, upsert=True
+        )
+    return result.modified_count
+
+
+def migrate_legacy_ttl(db) -> int:
+    """Replace the legacy created_at TTL with per-document expires_at (see services.schema)."""
+    existing = db.notifications.index_information()
+    legacy = existing.get("created_at_1")
+    if not (legacy and "expireAfterSeconds" in legacy):
+        return 0
+    db.notifications.drop_index("created_at_1")
+    # The old index kept at most a day of rows, so they are rewritten one by
+    # one. Each keeps its read state (rows from before it was tracked count as
+    # unread) and gets the retention that state has from now on.
+    ops, users = [], set()
+    for n in db.notifications.find({"expires_at": {"$exists": False}}, {"user_id": 1, "is_read": 1, "created_at": 1}):
+        is_read = n.get("is_read", False)
+        created_at = n.get("created_at") or n["_id"].generation_time.replace(tzinfo=None)
+        ops.append(UpdateOne({"_id": n["_id"]}, {"$set": {
+            "is_read": is_read, "updated_at": created_at,
+            "expires_at": created_at + (READ_RETENTION if is_read else UNREAD_RETENTION)
+        }}))
+        if not is_read:
+            users.add(n["user_id"])
+    if ops:
+        db.notifications.bulk_write(ops, ordered=False)
+    for user_id in users:
+        recount_unread(db, user_id)
+    return len(ops)
@@ -0,0 +1,331 @@
+"""pymongo command profiler, attributed per route.
+
+`QueryProfiler` is a pymongo CommandListener registered on the client. Each
+command is tagged with the request it ran in (services.request_context) and
+reduced to a shape: command, collection and filter with the values blanked
+out, so `find users {_id: ?}` from one endpoint is one row however many ids
+it was called with. When a request ends its commands are folded into
+per-route and per-shape totals, and a shape repeated N_PLUS_ONE_MIN or more
+times within one request is recorded as an N+1 pattern.
+
+A sample (EXPLAIN_SAMPLE_RATE) of reads is re-run through `explain` with
+executionStats on a worker thread, to record docs/keys examined versus
+returned and collection scans. Commands slower than SLOW_QUERY_MS go to a
+bounded slow log. `report()` backs GET /api/admin/profiler.
+
+`query_budget` is the test helper: it counts the commands issued inside a
+`with` block and fails if there are more than allowed. QUERY_BUDGETS holds
+the per-endpoint budgets that `budget_violations` checks the live stats
+against. mongomock emits no command events, so `instrument_mongomock`
+records its collection calls the same way (tests and benchmarks).
+"""
+import functools
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pymongo import monitoring
+from config import QUERY_PROFILER, EXPLAIN_SAMPLE_RATE, SLOW_QUERY_MS
+from services.request_context import current, on_request_end
+
+N_PLUS_ONE_MIN = 5
+SLOW_LOG_SIZE = 200
+MAX_SHAPES = 5000
+
+IGNORED = {"ping", "hello", "ismaster", "isMaster", "buildInfo", "saslStart", "saslContinue",
+           "endSessions", "explain", "killCursors", "listCollections", "listIndexes"}
+EXPLAINABLE = {"find", "aggregate", "count", "distinct"}
+REPEATABLE = {"find", "aggregate", "count", "distinct", "findAndModify"}
+
+# "METHOD /route" -> max commands per request; checked by budget_violations()
+QUERY_BUDGETS = {
+    "GET /api/posts/": 6,
+    "GET /api/videos/": 4,
+    "GET /api/videos/for-you": 4,
+    "GET /api/friends/suggestions": 4,
+    "GET /api/friends/notifications": 3,
+    "GET /api/admin/stats": 2,
+    "GET /api/admin/queue/{kind}": 4,
+}
+
+_lock = threading.Lock()
+_routes: dict[str, dict] = {}
+_shapes: dict[tuple, dict] = {}
+_n_plus_one: dict[tuple, dict] = {}
+_slow: deque = deque(maxlen=SLOW_LOG_SIZE)
+_pending: dict[tuple, tuple] = {}
+_captures: list[list] = []
+_explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-explain")
+
+
+def shape(value):
+    """The filter with every value replaced by "?" (operators and keys kept)."""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [shape(v) for v in value[:1]] if value and isinstance(value[0], dict) else "?"
+    return "?"
+
+
+def _filter_of(name: str, command: dict):
+    if name in ("find", "count", "distinct"):
+        return command.get("filter", command.get("query"))
+    if name == "findAndModify":
+        return command.get("query")
+    if name == "aggregate":
+        first = (command.get("pipeline") or [{}])[0]
+        return first.get("$match")
+    if name in ("update", "delete"):
+        ops = command.get("updates") or command.get("deletes") or [{}]
+        return ops[0].get("q")
+    return None
+
+
+def _shape_key(name: str, command: dict) -> tuple:
+    collection = command.get("collection") if name == "getMore" else command.get(name)
+    collection = collection if isinstance(collection, str) else ""
+    filt = _filter_of(name, command)
+    return name, collection, repr(shape(filt)) if filt else ""
+
+
+def _returned(name: str, reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if name == "distinct":
+        return len(reply.get("values") or [])
+    return int(reply.get("n") or 0)
+
+
+def _new_shape_stats() -> dict:
+    return {"count": 0, "micros": 0, "max_micros": 0, "returned": 0, "failed": 0,
+            "explains": 0, "docs_examined": 0, "keys_examined": 0, "explain_returned": 0, "collscans": 0}
+
+
+def _add_command(route: str, key: tuple, micros: int, returned: int, failed: bool):
+    stats = _shapes.get((route, *key))
+    if stats is None:
+        if len(_shapes) >= MAX_SHAPES:
+            return
+        stats = _shapes[(route, *key)] = _new_shape_stats()
+    stats["count"] += 1
+    stats["micros"] += micros
+    stats["max_micros"] = max(stats["max_micros"], micros)
+    stats["returned"] += returned
+    stats["failed"] += int(failed)
+
+
+def _record(key: tuple, micros: int, returned: int, failed: bool) -> str:
+    """File one finished command under the current request (or "background"); returns the route."""
+    ctx = current()
+    route = ctx.name if ctx else "background"
+    if ctx is not None:
+        ctx.commands.append((key, micros, returned, failed))
+    else:
+        with _lock:
+            _add_command(route, key, micros, returned, failed)
+    for capture in _captures:
+        # The route may only be matched later (the response cache renders first), so resolve it in query_budget
+        capture.append((ctx, key, micros))
+    return route
+
+
+class QueryProfiler(monitoring.CommandListener):
+    def started(self, event):
+        if event.command_name in IGNORED:
+            return
+        command = event.command
+        key = _shape_key(event.command_name, command)
+        explain = None
+        if event.command_name in EXPLAINABLE and random.random() < EXPLAIN_SAMPLE_RATE:
+            explain = {k: v for k, v in command.items() if not k.startswith("$") and k not in ("lsid", "txnNumber")}
+        _pending[(event.request_id, event.connection_id)] = (key, event.database_name, explain)
+
+    def _finished(self, event, reply: dict | None):
+        entry = _pending.pop((event.request_id, event.connection_id), None)
+        if entry is None:
+            return
+        key, database_name, explain = entry
+        micros = event.duration_micros
+        returned = _returned(event.command_name, reply) if reply else 0
+        route = _record(key, micros, returned, reply is None)
+        if micros >= SLOW_QUERY_MS * 1000:
+            _slow.append({"route": route, "command": key[0], "collection": key[1], "filter": key[2],
+                          "ms": round(micros / 1000, 2), "returned": returned})
+        if explain is not None and reply is not None:
+            _explainer.submit(_run_explain, route, key, database_name, explain)
+
+    def succeeded(self, event):
+        self._finished(event, event.reply or {})
+
+    def failed(self, event):
+        self._finished(event, None)
+
+
+# mongomock method -> server command it stands for
+MOCK_COMMANDS = {
+    "find": "find", "find_one": "find", "aggregate": "aggregate", "count_documents": "aggregate",
+    "distinct": "distinct", "insert_one": "insert", "insert_many": "insert", "update_one": "update",
+    "update_many": "update", "replace_one": "update", "delete_one": "delete", "delete_many": "delete",
+    "find_one_and_update": "findAndModify", "find_one_and_delete": "findAndModify", "bulk_write": "bulkWrite",
+}
+_mongomock_instrumented = False
+
+
+def instrument_mongomock():
+    """Record mongomock collection calls as if the listener had seen them (no listener events there).
+
+    Used by the tests and benchmarks.load_test; the commands count towards
+    request stats and `query_budget` exactly like real ones.
+    """
+    global _mongomock_instrumented
+    if _mongomock_instrumented:
+        return
+    import mongomock
+    depth = threading.local()  # mongomock calls its own methods (find_one -> find); count the outer one
+
+    def wrap(method, command):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if getattr(depth, "value", 0):
+                return method(self, *args, **kwargs)
+            depth.value = 1
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = method(self, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                depth.value = 0
+                filt = args[0] if args and isinstance(args[0], dict) else kwargs.get("filter")
+                _record((command, self.name, repr(shape(filt)) if filt else ""),
+                        int((time.perf_counter() - started) * 1e6), 0, failed)
+        return wrapper
+
+    for name, command in MOCK_COMMANDS.items():
+        setattr(mongomock.collection.Collection, name, wrap(getattr(mongomock.collection.Collection, name), command))
+    _mongomock_instrumented = True
+
+
+def _execution_stats(explain: dict) -> dict | None:
+    if "executionStats" in explain:
+        return explain["executionStats"]
+    for stage in explain.get("stages") or []:
+        found = _execution_stats(stage.get("$cursor") or {})
+        if found:
+            return found
+    return None
+
+
+def _run_explain(route: str, key: tuple, database_name: str, command: dict):
+    try:
+        from database import get_client
+        result = get_client()[database_name].command({"explain": command, "verbosity": "executionStats"})
+        stats = _execution_stats(result)
+        if not stats:
+            return
+        with _lock:
+            # The request may not have been folded into _shapes yet
+            entry = _shapes.get((route, *key))
+            if entry is None:
+                if len(_shapes) >= MAX_SHAPES:
+                    return
+                entry = _shapes[(route, *key)] = _new_shape_stats()
+            entry["explains"] += 1
+            entry["docs_examined"] += stats.get("totalDocsExamined", 0)
+            entry["keys_examined"] += stats.get("totalKeysExamined", 0)
+            entry["explain_returned"] += stats.get("nReturned", 0)
+            entry["collscans"] += int("COLLSCAN" in repr(result.get("queryPlanner") or result.get("stages")))
+    except Exception as e:
+        print(f"Explain failed for {key[0]} on {key[1]}: {e}")
+
+
+@on_request_end
+def _record_request(ctx):
+    if not ctx.commands:
+        return
+    route = ctx.name
+    repeats = Counter(key for key, *_ in ctx.commands if key[0] in REPEATABLE)
+    with _lock:
+        stats = _routes.setdefault(route, {"requests": 0, "queries": 0, "micros": 0, "max_queries": 0, "n_plus_one": 0})
+        stats["requests"] += 1
+        stats["queries"] += len(ctx.commands)
+        stats["micros"] += sum(micros for _, micros, _, _ in ctx.commands)
+        stats["max_queries"] = max(stats["max_queries"], len(ctx.commands))
+        for key, micros, returned, failed in ctx.commands:
+            _add_command(route, key, micros, returned, failed)
+        for key, count in repeats.items():
+            if count >= N_PLUS_ONE_MIN:
+                stats["n_plus_one"] += 1
+                entry = _n_plus_one.setdefault((route, *key), {"requests": 0, "max_repeats": 0})
+                entry["requests"] += 1
+                entry["max_repeats"] = max(entry["max_repeats"], count)
+
+
+def listeners() -> list:
+    """Event listeners for MongoClient (empty when QUERY_PROFILER is off)."""
+    return [QueryProfiler()] if QUERY_PROFILER else []
+
+
+def report(limit: int = 20) -> dict:
+    with _lock:
+        routes = [{"route": r, **s, "avg_queries": round(s["queries"] / s["requests"], 2),
+                   "avg_db_ms": round(s["micros"] / s["requests"] / 1000, 2)} for r, s in _routes.items()]
+        shapes = [{"route": k[0], "command": k[1], "collection": k[2], "filter": k[3], **s}
+                  for k, s in _shapes.items()]
+        n_plus_one = [{"route": k[0], "command": k[1], "collection": k[2], "filter": k[3], **s}
+                      for k, s in _n_plus_one.items()]
+        slow = list(_slow)
+    for s in shapes:
+        s["avg_ms"] = round(s["micros"] / max(1, s["count"]) / 1000, 2)
+        if s["explains"]:
+            s["examined_per_returned"] = round(s["docs_examined"] / max(1, s["explain_returned"]), 2)
+    return {
+        "enabled": QUERY_PROFILER,
+        "routes": sorted(routes, key=lambda r: r["micros"], reverse=True)[:limit],
+        "queries": sorted(shapes, key=lambda s: s["micros"], reverse=True)[:limit],
+        "n_plus_one": sorted(n_plus_one, key=lambda s: s["max_repeats"], reverse=True)[:limit],
+        "slow": slow[-limit:][::-1],
+        "budget_violations": budget_violations(),
+    }
+
+
+def reset():
+    with _lock:
+        _routes.clear()
+        _shapes.clear()
+        _n_plus_one.clear()
+        _slow.clear()
+
+
+def budget_violations(budgets: dict | None = None) -> list[dict]:
+    """Routes whose worst request issued more commands than their budget."""
+    budgets = QUERY_BUDGETS if budgets is None else budgets
+    return [{"route": route, "budget": budget, "max_queries": _routes[route]["max_queries"]}
+            for route, budget in budgets.items()
+            if route in _routes and _routes[route]["max_queries"] > budget]
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """Fail if the block issues more than `max_queries` MongoDB commands.
+
+    Yields the list the commands are collected in, as (route, shape key,
+    micros) once the block exits.
+
+        with query_budget(4):
+            client.get("/api/videos/for-you")
+    """
+    capture = []
+    _captures.append(capture)
+    try:
+        yield capture
+    finally:
+        _captures.remove(capture)
+        capture[:] = [(ctx.name if ctx else "background", key, micros) for ctx, key, micros in capture]
+    if len(capture) > max_queries:
+        issued = "\n".join(f"  {route}: {' '.join(filter(None, key))} ({micros}us)" for route, key, micros in capture)
+        raise AssertionError(f"{len(capture)} queries issued, budget is {max_queries}:\n{issued}")
@@ -0,0 +1,134 @@
+""""For You" ranking for approved videos.
+
+The score is log-space engagement plus a recency term that grows linearly
+with creation time:
+
+    rank_score = log2(1 + engagement) + affinity + hours_since(EPOCH) / HALF_LIFE_HOURS
+
+so a video needs twice the engagement to outrank one HALF_LIFE_HOURS newer.
+Because the decay is folded into the creation-time term, a score never goes
+stale with age; it only changes when engagement or author affinity does. The
+ranking job therefore re-scores only videos (and authors) whose stats changed
+since its last run, and the feed reads top-N straight from the
+(status, rank_score, _id) index (VideoRepository.ranked).
+
+Author affinity is an author-level quality signal: the author's mean
+engagement per approved video, log-scaled and capped.
+"""
+import math
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+
+JOB_ID = "video_ranking"
+EPOCH = datetime(2024, 1, 1)
+HALF_LIFE_HOURS = 36.0
+VIEW_WEIGHT = 0.2
+LIKE_WEIGHT = 2.0
+COMMENT_WEIGHT = 4.0
+AFFINITY_WEIGHT = 0.5
+MAX_AFFINITY = 3.0
+BATCH_SIZE = 1000
+
+SCORE_FIELDS = {"user_id": 1, "created_at": 1, "view_count": 1, "like_count": 1, "comment_count": 1}
+
+
+def engagement(doc: dict) -> float:
+    return (VIEW_WEIGHT * (doc.get("view_count") or 0)
+            + LIKE_WEIGHT * (doc.get("like_count") or 0)
+            + COMMENT_WEIGHT * (doc.get("comment_count") or 0))
+
+
+def affinity(mean_engagement: float) -> float:
+    return min(MAX_AFFINITY, AFFINITY_WEIGHT * math.log2(1 + max(0.0, mean_engagement)))
+
+
+def score(created_at: datetime | None, engagement_value: float = 0.0, author_affinity: float = 0.0) -> float:
+    created_at = created_at if isinstance(created_at, datetime) else EPOCH
+    hours = (created_at - EPOCH).total_seconds() / 3600
+    return round(math.log2(1 + engagement_value) + author_affinity + hours / HALF_LIFE_HOURS, 6)
+
+
+def score_video(doc: dict, author_affinity: float = 0.0) -> float:
+    return score(doc.get("created_at"), engagement(doc), author_affinity)
+
+
+def author_affinities(db, author_ids: list[str] | None = None) -> dict[str, float]:
+    match = {"status": "approved"}
+    if author_ids is not None:
+        match["user_id"] = {"$in": author_ids}
+    pipeline = [
+        {"$match": match},
+        {"$group": {"_id": "$user_id", "mean": {"$avg": {"$add": [
+            {"$multiply": [VIEW_WEIGHT, {"$ifNull": ["$view_count", 0]}]},
+            {"$multiply": [LIKE_WEIGHT, {"$ifNull": ["$like_count", 0]}]},
+            {"$multiply": [COMMENT_WEIGHT, {"$ifNull": ["$comment_count", 0]}]}
+        ]}}}}
+    ]
+    return {row["_id"]: affinity(row["mean"] or 0.0) for row in db.user_videos.aggregate(pipeline, allowDiskUse=True)}
+
+
+def _changed_authors(db, since: datetime) -> list[str]:
+    query = {"$or": [
+        {"status": "approved", "rank_score": {"$exists": False}},
+        {"status": "approved", "stats_updated_at": {"$gte": since}},
+        # Approvals, rejections and hides move the author's affinity too
+        {"status_changed_at": {"$gte": since}}
+    ]}
+    return db.user_videos.distinct("user_id", query)
+
+
+def run_ranking_job(db, full: bool = False) -> int:
+    """Re-score approved videos. Returns the number of videos written.
+
+    Incremental runs re-score every video by authors with a new, changed or
+    re-moderated video since the last run (an author's affinity moves all
+    their scores).
+    """
+    started = datetime.utcnow()
+    state = db.job_state.find_one({"_id": JOB_ID}) or {}
+    if full or not state.get("last_run"):
+        authors = None
+    else:
+        authors = _changed_authors(db, state["last_run"])
+        if not authors:
+            db.job_state.update_one({"_id": JOB_ID}, {"$set": {"last_run": started}}, upsert=True)
+            return 0
+
+    affinities = author_affinities(db, authors)
+    query = {"status": "approved"}
+    if authors is not None:
+        query["user_id"] = {"$in": authors}
+
+    written = 0
+    ops = []
+    for doc in db.user_videos.find(query, SCORE_FIELDS):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "rank_score": score_video(doc, affinities.get(doc.get("user_id"), 0.0))
+        }}))
+        if len(ops) >= BATCH_SIZE:
+            db.user_videos.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+    if ops:
+        db.user_videos.bulk_write(ops, ordered=False)
+        written += len(ops)
+
+    db.job_state.update_one({"_id": JOB_ID}, {"$set": {"last_run": started}}, upsert=True)
+    return written
+
+
+def encode_cursor(doc: dict) -> str:
+    return f"{doc.get('rank_score') or 0.0!r}:{doc['_id']}"
+
+
+def cursor_filter(cursor: str) -> dict:
+    """Filter for items after `cursor` in (rank_score desc, _id desc) order. Raises ValueError."""
+    raw_score, _, raw_id = cursor.partition(":")
+    value = float(raw_score)
+    oid = ObjectId(raw_id)
+    return {"$or": [
+        {"rank_score": {"$lt": value}},
+        {"rank_score": value, "_id": {"$lt": oid}}
+    ]}
+
@@ -0,0 +1,104 @@
+"""Per-request context shared by the profiling and metrics hooks.
+
+`RequestContextMiddleware` opens a `RequestContext` for each HTTP request
+and publishes it through a contextvar, which FastAPI copies into the thread
+running a sync endpoint, so code deep in a request (a pymongo listener, an
+outbound API call) can find the request it belongs to with `current()`.
+When the response is done, each function registered with `on_request_end`
+is called with the finished context (and each `on_request_start` function
+with the new one).
+
+The route is resolved after routing as the matched path template
+(`/api/videos/{video_id}`), so samples group per endpoint, not per URL.
+"""
+import time
+from contextvars import ContextVar
+
+_current: ContextVar["RequestContext | None"] = ContextVar("request_context", default=None)
+_starters = []
+_finishers = []
+
+
+class RequestContext:
+    __slots__ = ("scope", "method", "started", "finished", "status", "commands", "external_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.method = scope.get("method", "")
+        self.started = time.perf_counter()
+        self.finished = None
+        self.status = None
+        self.commands = []  # (shape key, micros, returned, failed) from services.query_profiler
+        self.external_seconds = 0.0  # outbound API time, see services.metrics.external_call
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or "unmatched"
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.route}"
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+
+def current() -> RequestContext | None:
+    return _current.get()
+
+
+def current_route() -> str:
+    ctx = _current.get()
+    return ctx.name if ctx else "background"
+
+
+def on_request_start(callback):
+    """Register `callback(ctx)` to run when a request arrives (before routing)."""
+    if callback not in _starters:
+        _starters.append(callback)
+    return callback
+
+
+def _run(callbacks, ctx):
+    for callback in callbacks:
+        try:
+            callback(ctx)
+        except Exception as e:
+            print(f"Request hook {callback.__name__} failed: {e}")
+
+
+def on_request_end(callback):
+    """Register `callback(ctx)` to run after every HTTP response."""
+    if callback not in _finishers:
+        _finishers.append(callback)
+    return callback
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        ctx = RequestContext(scope)
+        token = _current.set(ctx)
+        _run(_starters, ctx)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                ctx.status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            ctx.status = 500
+            raise
+        finally:
+            ctx.finished = time.perf_counter()
+            _current.reset(token)
+            _run(_finishers, ctx)
@@ -0,0 +1,385 @@
+"""Response cache for public, read-heavy GET endpoints.
+
+POLICIES lists the cached routes with a TTL and the tags their entries are
+filed under. `ResponseCacheMiddleware` serves a matching GET from the cache
+when it can, and otherwise runs the endpoint and stores the rendered body.
+Every response carries an ETag, and a request whose `If-None-Match` already
+has it gets a bodyless 304.
+
+The key is the path plus the sorted query string, minus the policy's viewer
+parameter (`user_id`, `current_user_id`), so one entry serves everyone. The
+endpoint runs without the viewer, and the viewer-specific bits (the
+`is_liked_by_me` flags) are filled in per request by the policy's
+`personalize` function, with one indexed query instead of the whole endpoint.
+
+Write routes call `invalidate(tag, ...)` for the data they change; TTLs
+bound staleness for writes that don't (like and view counts). Invalidation
+also bumps a per-tag generation, read before a miss renders and checked when
+it is stored, so a render that overlapped a write never caches its stale body.
+
+Backends (RESPONSE_CACHE): "memory" is an in-process LRU, so invalidation
+reaches only the worker that made the change and other workers keep serving
+their copy until its TTL runs out; it suits single-worker deployments only.
+"mongo" keeps entries in the `response_cache` collection, shared by every
+worker, and is the one to use with several workers or instances; "off"
+disables the middleware.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import compile_path
+from config import RESPONSE_CACHE, RESPONSE_CACHE_ENTRIES
+
+
+class Policy:
+    def __init__(self, path: str, ttl: int, tags: tuple[str, ...], viewer: str | None = None,
+                 personalize=None, when=None):
+        self.path = path
+        self.regex = compile_path(path)[0]
+        self.ttl = ttl
+        self.tags = tags  # formatted with the path params, e.g. "profile:{user_id}"
+        self.viewer = viewer  # query param left out of the key and handed to personalize
+        self.personalize = personalize  # personalize(db, body, viewer_id) fills in viewer-specific fields
+        self.when = when  # when(query) -> False skips the cache for that request
+        self.route = None  # the matched starlette route, restored on hits for metrics/profiling
+
+
+def _liked_videos(db, videos: list, viewer_id: str):
+    from services.video_repository import VideoRepository
+    liked = VideoRepository(db).liked_ids([v["id"] for v in videos], viewer_id)
+    for v in videos:
+        v["is_liked_by_me"] = v["id"] in liked
+
+
+def _liked_profile_posts(db, profile: dict, viewer_id: str):
+    posts = profile.get("posts") or []
+    if not posts:
+        return
+    liked = set(item["post_id"] for item in db.likes.find(
+        {"post_id": {"$in": [p["id"] for p in posts]}, "user_id": viewer_id}, {"post_id": 1}
+    ))
+    for p in posts:
+        p["is_liked_by_me"] = p["id"] in liked
+
+
+POLICIES = [
+    Policy("/api/community-stories/", ttl=300, tags=("community-stories",)),
+    Policy("/api/marketplace", ttl=60, tags=("marketplace",)),
+    # Page 1 only: deeper pages are rarely shared between viewers
+    Policy("/api/videos/", ttl=30, tags=("videos",), viewer="user_id", personalize=_liked_videos,
+           when=lambda query: query.get("skip", "0") == "0"),
+    Policy("/api/users/{user_id}", ttl=30, tags=("profile:{user_id}",), viewer="current_user_id",
+           personalize=_liked_profile_posts),
+]
+
+
+class MemoryBackend:
+    """In-process LRU of at most `max_entries` responses."""
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._by_tag: dict[str, set] = {}
+        self._lock = threading.Lock()
+        # tag -> sequence number of its last invalidation, most recent last.
+        # Forgotten tags read as the highest sequence forgotten so far, so
+        # forgetting one can only make a pending store look stale, never fresh.
+        self._tag_generations: OrderedDict[str, int] = OrderedDict()
+        self._sequence = 0
+        self._forgotten = 0
+
+    def _generation(self, tags) -> tuple:
+        return tuple(self._tag_generations.get(tag, self._forgotten) for tag in tags)
+
+    def generation(self, tags) -> tuple:
+        with self._lock:
+            return self._generation(tags)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: dict, generation: tuple | None = None) -> bool:
+        """Store `entry` unless its tags were invalidated since `generation` was read."""
+        with self._lock:
+            if generation is not None and self._generation(entry["tags"]) != generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in entry["tags"]:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+            return True
+
+    def invalidate(self, tags) -> int:
+        with self._lock:
+            for tag in tags:
+                self._sequence += 1
+                self._tag_generations[tag] = self._sequence
+                self._tag_generations.move_to_end(tag)
+            while len(self._tag_generations) > 10 * self.max_entries:
+                self._forgotten = max(self._forgotten, self._tag_generations.popitem(last=False)[1])
+            keys = set().union(*(self._by_tag.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        for tag in (entry or {}).get("tags", ()):
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+class MongoBackend:
+    """Entries in the `response_cache` collection, shared by every worker (TTL index on expires_at).
+
+    Tag generations live in `response_cache_tags` (TTL on updated_at, far
+    longer than any render).
+    """
+    blocking = True
+
+    def _collection(self, name: str = "response_cache"):
+        from database import get_db
+        db = get_db()
+        return db[name] if db is not None else None
+
+    def generation(self, tags) -> tuple | None:
+        coll = self._collection("response_cache_tags")
+        if coll is None:
+            return None
+        found = {doc["_id"]: doc["generation"] for doc in coll.find({"_id": {"$in": list(tags)}})}
+        return tuple(found.get(tag, 0) for tag in tags)
+
+    def get(self, key: str) -> dict | None:
+        coll = self._collection()
+        doc = coll.find_one({"_id": key}) if coll is not None else None
+        # The TTL monitor only runs once a minute
+        if doc is None or doc["expires_at"] <= datetime.utcnow():
+            return None
+        return {**doc, "expires_at": time.time() + (doc["expires_at"] - datetime.utcnow()).total_seconds()}
+
+    def set(self, key: str, entry: dict, generation: tuple | None = None) -> bool:
+        """Store `entry` unless its tags were invalidated since `generation` was read."""
+        coll = self._collection()
+        if coll is None or (generation is not None and self.generation(entry["tags"]) != generation):
+            return False
+        expires_at = datetime.utcnow() + timedelta(seconds=max(0.0, entry["expires_at"] - time.time()))
+        coll.replace_one({"_id": key}, {**entry, "expires_at": expires_at}, upsert=True)
+        # invalidate bumps before it deletes, so a bump we missed above either
+        # deletes this entry itself or shows up here
+        if generation is not None and self.generation(entry["tags"]) != generation:
+            coll.delete_one({"_id": key})
+            return False
+        return True
+
+    def invalidate(self, tags) -> int:
+        coll = self._collection()
+        if coll is None:
+            return 0
+        now = datetime.utcnow()
+        self._collection("response_cache_tags").bulk_write([
+            UpdateOne({"_id": tag}, {"$inc": {"generation": 1}, "$set": {"updated_at": now}}, upsert=True)
+            for tag in tags
+        ], ordered=False)
+        return coll.delete_many({"tags": {"$in": list(tags)}}).deleted_count
+
+    def clear(self):
+        coll = self._collection()
+        if coll is not None:
+            coll.delete_many({})
+
+    def size(self) -> int:
+        coll = self._collection()
+        return coll.estimated_document_count() if coll is not None else 0
+
+
+def _make_backend():
+    if RESPONSE_CACHE == "memory":
+        return MemoryBackend(RESPONSE_CACHE_ENTRIES)
+    if RESPONSE_CACHE == "mongo":
+        return MongoBackend()
+    return None
+
+
+_backend = _make_backend()
+_stats_lock = threading.Lock()
+_stats: dict[str, dict] = {}
+
+
+def _count(policy: Policy, outcome: str):
+    with _stats_lock:
+        counts = _stats.setdefault(policy.path, {"hit": 0, "miss": 0, "not_modified": 0, "bypass": 0})
+        counts[outcome] += 1
+
+
+def invalidate(*tags: str) -> int:
+    """Drop cached responses filed under any of `tags`. Never raises."""
+    if _backend is None or not tags:
+        return 0
+    try:
+        return _backend.invalidate(tags)
+    except PyMongoError as e:
+        print(f"Response cache invalidation failed for {tags}: {e}")
+        return 0
+
+
+def clear():
+    if _backend is not None:
+        _backend.clear()
+
+
+def stats() -> dict:
+    with _stats_lock:
+        routes = {path: dict(counts) for path, counts in _stats.items()}
+    return {"backend": RESPONSE_CACHE, "entries": _backend.size() if _backend is not None else 0,
+            "routes": routes, "policies": {p.path: {"ttl": p.ttl, "tags": list(p.tags)} for p in POLICIES}}
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+def _match(path: str) -> tuple[Policy, dict] | tuple[None, None]:
+    for policy in POLICIES:
+        match = policy.regex.match(path)
+        if match:
+            return policy, match.groupdict()
+    return None, None
+
+
+def _personalized(policy: Policy, body: bytes, viewer_id: str) -> bytes:
+    from database import get_db
+    data = json.loads(body)
+    policy.personalize(get_db(), data, viewer_id)
+    # Same rendering as starlette's JSONResponse
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+async def _call(backend, method: str, *args):
+    try:
+        if backend.blocking:
+            return await run_in_threadpool(getattr(backend, method), *args)
+        return getattr(backend, method)(*args)
+    except PyMongoError as e:
+        # A cache failure must never fail the request
+        print(f"Response cache {method} failed: {e}")
+        return None
+
+
+class ResponseCacheMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or _backend is None:
+            return await self.app(scope, receive, send)
+        policy, path_params = _match(scope["path"])
+        if policy is None:
+            return await self.app(scope, receive, send)
+
+        query = parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        if policy.when and not policy.when(dict(query)):
+            _count(policy, "bypass")
+            return await self.app(scope, receive, send)
+        viewer_id = dict(query).get(policy.viewer) if policy.viewer else None
+        shared_query = urlencode(sorted((k, v) for k, v in query if k != policy.viewer))
+        key = f"{scope['path']}?{shared_query}"
+
+        entry = await _call(_backend, "get", key)
+        outcome = "hit"
+        if entry is None:
+            outcome = "miss"
+            tags = [tag.format(**path_params) for tag in policy.tags]
+            generation = await _call(_backend, "generation", tags)
+            inner_scope = dict(scope, query_string=shared_query.encode("latin-1"))
+            start, body = await self._render(inner_scope, receive)
+            # Let the request context see the matched route, as it would without the cache
+            for k in ("route", "endpoint", "path_params"):
+                if k in inner_scope:
+                    scope[k] = inner_scope[k]
+            headers = dict(start.get("headers") or [])
+            if start["status"] != 200 or not headers.get(b"content-type", b"").startswith(b"application/json"):
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            policy.route = inner_scope.get("route")
+            entry = {"body": body, "etag": etag_for(body), "content_type": headers[b"content-type"].decode("latin-1"),
+                     "tags": tags, "expires_at": time.time() + policy.ttl}
+            if generation is not None:
+                # Skipped when a write invalidated these tags during the render
+                await _call(_backend, "set", key, entry, generation)
+        elif policy.route is not None:
+            scope["route"] = policy.route
+
+        body, etag = entry["body"], entry["etag"]
+        if viewer_id and policy.personalize:
+            body = await run_in_threadpool(_personalized, policy, body, viewer_id)
+            etag = etag_for(body)
+
+        request_headers = dict(scope.get("headers") or [])
+        not_modified = _etag_matches(request_headers.get(b"if-none-match", b"").decode("latin-1"), etag)
+        _count(policy, "not_modified" if not_modified else outcome)
+        headers = [
+            (b"etag", etag.encode("latin-1")),
+            # Browsers revalidate every time; the 304 keeps that cheap and invalidation immediate
+            (b"cache-control", b"private, no-cache" if viewer_id else b"public, no-cache"),
+            (b"x-cache", outcome.upper().encode("latin-1")),
+        ]
+        if not_modified:
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers += [(b"content-type", entry["content_type"].encode("latin-1")),
+                    (b"content-length", str(len(body)).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _render(self, scope, receive) -> tuple[dict, bytes]:
+        """Run the app and collect its whole response."""
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        return start, b"".join(chunks)
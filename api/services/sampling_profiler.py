@@ -0,0 +1,159 @@
+"""On-demand sampling profiler (flame graphs per route).
+
+Nothing runs until an admin starts a capture. A capture is one background
+thread that reads every thread's stack with `sys._current_frames()` each
+`interval` for `seconds`, then stops, so there is no cost when idle and a
+small, fixed one (a stack walk per busy thread per tick) while sampling.
+
+Samples are tagged with the route whose endpoint function is on the stack:
+endpoint code objects are mapped to "METHOD /path" from the app's routes, so
+this works for sync endpoints in the threadpool and async ones on the loop
+alike. Threads not serving a request (idle workers, flushers) are dropped
+unless `all_threads` is set, in which case they are tagged by thread name.
+
+Results come out as collapsed stacks (`route;frame;frame count`, for
+flamegraph.pl / speedscope import) or as a speedscope JSON document with
+one sampled profile per route.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+MAX_SECONDS = 60
+MAX_DEPTH = 128
+MIN_INTERVAL = 0.001
+
+_lock = threading.Lock()
+_capture: "Capture | None" = None
+
+
+class Capture:
+    def __init__(self, endpoints: dict, seconds: float, interval: float, all_threads: bool):
+        self.endpoints = endpoints
+        self.seconds = seconds
+        self.interval = interval
+        self.all_threads = all_threads
+        self.stacks: Counter = Counter()  # (tag, (code, ...)) -> samples
+        self.samples = 0
+        self.started_at = datetime.utcnow()
+        self.elapsed = 0.0
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def _tag(self, frames: list, thread_names: dict, ident: int) -> str | None:
+        for code in frames:
+            route = self.endpoints.get(code)
+            if route:
+                return route
+        return f"thread:{thread_names.get(ident, ident)}" if self.all_threads else None
+
+    def _sample(self, own_ident: int):
+        thread_names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames = []
+            while frame is not None and len(frames) < MAX_DEPTH:
+                frames.append(frame.f_code)
+                frame = frame.f_back
+            frames.reverse()  # root first
+            tag = self._tag(frames, thread_names, ident)
+            if tag:
+                self.stacks[(tag, tuple(frames))] += 1
+                self.samples += 1
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + self.seconds
+        try:
+            while time.perf_counter() < deadline:
+                self._sample(own_ident)
+                time.sleep(self.interval)
+        finally:
+            self.elapsed = time.perf_counter() - started
+            self.done.set()
+
+    def status(self) -> dict:
+        return {"running": not self.done.is_set(), "started_at": self.started_at.isoformat(),
+                "seconds": self.seconds, "interval_ms": self.interval * 1000,
+                "samples": self.samples, "elapsed": round(self.elapsed, 3)}
+
+
+def endpoint_map(routes) -> dict:
+    """Endpoint code object -> "METHOD /path" for every API route."""
+    endpoints = {}
+    for route in routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is not None:
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            endpoints[code] = f"{methods} {route.path}".strip()
+    return endpoints
+
+
+def start(routes, seconds: float = 10, interval: float = 0.01, all_threads: bool = False) -> Capture | None:
+    """Start a capture; None if one is already running."""
+    global _capture
+    with _lock:
+        if _capture is not None and not _capture.done.is_set():
+            return None
+        _capture = Capture(endpoint_map(routes), min(max(seconds, 0.1), MAX_SECONDS),
+                           max(interval, MIN_INTERVAL), all_threads)
+        _capture.thread.start()
+        return _capture
+
+
+def latest() -> Capture | None:
+    return _capture
+
+
+def _frame_name(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def collapsed(capture: Capture) -> str:
+    """Brendan Gregg's folded format, one "route;root;...;leaf count" per line."""
+    lines = []
+    for (tag, frames), count in capture.stacks.most_common():
+        names = [tag] + [_frame_name(code).replace(";", ",") for code in frames]
+        lines.append(f"{';'.join(names)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope(capture: Capture) -> dict:
+    """speedscope.app file format: one sampled profile per route, weights in seconds."""
+    frame_index = {}
+    frames = []
+    profiles = {}
+    for (tag, stack), count in capture.stacks.items():
+        indexes = []
+        for code in stack:
+            if code not in frame_index:
+                frame_index[code] = len(frames)
+                frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+            indexes.append(frame_index[code])
+        profile = profiles.setdefault(tag, {"samples": [], "weights": []})
+        profile["samples"].append(indexes)
+        profile["weights"].append(round(count * capture.interval, 6))
+
+    ordered = sorted(profiles.items(), key=lambda item: sum(item[1]["weights"]), reverse=True)
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"MindRise API {capture.started_at.isoformat()}",
+        "exporter": "mindrise-api sampling_profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": tag,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": round(sum(profile["weights"]), 6),
+            "samples": profile["samples"],
+            "weights": profile["weights"],
+        } for tag, profile in ordered],
+    }
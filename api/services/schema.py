@@ -0,0 +1,331 @@
+"""Declared indexes, validators and versioned data migrations.
+
+INDEXES lists every index the app's queries rely on, per collection, and
+`_validators` the JSON-schema validators. `diff` compares them with the live
+database (matching indexes by key pattern, so legacy names still count),
+`apply_indexes` builds whatever is missing, and `index_usage` reports
+`$indexStats` counters so unused or missing coverage shows up as queries
+change. Extra indexes are only reported, never dropped implicitly.
+
+MIGRATIONS are one-shot data migrations applied in version order and
+recorded in `schema_migrations`. Those marked `startup` are cheap and
+idempotent and run on every boot; the rest run from `migrate.py`.
+
+On startup `start_schema_check` first builds any missing unique and TTL
+indexes synchronously: write paths rely on those for correctness (video like
+and unread like-notification dedup go through DuplicateKeyError), and they
+are cheap on the new or small collections where they can be missing. The
+rest of the check runs on a background thread, so the first request never
+waits for an ordinary index build.
+"""
+import importlib
+import threading
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+def _index(keys, **options) -> dict:
+    if isinstance(keys, str):
+        keys = [(keys, ASCENDING)]
+    return {"keys": list(keys), **options}
+
+
+INDEXES = {
+    "users": [
+        _index("email"),
+        _index("mobile"),
+        _index("phone_number", sparse=True),
+        _index("seller_status"),
+    ],
+    "otp_codes": [
+        _index("expires_at", expireAfterSeconds=0),
+        _index("phone_number"),
+    ],
+    "seller_registrations": [
+        _index("email"),
+    ],
+    "posts": [
+        _index([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        _index([("status", ASCENDING), ("moderation_category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        _index([("user_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "likes": [
+        _index([("post_id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+    "comments": [
+        _index([("post_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "user_videos": [
+        _index([("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        _index([("status", ASCENDING), ("moderation_category", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        _index([("status", ASCENDING), ("rank_score", DESCENDING), ("_id", DESCENDING)]),
+        _index("user_id"),
+        _index("stats_updated_at", sparse=True),
+        _index("status_changed_at", sparse=True),
+    ],
+    "video_likes": [
+        _index([("video_id", ASCENDING), ("user_id", ASCENDING)], unique=True),
+    ],
+    "video_comments": [
+        _index([("video_id", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "moderation_events": [
+        _index([("target_id", ASCENDING), ("ts", DESCENDING), ("_id", DESCENDING)]),
+        _index([("operator", ASCENDING), ("ts", DESCENDING)]),
+    ],
+    "friends": [
+        _index([("sender_id", ASCENDING), ("status", ASCENDING)]),
+        _index([("status", ASCENDING), ("updated_at", ASCENDING)]),
+        _index([("receiver_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "friend_graph_changes": [
+        # services.suggestions.CHANGE_RETENTION
+        _index("at", expireAfterSeconds=7 * 86400),
+    ],
+    "notifications": [
+        _index("expires_at", expireAfterSeconds=0),
+        _index([("user_id", ASCENDING), ("updated_at", DESCENDING), ("_id", DESCENDING)]),
+        _index([("user_id", ASCENDING), ("post_id", ASCENDING)], name="unread_like_unique", unique=True,
+               partialFilterExpression={"type": "like", "is_read": False}),
+    ],
+    "journals": [
+        _index([("user_id", ASCENDING), ("date", DESCENDING)]),
+    ],
+    "products": [
+        _index([("seller_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "community_stories": [
+        _index([("created_at", DESCENDING)]),
+    ],
+    "rooms": [
+        _index("status"),
+        _index("host_id"),
+    ],
+    "session_attendance": [
+        _index([("room_id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+    "session_payments": [
+        _index([("room_id", ASCENDING), ("user_id", ASCENDING), ("payment_status", ASCENDING)]),
+    ],
+    "activity_ledger": [
+        _index("month"),
+        _index([("user_id", ASCENDING), ("month", DESCENDING)]),
+    ],
+    "activity_cohorts": [
+        _index("cohort_month"),
+    ],
+    "link_health": [
+        _index("failures"),
+    ],
+    "response_cache": [
+        _index("expires_at", expireAfterSeconds=0),
+        _index("tags"),
+    ],
+    "response_cache_tags": [
+        _index("updated_at", expireAfterSeconds=86400),
+    ],
+}
+
+
+def _validators() -> dict:
+    from services.video_repository import VIDEO_VALIDATOR
+    return {
+        # Installed once legacy documents have been converted
+        "user_videos": {"validator": VIDEO_VALIDATOR, "level": "moderate", "after": "video_fields"},
+    }
+
+
+# version, name, "module:function" taking db, run on startup
+MIGRATIONS = [
+    (1, "notification_ttl", "services.notifications:migrate_legacy_ttl", True),
+    (2, "video_fields", "migrate_video_fields:migrate", False),
+    (3, "moderation_logs", "migrate_moderation_logs:migrate", False),
+]
+
+# Index options that make two indexes on the same keys different
+COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+_checker: threading.Thread | None = None
+
+
+def index_name(spec: dict) -> str:
+    return spec.get("name") or "_".join(f"{field}_{direction}" for field, direction in spec["keys"])
+
+
+def _key_pattern(keys) -> tuple:
+    return tuple((field, int(direction) if isinstance(direction, (int, float)) else direction)
+                 for field, direction in keys)
+
+
+def _options(info: dict) -> dict:
+    return {opt: info[opt] for opt in COMPARED_OPTIONS if info.get(opt) not in (None, False)}
+
+
+def diff(db, collections=None, validators: bool = True) -> dict:
+    """Declared vs live indexes and validators, per collection.
+
+    {collection: {"missing": [names], "conflicting": [names], "extra": [names],
+    "validator": "ok" | "missing" | "differs"}} (validator only where declared,
+    and only with `validators`).
+    """
+    report = {}
+    existing_collections = set(db.list_collection_names())
+    validators = _validators() if validators else {}
+    for collection in collections or INDEXES:
+        live = db[collection].index_information() if collection in existing_collections else {}
+        live_by_keys = {_key_pattern(info["key"]): (name, info) for name, info in live.items()}
+        declared_keys = set()
+        entry = {"missing": [], "conflicting": [], "extra": []}
+        for spec in INDEXES.get(collection, []):
+            keys = _key_pattern(spec["keys"])
+            declared_keys.add(keys)
+            match = live_by_keys.get(keys)
+            if match is None:
+                entry["missing"].append(index_name(spec))
+            elif _options(match[1]) != _options(spec):
+                entry["conflicting"].append(match[0])
+        entry["extra"] = sorted(name for keys, (name, _) in live_by_keys.items()
+                                if keys not in declared_keys and name != "_id_")
+
+        if collection in validators:
+            entry["validator"] = _validator_state(db, collection, validators[collection]["validator"])
+        report[collection] = entry
+    return report
+
+
+def _validator_state(db, collection: str, validator: dict) -> str:
+    info = next(iter(db.list_collections(filter={"name": collection})), None)
+    live = ((info or {}).get("options") or {}).get("validator")
+    if not live:
+        return "missing"
+    return "ok" if live == validator else "differs"
+
+
+def is_constraint(spec: dict) -> bool:
+    """Unique and TTL indexes, which writes rely on for correctness rather than speed."""
+    return bool(spec.get("unique")) or "expireAfterSeconds" in spec
+
+
+def apply_indexes(db, collections=None, constraints_only: bool = False) -> dict:
+    """Build every missing declared index (or only `is_constraint` ones). Returns {collection: [created names]}.
+
+    Indexes whose keys exist with different options are reported by `diff`
+    and left alone; changing them needs a deliberate drop.
+    """
+    created = {}
+    for collection, entry in diff(db, collections, validators=False).items():
+        missing = [spec for spec in INDEXES.get(collection, [])
+                   if index_name(spec) in entry["missing"] and (is_constraint(spec) or not constraints_only)]
+        if not missing:
+            continue
+        models = [IndexModel(spec["keys"], name=index_name(spec), background=True,
+                             **{k: v for k, v in spec.items() if k not in ("keys", "name")})
+                  for spec in missing]
+        try:
+            created[collection] = db[collection].create_indexes(models)
+        except OperationFailure as e:
+            print(f"Index build failed on {collection}: {e}")
+    return created
+
+
+def drop_extra_indexes(db, collections=None) -> dict:
+    dropped = {}
+    for collection, entry in diff(db, collections).items():
+        for name in entry["extra"]:
+            db[collection].drop_index(name)
+        if entry["extra"]:
+            dropped[collection] = entry["extra"]
+    return dropped
+
+
+def index_usage(db, collections=None) -> dict:
+    """{collection: {index name: {"ops", "since"}}} from $indexStats."""
+    usage = {}
+    for collection in collections or INDEXES:
+        try:
+            usage[collection] = {
+                row["name"]: {"ops": row["accesses"]["ops"], "since": row["accesses"]["since"]}
+                for row in db[collection].aggregate([{"$indexStats": {}}])
+            }
+        except OperationFailure as e:
+            usage[collection] = {"error": str(e)}
+    return usage
+
+
+def applied_migrations(db) -> set[int]:
+    return set(db.schema_migrations.distinct("_id"))
+
+
+def pending_migrations(db) -> list[tuple]:
+    done = applied_migrations(db)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def run_migrations(db, startup_only: bool = False) -> list[str]:
+    """Apply pending migrations in version order, stopping at the first failure."""
+    applied = []
+    for version, name, target, startup in pending_migrations(db):
+        if startup_only and not startup:
+            break
+        module_name, _, function = target.partition(":")
+        started = datetime.utcnow()
+        result = getattr(importlib.import_module(module_name), function)(db)
+        db.schema_migrations.update_one({"_id": version}, {"$set": {
+            "name": name, "applied_at": datetime.utcnow(), "started_at": started,
+            "result": result if isinstance(result, (int, str, dict)) else None
+        }}, upsert=True)
+        applied.append(name)
+    return applied
+
+
+def apply_validators(db) -> list[str]:
+    """Install declared validators whose prerequisite migration has been applied."""
+    done = {name for version, name, _, _ in MIGRATIONS if version in applied_migrations(db)}
+    installed = []
+    for collection, spec in _validators().items():
+        if spec.get("after") and spec["after"] not in done:
+            continue
+        if collection not in db.list_collection_names():
+            db.create_collection(collection, validator=spec["validator"], validationLevel=spec["level"])
+            installed.append(collection)
+        elif _validator_state(db, collection, spec["validator"]) != "ok":
+            db.command("collMod", collection, validator=spec["validator"], validationLevel=spec["level"])
+            installed.append(collection)
+    return installed
+
+
+def check(db) -> dict:
+    """Startup check: run startup migrations, build missing indexes, log the rest."""
+    applied = run_migrations(db, startup_only=True)
+    created = apply_indexes(db)
+    pending = [name for _, name, _, _ in pending_migrations(db)]
+    conflicts = {c: e["conflicting"] for c, e in diff(db).items() if e["conflicting"]}
+    if created:
+        print(f"Building indexes: {created}")
+    if pending:
+        print(f"Pending data migrations (run migrate.py): {', '.join(pending)}")
+    if conflicts:
+        print(f"Indexes differing from their declaration: {conflicts}")
+    return {"applied": applied, "created": created, "pending": pending, "conflicts": conflicts}
+
+
+def _check_in_background(db):
+    try:
+        check(db)
+    except Exception as e:
+        print(f"Schema check failed: {e}")
+
+
+def start_schema_check(db):
+    """Build missing unique/TTL indexes now, then run `check` on a background thread.
+
+    The background part is idempotent while one is running.
+    """
+    global _checker
+    created = apply_indexes(db, constraints_only=True)
+    if created:
+        print(f"Built constraint indexes: {created}")
+    if _checker is None or not _checker.is_alive():
+        _checker = threading.Thread(target=_check_in_background, args=(db,), name="schema-check", daemon=True)
+        _checker.start()
@@ -1,4 +1,5 @@
 import os
+from services.metrics import external_call
 
 # Optional twilio import
 try:
@@ -17,11 +18,12 @@ class SMSService:
         if TWILIO_AVAILABLE and account_sid and auth_token and from_number:
             try:
                 client = Client(account_sid, auth_token)
-                message = client.messages.create(
-                    body=f"Your MindRise verification code is: {otp}",
-                    from_=from_number,
-                    to=mobile if mobile.startswith("+") else f"+91{mobile}" # Assuming IN for now, or just use input
-                )
+                with external_call("twilio"):
+                    message = client.messages.create(
+                        body=f"Your MindRise verification code is: {otp}",
+                        from_=from_number,
+                        to=mobile if mobile.startswith("+") else f"+91{mobile}" # Assuming IN for now, or just use input
+                    )
                 print(f"SMS sent via Twilio to {mobile}: {message.sid}")
                 return True
             except Exception as e:
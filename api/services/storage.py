@@ -0,0 +1,209 @@
+"""Content-addressed file storage for generic uploads.
+
+Uploads are keyed by the SHA-256 of their bytes plus the original extension,
+so identical files are stored once and every URL is immutable. Files are
+served at `/static/<key>` regardless of backend:
+
+- "local"  : a directory on disk (UPLOAD_DIR), served by StaticFiles
+- "gridfs" : the `uploads` GridFS bucket in the app database
+- "s3"     : any S3-compatible bucket (S3_ENDPOINT_URL can point at a local
+             stand-in such as MinIO)
+"""
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from urllib.parse import urlparse
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from config import (
+    STORAGE_BACKEND, UPLOAD_DIR, MAX_UPLOAD_BYTES,
+    S3_BUCKET, S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION
+)
+
+READ_CHUNK = 1024 * 1024
+_EXT_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+_KEY_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]*(\.[a-z0-9]{1,10})?$")
+
+
+def content_type_for(key: str) -> str:
+    return mimetypes.guess_type(key)[0] or "application/octet-stream"
+
+
+class LocalStorage:
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def temp_dir(self) -> str:
+        # Same filesystem as the final location, so the rename is atomic
+        return self.root
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.root, key))
+
+    def save(self, key: str, path: str):
+        os.replace(path, os.path.join(self.root, key))
+
+    def open(self, key: str):
+        with open(os.path.join(self.root, key), "rb") as f:
+            while chunk := f.read(READ_CHUNK):
+                yield chunk
+
+
+class GridFSStorage:
+    name = "gridfs"
+
+    def __init__(self, db):
+        import gridfs
+        self.db = db
+        self.bucket = gridfs.GridFSBucket(db, bucket_name="uploads")
+
+    def temp_dir(self) -> str | None:
+        return None
+
+    def exists(self, key: str) -> bool:
+        return self.db.uploads.files.find_one({"filename": key}, {"_id": 1}) is not None
+
+    def save(self, key: str, path: str):
+        with open(path, "rb") as f:
+            self.bucket.upload_from_stream(key, f, metadata={"contentType": content_type_for(key)})
+        os.remove(path)
+
+    def open(self, key: str):
+        import gridfs
+        try:
+            stream = self.bucket.open_download_stream_by_name(key)
+        except gridfs.errors.NoFile:
+            raise FileNotFoundError(key)
+        return iter(lambda: stream.read(READ_CHUNK), b"")
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str | None = None, access_key: str | None = None,
+                 secret_key: str | None = None, region: str | None = None):
+        import boto3  # optional dependency, only needed for STORAGE_BACKEND=s3
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=access_key,
+            aws_secret_access_key=secret_key,
+            region_name=region
+        )
+
+    def temp_dir(self) -> str | None:
+        return None
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def save(self, key: str, path: str):
+        self.client.upload_file(path, self.bucket, key, ExtraArgs={"ContentType": content_type_for(key)})
+        os.remove(path)
+
+    def open(self, key: str):
+        from botocore.exceptions import ClientError
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+        except ClientError:
+            raise FileNotFoundError(key)
+        return body.iter_chunks(READ_CHUNK)
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "gridfs":
+            from database import get_db
+            _storage = GridFSStorage(get_db())
+        elif STORAGE_BACKEND == "s3":
+            _storage = S3Storage(S3_BUCKET, S3_ENDPOINT_URL, S3_ACCESS_KEY, S3_SECRET_KEY, S3_REGION)
+        else:
+            _storage = LocalStorage(UPLOAD_DIR)
+    return _storage
+
+
+def _safe_extension(filename: str | None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _EXT_RE.match(ext) else ""
+
+
+async def store_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> str:
+    """Stream an upload into storage and return its content-addressed key.
+
+    The file is read in chunks, hashed and written to a temp file from a
+    worker thread; it is only moved into the backend if the key is new.
+    """
+    storage = get_storage()
+    digest = hashlib.sha256()
+    size = 0
+    tmp = await run_in_threadpool(tempfile.NamedTemporaryFile, dir=storage.temp_dir(),
+                                  prefix=".upload-", delete=False)
+    try:
+        while chunk := await file.read(READ_CHUNK):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File exceeds {max_bytes // (1024 * 1024)} MB limit")
+            digest.update(chunk)
+            await run_in_threadpool(tmp.write, chunk)
+        await run_in_threadpool(tmp.close)
+
+        key = digest.hexdigest() + _safe_extension(file.filename)
+        if await run_in_threadpool(storage.exists, key):
+            os.remove(tmp.name)
+        else:
+            await run_in_threadpool(storage.save, key, tmp.name)
+        return key
+    except BaseException:
+        tmp.close()
+        if os.path.exists(tmp.name):
+            os.remove(tmp.name)
+        raise
+
+
+def store_bytes(data: bytes, extension: str = "") -> str:
+    """Blocking counterpart of store_upload for bytes already in memory."""
+    storage = get_storage()
+    ext = extension if _EXT_RE.match(extension or "") else ""
+    key = hashlib.sha256(data).hexdigest() + ext
+    if not storage.exists(key):
+        with tempfile.NamedTemporaryFile(dir=storage.temp_dir(), prefix=".upload-", delete=False) as tmp:
+            tmp.write(data)
+        storage.save(key, tmp.name)
+    return key
+
+
+def read_bytes(key: str) -> bytes:
+    return b"".join(get_storage().open(key))
+
+
+def is_durable() -> bool:
+    """False when files land on an instance's ephemeral disk (local backend on Vercel)."""
+    return STORAGE_BACKEND != "local" or not os.getenv("VERCEL")
+
+
+def public_url(key: str) -> str:
+    return f"/static/{key}"
+
+
+def key_from_url(url: str | None) -> str | None:
+    """The storage key behind a `public_url` (absolute or not), None for anything else."""
+    path = urlparse(url or "").path
+    if not path.startswith("/static/"):
+        return None
+    key = path[len("/static/"):]
+    return key if _KEY_RE.match(key) else None
@@ -0,0 +1,189 @@
+"""Friend-of-friend ("people you may know") suggestions.
+
+Suggestions are precomputed by a batch job and stored one document per user in
+`friend_suggestions`, so the request path is a single `find_one`.
+
+The incremental job finds changed users from accepted friendships with a
+newer `updated_at`. Changes that leave no such row behind (a new, rejected
+or cancelled request, a removed friendship) are recorded with
+`record_graph_changes` in `friend_graph_changes`, which keeps them for
+CHANGE_RETENTION; a run whose previous one is older than that rebuilds
+everyone.
+"""
+import heapq
+from collections import Counter, defaultdict
+from itertools import islice
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReplaceOne
+
+JOB_ID = "friend_suggestions"
+TOP_K = 20
+# Bounded fan-out: at most this many friends are expanded per user, and at most
+# this many friends-of-friends are read per expanded friend.
+MAX_FRIENDS_EXPANDED = 50
+MAX_FOF_PER_FRIEND = 200
+BATCH_SIZE = 500
+CHANGE_RETENTION = timedelta(days=7)  # TTL of friend_graph_changes (see services.schema)
+
+
+def compute_suggestions(adjacency: dict, user_id: str, k: int = TOP_K,
+                        max_friends: int = MAX_FRIENDS_EXPANDED,
+                        max_fof: int = MAX_FOF_PER_FRIEND,
+                        exclude: set | None = None) -> list[tuple[str, int]]:
+    """Top-k (candidate_id, mutual_count) for one user from an in-memory adjacency map."""
+    friends = adjacency.get(user_id, ())
+    if not friends:
+        return []
+
+    skip = set(friends)
+    skip.add(user_id)
+    if exclude:
+        skip |= exclude
+
+    mutuals = Counter()
+    for friend_id in islice(friends, max_friends):
+        mutuals.update(islice(adjacency.get(friend_id, ()), max_fof))
+    for uid in skip:
+        mutuals.pop(uid, None)
+
+    # Ties break on id so reruns produce stable output
+    return heapq.nsmallest(k, mutuals.items(), key=lambda item: (-item[1], item[0]))
+
+
+def _load_adjacency(db, user_ids) -> dict:
+    """Accepted-friend adjacency for the given users."""
+    adjacency = defaultdict(list)
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[i:i + BATCH_SIZE]
+        cursor = db.friends.find(
+            {"status": "accepted", "$or": [
+                {"sender_id": {"$in": batch}},
+                {"receiver_id": {"$in": batch}}
+            ]},
+            {"sender_id": 1, "receiver_id": 1, "_id": 0}
+        )
+        wanted = set(batch)
+        for f in cursor:
+            s, r = f["sender_id"], f["receiver_id"]
+            if s in wanted:
+                adjacency[s].append(r)
+            if r in wanted:
+                adjacency[r].append(s)
+    return adjacency
+
+
+def _pending_pairs(db, user_ids) -> dict:
+    """Users each of `user_ids` already has a pending request with (either direction)."""
+    pending = defaultdict(set)
+    cursor = db.friends.find(
+        {"status": "pending", "$or": [
+            {"sender_id": {"$in": list(user_ids)}},
+            {"receiver_id": {"$in": list(user_ids)}}
+        ]},
+        {"sender_id": 1, "receiver_id": 1, "_id": 0}
+    )
+    for f in cursor:
+        pending[f["sender_id"]].add(f["receiver_id"])
+        pending[f["receiver_id"]].add(f["sender_id"])
+    return pending
+
+
+def record_graph_changes(db, pairs, removed: bool = False):
+    """Mark both users of each (a, b) pair for the next incremental run.
+
+    Use for changes the job can't see in `friends`: pending requests that
+    were created, rejected or cancelled, and (`removed`) deleted friendships.
+    """
+    now = datetime.utcnow()
+    docs = [{"user_ids": [a, b], "removed": removed, "at": now} for a, b in pairs]
+    if docs:
+        db.friend_graph_changes.insert_many(docs, ordered=False)
+
+
+def _changed_users(db, since: datetime | None) -> set:
+    """Users whose suggestions may have changed since the last run.
+
+    A new or removed friendship A-B changes the candidates of A, B and every
+    friend of either side, so both endpoints and their direct friends are
+    recomputed. A pending request only changes who A and B exclude.
+    """
+    query = {"status": "accepted"}
+    if since is not None:
+        query["updated_at"] = {"$gt": since}
+    endpoints = set()
+    for f in db.friends.find(query, {"sender_id": 1, "receiver_id": 1, "_id": 0}):
+        endpoints.add(f["sender_id"])
+        endpoints.add(f["receiver_id"])
+    if since is None:
+        return endpoints
+
+    requests_changed = set()
+    for change in db.friend_graph_changes.find({"at": {"$gt": since}}, {"user_ids": 1, "removed": 1, "_id": 0}):
+        (endpoints if change.get("removed") else requests_changed).update(change["user_ids"])
+    dirty = endpoints | requests_changed
+    if endpoints:
+        for friends in _load_adjacency(db, endpoints).values():
+            dirty.update(friends)
+    return dirty
+
+
+def run_suggestion_job(db, full: bool = False, k: int = TOP_K) -> dict:
+    """Recompute suggestions for users whose friend graph changed since the last run."""
+    started_at = datetime.utcnow()
+    state = db.job_state.find_one({"_id": JOB_ID}) or {}
+    since = None if full else state.get("last_run_at")
+    if since is not None and started_at - since > CHANGE_RETENTION:
+        # Older changes have expired from friend_graph_changes
+        since = None
+
+    dirty = _changed_users(db, since)
+    processed = 0
+    dirty_list = sorted(dirty)
+    for i in range(0, len(dirty_list), BATCH_SIZE):
+        batch = dirty_list[i:i + BATCH_SIZE]
+        adjacency = _load_adjacency(db, batch)
+        # Second hop: the friends of everyone in this batch
+        second_hop = {f for uid in batch for f in adjacency.get(uid, ())[:MAX_FRIENDS_EXPANDED]}
+        second_hop -= set(adjacency)
+        adjacency.update(_load_adjacency(db, second_hop))
+        pending = _pending_pairs(db, batch)
+
+        per_user = {uid: compute_suggestions(adjacency, uid, k=k, exclude=pending.get(uid)) for uid in batch}
+
+        candidate_ids = {cid for ranked in per_user.values() for cid, _ in ranked}
+        profiles = {}
+        if candidate_ids:
+            oids = [ObjectId(cid) for cid in candidate_ids if ObjectId.is_valid(cid)]
+            for u in db.users.find({"_id": {"$in": oids}}, {"full_name": 1, "email": 1, "profile_pic": 1}):
+                profiles[str(u["_id"])] = u
+
+        ops = []
+        for uid, ranked in per_user.items():
+            suggestions = []
+            for cid, mutual_count in ranked:
+                profile = profiles.get(cid)
+                if not profile:
+                    continue
+                suggestions.append({
+                    "user_id": cid,
+                    "full_name": profile.get("full_name") or profile.get("email"),
+                    "profile_pic": profile.get("profile_pic"),
+                    "mutual_count": mutual_count
+                })
+            ops.append(ReplaceOne(
+                {"_id": uid},
+                {"suggestions": suggestions, "computed_at": started_at},
+                upsert=True
+            ))
+        if ops:
+            db.friend_suggestions.bulk_write(ops, ordered=False)
+        processed += len(batch)
+
+    db.job_state.update_one(
+        {"_id": JOB_ID},
+        {"$set": {"last_run_at": started_at, "last_processed": processed}},
+        upsert=True
+    )
+    return {"processed": processed, "full": since is None, "started_at": started_at.isoformat()}
@@ -0,0 +1,212 @@
+"""Post-registration video processing: poster frame, duration, dimensions, preview.
+
+Cloudinary videos need no media work on our side: the poster and the short
+low-bitrate preview are transformation URLs rendered (and cached) by
+Cloudinary, and duration/dimensions come from the upload result or the Admin
+API. Videos the app stored itself (`/static/<key>`) are probed with a local
+ffprobe over the stored file, and ffmpeg (when installed) extracts a poster
+and preview into content-addressed storage. Client-supplied URLs are never
+handed to ffprobe/ffmpeg unless they are https on MEDIA_FETCH_HOSTS, and each
+run is limited to the protocols its input needs.
+
+Results are stored flat on the `user_videos` document (poster_url,
+preview_url, duration, width, height) and `media_processed_at` marks it done.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+import cloudinary.api
+from config import MEDIA_FETCH_HOSTS
+from services.storage import get_storage, is_durable, public_url, key_from_url
+from services.metrics import external_call
+from services.video_repository import VideoRepository
+
+POSTER_WIDTH = 640
+PREVIEW_WIDTH = 480
+PREVIEW_SECONDS = 6
+PREVIEW_BITRATE = "400k"
+PROBE_TIMEOUT = 30
+ENCODE_TIMEOUT = 120
+
+MEDIA_FIELDS = ("poster_url", "preview_url", "duration", "width", "height")
+
+_CLOUDINARY_VIDEO_RE = re.compile(
+    r"^(?P<base>https://res\.cloudinary\.com/[^/]+/video/upload/)(?:[^/]*,[^/]*/|[a-z]{1,3}_[^/]+/)*"
+    r"(?:v\d+/)?(?P<public_id>.+?)(?:\.(?P<ext>[a-z0-9]+))?$"
+)
+
+
+def parse_cloudinary_video(url: str) -> tuple[str, str] | None:
+    """(delivery base, public_id) for a Cloudinary video URL, None otherwise."""
+    match = _CLOUDINARY_VIDEO_RE.match(url or "")
+    if not match:
+        return None
+    return match.group("base"), match.group("public_id")
+
+
+def cloudinary_media(url: str, resource: dict | None = None) -> dict:
+    """Media fields for a Cloudinary video.
+
+    `resource` is an upload result or Admin API resource; if omitted the
+    Admin API is asked for duration and dimensions.
+    """
+    parsed = parse_cloudinary_video(url)
+    if not parsed:
+        return {}
+    base, public_id = parsed
+    media = {
+        "poster_url": f"{base}so_auto,w_{POSTER_WIDTH},c_limit,q_auto/{public_id}.jpg",
+        "preview_url": f"{base}so_0,du_{PREVIEW_SECONDS},w_{PREVIEW_WIDTH},c_limit,"
+                       f"br_{PREVIEW_BITRATE},q_auto,ac_none/{public_id}.mp4"
+    }
+    if resource is None:
+        try:
+            with external_call("cloudinary"):
+                resource = cloudinary.api.resource(public_id, resource_type="video")
+        except Exception as e:
+            print(f"Cloudinary metadata lookup failed for {public_id}: {e}")
+            resource = {}
+    media.update(_dimensions(resource.get("duration"), resource.get("width"), resource.get("height")))
+    return media
+
+
+def _dimensions(duration, width, height) -> dict:
+    out = {}
+    try:
+        if duration is not None:
+            out["duration"] = round(float(duration), 3)
+        if width and height:
+            out["width"], out["height"] = int(width), int(height)
+    except (TypeError, ValueError):
+        pass
+    return out
+
+
+@contextmanager
+def media_source(video_url: str):
+    """Yield (input, protocol whitelist) for ffprobe/ffmpeg, or None for a URL we won't read.
+
+    Stored files are read from disk (or copied to a temp file from remote
+    backends); https URLs are only fetched from MEDIA_FETCH_HOSTS.
+    """
+    key = key_from_url(video_url)
+    if key is None:
+        parsed = urlparse(video_url or "")
+        allowed = parsed.scheme == "https" and (parsed.hostname or "").lower() in MEDIA_FETCH_HOSTS
+        yield (video_url, "https,tls,tcp") if allowed else None
+        return
+
+    storage = get_storage()
+    if storage.name == "local":
+        path = os.path.abspath(os.path.join(storage.root, key))
+        yield (path, "file") if os.path.isfile(path) else None
+        return
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1], dir=storage.temp_dir())
+    try:
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in storage.open(key):
+                    f.write(chunk)
+            found = True
+        except FileNotFoundError:
+            found = False
+        yield (path, "file") if found else None
+    finally:
+        os.remove(path)
+
+
+def probe(source: str, protocols: str = "file") -> dict:
+    """Duration and dimensions via ffprobe ({} if unavailable). `source` must come from `media_source`."""
+    if not shutil.which("ffprobe"):
+        return {}
+    try:
+        proc = subprocess.run(
+            ["ffprobe", "-v", "error", "-protocol_whitelist", protocols, "-select_streams", "v:0",
+             "-show_entries", "stream=width,height:format=duration", "-of", "json", "-i", source],
+            capture_output=True, timeout=PROBE_TIMEOUT, check=True
+        )
+        info = json.loads(proc.stdout or b"{}")
+    except (subprocess.SubprocessError, ValueError) as e:
+        print(f"ffprobe failed for {source}: {e}")
+        return {}
+    stream = (info.get("streams") or [{}])[0]
+    return _dimensions((info.get("format") or {}).get("duration"), stream.get("width"), stream.get("height"))
+
+
+def _ffmpeg_to_storage(args: list[str], key: str) -> str | None:
+    storage = get_storage()
+    if storage.exists(key):
+        return public_url(key)
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1], dir=storage.temp_dir())
+    os.close(fd)
+    try:
+        subprocess.run(["ffmpeg", "-v", "error", "-y", *args, path],
+                       capture_output=True, timeout=ENCODE_TIMEOUT, check=True)
+        storage.save(key, path)
+        return public_url(key)
+    except subprocess.SubprocessError as e:
+        print(f"ffmpeg failed for {key}: {e}")
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+
+
+def local_media(video_url: str, cache_key: str) -> dict:
+    """Probe a non-Cloudinary video and, with ffmpeg, render poster and preview.
+
+    `cache_key` names the outputs (`<cache_key>_poster.jpg`, `_preview.mp4`),
+    so re-processing the same video reuses them. URLs `media_source` refuses
+    get no media fields.
+    """
+    with media_source(video_url) as resolved:
+        if resolved is None:
+            return {}
+        source, protocols = resolved
+        media = probe(source, protocols)
+        if not media or not shutil.which("ffmpeg") or not is_durable():
+            return media
+        at = min(1.0, media.get("duration", 0) / 2)
+        poster = _ffmpeg_to_storage(
+            ["-protocol_whitelist", protocols, "-ss", str(at), "-i", source, "-frames:v", "1",
+             "-vf", f"scale='min({POSTER_WIDTH},iw)':-2"],
+            f"{cache_key}_poster.jpg"
+        )
+        preview = _ffmpeg_to_storage(
+            ["-protocol_whitelist", protocols, "-i", source, "-t", str(PREVIEW_SECONDS), "-an",
+             "-vf", f"scale='min({PREVIEW_WIDTH},iw)':-2",
+             "-c:v", "libx264", "-b:v", PREVIEW_BITRATE, "-movflags", "+faststart"],
+            f"{cache_key}_preview.mp4"
+        )
+    if poster:
+        media["poster_url"] = poster
+    if preview:
+        media["preview_url"] = preview
+    return media
+
+
+def extract_media(video_url: str, cache_key: str, resource: dict | None = None) -> dict:
+    if parse_cloudinary_video(video_url):
+        return cloudinary_media(video_url, resource)
+    return local_media(video_url, cache_key)
+
+
+def process_video_media(video_id: str, resource: dict | None = None):
+    """Background task: derive and store media fields for a registered video."""
+    from database import get_db
+    try:
+        db = get_db()
+        repo = VideoRepository(db) if db is not None else None
+        video = repo.get(video_id, {"video_url": 1}) if repo else None
+        if not video or not video.get("video_url"):
+            return
+        media = extract_media(video["video_url"], f"video_{video_id}", resource)
+        media["media_processed_at"] = datetime.utcnow()
+        repo.update(video["_id"], media)
+    except Exception as e:
+        print(f"Video media processing error for {video_id}: {e}")
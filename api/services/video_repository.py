@@ -0,0 +1,369 @@
+"""Typed access layer for the `user_videos` collection.
+
+Stored documents always use a lowercase `status` from VIDEO_STATUSES and a
+BSON datetime `created_at`, so reads and sorts hit the (status, created_at)
+index directly. `migrate_video_fields.py` converts legacy documents, and
+VIDEO_VALIDATOR rejects writes that don't follow this shape. Until that
+migration is recorded in `schema_migrations`, status filters also match the
+legacy capitalized spellings (`status_query`), and serialization normalizes
+whatever status a document has.
+
+Routes and services go through VideoRepository, which owns the collection's
+queries, writes, projections and response hydration (authors, stats, like
+state), so batching and cache invalidation live in one place. The indexes those
+queries rely on are declared in services.schema.
+"""
+import time
+from datetime import datetime, timezone
+from typing import TypedDict
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from services.counters import pending_counts
+from services import admin_stats
+from services.response_cache import invalidate
+from services.ranking import score, score_video, cursor_filter, SCORE_FIELDS
+
+# "hidden" is a reversible soft-hide (see services.link_health)
+VIDEO_STATUSES = ("pending", "approved", "rejected", "hidden")
+FIELDS_MIGRATION = "video_fields"  # services.schema MIGRATIONS entry for migrate_video_fields
+MIGRATION_RECHECK = 60  # seconds between schema_migrations lookups while it is pending
+# Released claims and status updates $set these back (see services.moderation_queue)
+CLEAR_CLAIM = {"claimed_by": None, "claim_expires_at": None}
+
+_fields_migrated = False
+_migration_checked_at = 0.0
+
+VIDEO_VALIDATOR = {
+    "$jsonSchema": {
+        "bsonType": "object",
+        "required": ["user_id", "video_url", "status", "created_at"],
+        "properties": {
+            "user_id": {"bsonType": "string"},
+            "video_url": {"bsonType": "string"},
+            "status": {"enum": list(VIDEO_STATUSES)},
+            "created_at": {"bsonType": "date"},
+            "caption": {"bsonType": ["string", "null"]},
+            "title": {"bsonType": ["string", "null"]},
+            "author_name": {"bsonType": ["string", "null"]},
+            "poster_url": {"bsonType": ["string", "null"]},
+            "preview_url": {"bsonType": ["string", "null"]},
+            "duration": {"bsonType": ["double", "int", "long", "null"]},
+            "width": {"bsonType": ["int", "long", "null"]},
+            "height": {"bsonType": ["int", "long", "null"]},
+            "rank_score": {"bsonType": ["double", "int", "long"]},
+            "view_count": {"bsonType": ["int", "long"], "minimum": 0},
+            "like_count": {"bsonType": ["int", "long"], "minimum": 0},
+            "comment_count": {"bsonType": ["int", "long"], "minimum": 0},
+            "status_changed_at": {"bsonType": "date"}
+        }
+    }
+}
+
+
+class VideoDocument(TypedDict, total=False):
+    user_id: str
+    author_name: str | None
+    title: str | None
+    caption: str | None
+    video_url: str
+    status: str
+    created_at: datetime
+    rejection_reason: str | None
+    hidden_from_status: str | None
+    hidden_reason: str | None
+    # Filled in by services.video_media after registration
+    poster_url: str | None
+    preview_url: str | None
+    duration: float | None
+    width: int | None
+    height: int | None
+    media_processed_at: datetime
+    rank_score: float
+    view_count: int
+    like_count: int
+    comment_count: int
+    stats_updated_at: datetime
+    status_changed_at: datetime  # every status write; the ranking job's change feed
+    # Moderation queue lease
+    claimed_by: str | None
+    claim_expires_at: datetime | None
+
+
+def normalize_status(value) -> str:
+    status = str(value or "pending").strip().lower()
+    return status if status in VIDEO_STATUSES else "pending"
+
+
+def fields_migrated(db) -> bool:
+    """Whether migrate_video_fields has been applied (cached once it has)."""
+    global _fields_migrated, _migration_checked_at
+    if not _fields_migrated and time.monotonic() - _migration_checked_at >= MIGRATION_RECHECK:
+        from services.schema import MIGRATIONS
+        version = next(v for v, name, _, _ in MIGRATIONS if name == FIELDS_MIGRATION)
+        _fields_migrated = db.schema_migrations.find_one({"_id": version}, {"_id": 1}) is not None
+        _migration_checked_at = time.monotonic()
+    return _fields_migrated
+
+
+def status_query(db, *statuses: str):
+    """Filter value for one or more statuses, also matching legacy spellings until the migration has run."""
+    values = list(statuses)
+    if not fields_migrated(db):
+        values = [v for s in statuses for v in (s, s.capitalize(), s.upper())]
+    return values[0] if len(values) == 1 else {"$in": values}
+
+
+def to_datetime(value) -> datetime | None:
+    """Coerce legacy ISO strings to datetimes; None if unparseable."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        # Stored times are naive UTC like datetime.utcnow()
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return None
+
+
+def new_video_doc(user_id: str, video_url: str, author_name: str | None = None, title: str | None = None,
+                  caption: str | None = "", status: str = "pending") -> VideoDocument:
+    now = datetime.utcnow()
+    return VideoDocument(
+        user_id=user_id,
+        author_name=author_name,
+        title=title,
+        caption=caption,
+        video_url=video_url,
+        status=normalize_status(status),
+        created_at=now,
+        rejection_reason=None,
+        # Recency-only until the ranking job sees engagement
+        rank_score=score(now),
+        view_count=0,
+        like_count=0,
+        comment_count=0
+    )
+
+
+def serialize_video(doc: dict, author: dict | None = None, default_author: str = "Bodham User") -> dict:
+    """Shape a stored video for VideoResponse, optionally hydrating the author."""
+    doc["id"] = str(doc["_id"])
+    if author:
+        doc["author_name"] = author.get("full_name") or author.get("email") or default_author
+        doc["author_email"] = author.get("email")
+    elif not doc.get("author_name"):
+        doc["author_name"] = default_author
+
+    if "title" not in doc: doc["title"] = "Inspirational Moment"
+    if "caption" not in doc: doc["caption"] = ""
+    doc["status"] = normalize_status(doc.get("status"))
+
+    created_at = doc.get("created_at")
+    doc["created_at"] = created_at.isoformat() if isinstance(created_at, datetime) else (created_at or "")
+    return doc
+
+
+def migration_updates(doc: dict) -> dict:
+    """$set needed to bring a legacy document to the canonical shape ({} if none)."""
+    updates = {}
+    status = normalize_status(doc.get("status"))
+    if doc.get("status") != status:
+        updates["status"] = status
+
+    created_at = doc.get("created_at")
+    if not isinstance(created_at, datetime):
+        # Fall back to the insert time encoded in the ObjectId
+        updates["created_at"] = to_datetime(created_at) or doc["_id"].generation_time.replace(tzinfo=None)
+    if "rank_score" not in doc:
+        # Engagement-only until the ranking job adds author affinity
+        updates["rank_score"] = score_video({**doc, **updates})
+    return updates
+
+
+# Author fields needed to hydrate a video for VideoResponse
+AUTHOR_PROJECTION = {"full_name": 1, "email": 1}
+
+
+def _oid(video_id) -> ObjectId | None:
+    if isinstance(video_id, ObjectId):
+        return video_id
+    return ObjectId(video_id) if ObjectId.is_valid(video_id) else None
+
+
+class VideoRepository:
+    """Every read and write of `user_videos` (plus video likes) for the routes."""
+
+    def __init__(self, db):
+        self.db = db
+        self.videos = db.user_videos
+
+    # Reads
+
+    def get(self, video_id, projection: dict | None = None) -> dict | None:
+        oid = _oid(video_id)
+        return self.videos.find_one({"_id": oid}, projection) if oid else None
+
+    def latest(self, limit: int, skip: int = 0) -> list[dict]:
+        return list(self.videos.find({"status": status_query(self.db, "approved")})
+                    .sort("created_at", -1).skip(skip).limit(limit))
+
+    def ranked(self, limit: int, cursor: str | None = None) -> list[dict]:
+        """Approved videos by rank_score; raises ValueError/InvalidId on a bad cursor."""
+        query = {"status": status_query(self.db, "approved"), "rank_score": {"$exists": True}}
+        if cursor:
+            query.update(cursor_filter(cursor))
+        return list(self.videos.find(query).sort([("rank_score", -1), ("_id", -1)]).limit(limit))
+
+    def by_user(self, user_id: str, approved_only: bool = False) -> list[dict]:
+        query = {"user_id": user_id}
+        if approved_only:
+            query["status"] = status_query(self.db, "approved")
+        return list(self.videos.find(query).sort("created_at", -1))
+
+    def count(self, status: str | None = None) -> int:
+        return self.videos.count_documents({"status": status_query(self.db, status)} if status else {})
+
+    # Writes
+
+    def insert(self, doc: VideoDocument) -> str:
+        doc["_id"] = self.videos.insert_one(doc).inserted_id
+        admin_stats.status_changed(self.db, "user_videos", None, doc.get("status"))
+        if doc.get("status") == "approved":
+            invalidate("videos")
+        return str(doc["_id"])
+
+    def update(self, video_id, fields: dict) -> bool:
+        """$set fields on one video; False if it doesn't exist."""
+        oid = _oid(video_id)
+        if not oid or not self.videos.update_one({"_id": oid}, {"$set": fields}).matched_count:
+            return False
+        invalidate("videos")
+        return True
+
+    def set_status(self, video_id, status: str, **fields) -> bool:
+        oid = _oid(video_id)
+        if not oid:
+            return False
+        status = normalize_status(status)
+        before = self.videos.find_one_and_update(
+            {"_id": oid}, {"$set": {"status": status, "status_changed_at": datetime.utcnow(), **fields}},
+            projection={"status": 1}, return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return False
+        admin_stats.status_changed(self.db, "user_videos", normalize_status(before.get("status")), status)
+        invalidate("videos")
+        return True
+
+    def delete_owned(self, video_id, user_id: str) -> bool:
+        oid = _oid(video_id)
+        deleted = self.videos.find_one_and_delete({"_id": oid, "user_id": user_id}, {"status": 1}) if oid else None
+        if deleted is None:
+            return False
+        admin_stats.status_changed(self.db, "user_videos", normalize_status(deleted.get("status")), None)
+        invalidate("videos")
+        return True
+
+    def set_statuses(self, updates: dict) -> set[ObjectId]:
+        """Conditional status writes in one unordered bulk_write; returns the ids written.
+
+        `updates` maps ids to (status as read, fields to $set including the
+        new status). A write only applies while the video still has the
+        status read, so a concurrent change is never overwritten.
+        """
+        if not updates:
+            return set()
+        changed_at = datetime.utcnow()
+        # Stored at millisecond precision; truncate so the re-read below matches
+        changed_at = changed_at.replace(microsecond=changed_at.microsecond // 1000 * 1000)
+        write = self.videos.bulk_write([
+            UpdateOne({"_id": oid, "status": read}, {"$set": {**fields, "status_changed_at": changed_at}})
+            for oid, (read, fields) in updates.items()
+        ], ordered=False)
+        if write.matched_count == len(updates):
+            applied = set(updates)
+        else:
+            applied = {d["_id"] for d in self.videos.find(
+                {"_id": {"$in": list(updates)}, "status_changed_at": changed_at}, {"status": 1}
+            ) if d.get("status") == updates[d["_id"]][1].get("status")}
+        if applied:
+            invalidate("videos")
+        return applied
+
+    def claim(self, query: dict, moderator_id: str, until: datetime) -> dict | None:
+        """Lease the oldest video matching `query` to `moderator_id`."""
+        return self.videos.find_one_and_update(
+            query, {"$set": {"claimed_by": moderator_id, "claim_expires_at": until}},
+            sort=[("created_at", 1), ("_id", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def release(self, video_id, moderator_id: str) -> bool:
+        oid = _oid(video_id)
+        return bool(oid) and self.videos.update_one(
+            {"_id": oid, "claimed_by": moderator_id}, {"$set": CLEAR_CLAIM}
+        ).matched_count > 0
+
+    def increment_stat(self, video_id, field: str, amount: int = 1):
+        self.videos.update_one({"_id": _oid(video_id)}, {
+            "$inc": {field: amount}, "$set": {"stats_updated_at": datetime.utcnow()}
+        })
+
+    # Hydration
+
+    def authors_for(self, docs: list[dict]) -> dict[str, dict]:
+        author_ids = list(set(ObjectId(d["user_id"]) for d in docs if ObjectId.is_valid(d.get("user_id"))))
+        if not author_ids:
+            return {}
+        return {str(a["_id"]): a for a in self.db.users.find({"_id": {"$in": author_ids}}, AUTHOR_PROJECTION)}
+
+    def hydrate(self, docs: list[dict], viewer_id: str | None = None, author: dict | None = None,
+                default_author: str = "Bodham User") -> list[dict]:
+        """Serialize videos for VideoResponse with one batched author lookup.
+
+        `author` skips the lookup when every video has the same author.
+        Unflushed view counts from the write-behind buffer are added, and
+        `is_liked_by_me` is filled in for `viewer_id`.
+        """
+        authors = None if author is not None else self.authors_for(docs)
+        videos = [serialize_video(d, author if authors is None else authors.get(d.get("user_id")), default_author)
+                  for d in docs]
+
+        ids = [v["id"] for v in videos]
+        buffered = pending_counts("user_videos", ids)
+        liked = self.liked_ids(ids, viewer_id)
+        for v in videos:
+            v["view_count"] = (v.get("view_count") or 0) + buffered.get(v["id"], {}).get("view_count", 0)
+            v["is_liked_by_me"] = v["id"] in liked
+        return videos
+
+    # Likes
+
+    def liked_ids(self, video_ids: list[str], viewer_id: str | None) -> set[str]:
+        """The subset of `video_ids` that `viewer_id` has liked."""
+        if not viewer_id or not video_ids:
+            return set()
+        return set(l["video_id"] for l in self.db.video_likes.find(
+            {"video_id": {"$in": video_ids}, "user_id": viewer_id}, {"video_id": 1}
+        ))
+
+    def like(self, video_id: str, user_id: str) -> bool:
+        """Record a like; False if the user had already liked the video."""
+        try:
+            self.db.video_likes.insert_one({"video_id": video_id, "user_id": user_id, "created_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            return False
+        self.increment_stat(video_id, "like_count", 1)
+        return True
+
+    def unlike(self, video_id: str, user_id: str) -> bool:
+        """Remove a like; False if there was none."""
+        if not self.db.video_likes.delete_one({"video_id": video_id, "user_id": user_id}).deleted_count:
+            return False
+        self.increment_stat(video_id, "like_count", -1)
+        return True
@@ -0,0 +1,134 @@
+"""Server-side video uploads to Cloudinary without blocking the event loop.
+
+Cloudinary calls are blocking HTTP requests, so they always run in a worker
+thread. Large files go through Cloudinary's chunked upload protocol: each
+chunk is sent with a shared X-Unique-Upload-Id, and the offset reached so far
+is kept in `upload_sessions`, so a client whose connection drops can ask for
+the session and resume from `bytes_received`.
+"""
+from datetime import datetime
+from urllib.parse import urlsplit
+from bson import ObjectId
+from pymongo import ReturnDocument
+import cloudinary.uploader
+import cloudinary.utils
+from starlette.concurrency import run_in_threadpool
+from services.metrics import external_call
+
+VIDEO_FOLDER = "MindRise_Videos"
+# Cloudinary requires every chunk but the last to be at least 5 MB
+CHUNK_SIZE = 6 * 1024 * 1024
+
+
+async def upload_file_in_chunks(fileobj, filename: str = "stream", progress=None) -> dict:
+    """Upload a spooled file with upload_large semantics, one chunk per worker-thread call."""
+    upload_id = cloudinary.utils.random_public_id()
+    fileobj.seek(0, 2)
+    total = fileobj.tell()
+    fileobj.seek(0)
+
+    offset = 0
+    result = {}
+    options = {"folder": VIDEO_FOLDER, "resource_type": "video"}
+    while offset < total:
+        chunk = await run_in_threadpool(fileobj.read, CHUNK_SIZE)
+        if not chunk:
+            break
+        result = await upload_chunk(upload_id, filename, chunk, offset, total, options)
+        offset += len(chunk)
+        if result.get("public_id"):
+            options["public_id"] = result["public_id"]
+        if progress:
+            progress(offset, total)
+    return result
+
+
+async def upload_chunk(upload_id: str, filename: str, chunk: bytes, offset: int, total: int, options: dict) -> dict:
+    headers = {
+        "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{total}",
+        "X-Unique-Upload-Id": upload_id
+    }
+    with external_call("cloudinary"):
+        return await run_in_threadpool(
+            cloudinary.uploader.upload_large_part, (filename, chunk), http_headers=headers, **options
+        )
+
+
+def create_session(db, user_id: str, filename: str, total_size: int, caption: str = "") -> dict:
+    now = datetime.utcnow()
+    doc = {
+        "user_id": user_id,
+        "caption": caption,
+        "filename": filename or "stream",
+        "total_size": total_size,
+        "bytes_received": 0,
+        "upload_id": cloudinary.utils.random_public_id(),
+        "public_id": None,
+        "status": "uploading",
+        "created_at": now,
+        "updated_at": now
+    }
+    doc["_id"] = db.upload_sessions.insert_one(doc).inserted_id
+    return doc
+
+
+def session_progress(session: dict) -> dict:
+    total = session.get("total_size") or 0
+    return {
+        "session_id": str(session["_id"]),
+        "status": session["status"],
+        "bytes_received": session["bytes_received"],
+        "total_size": total,
+        "progress": round(session["bytes_received"] / total, 4) if total else 0.0,
+        "chunk_size": CHUNK_SIZE,
+        "video_url": session.get("video_url"),
+        "video_id": session.get("video_id")
+    }
+
+
+async def append_chunk(db, session: dict, offset: int, chunk: bytes) -> tuple[dict, dict]:
+    """Forward one chunk to Cloudinary and advance the session.
+
+    Returns (updated session, Cloudinary result). The caller has already
+    checked that `offset` matches the session's bytes_received.
+    """
+    options = {"folder": VIDEO_FOLDER, "resource_type": "video"}
+    if session.get("public_id"):
+        options["public_id"] = session["public_id"]
+
+    result = await upload_chunk(session["upload_id"], session["filename"], chunk, offset,
+                                session["total_size"], options)
+
+    updates = {"bytes_received": offset + len(chunk), "updated_at": datetime.utcnow()}
+    if result.get("public_id"):
+        updates["public_id"] = result["public_id"]
+    # Guarded on the old offset so two concurrent retries of one chunk can't both advance it
+    updated = db.upload_sessions.find_one_and_update(
+        {"_id": session["_id"], "bytes_received": offset},
+        {"$set": updates},
+        return_document=ReturnDocument.AFTER
+    )
+    return updated, result
+
+
+def verify_upload_signature(public_id: str, version, signature: str) -> bool:
+    """Check the signature Cloudinary returns from a signed direct upload."""
+    try:
+        return cloudinary.utils.verify_api_response_signature(public_id, version, signature)
+    except Exception:
+        return False
+
+
+def is_upload_url(video_url: str, cloud_name: str, public_id: str, version) -> bool:
+    """Whether `video_url` is the delivery URL of that exact upload (any format extension)."""
+    parts = urlsplit(video_url)
+    path = f"/{cloud_name}/video/upload/v{version}/{public_id}"
+    return (parts.scheme == "https" and parts.netloc == "res.cloudinary.com" and not parts.query
+            and not parts.fragment and (parts.path == path or
+                                        (parts.path.startswith(path + ".") and "/" not in parts.path[len(path):])))
+
+
+def get_session(db, session_id: str) -> dict | None:
+    if not ObjectId.is_valid(session_id):
+        return None
+    return db.upload_sessions.find_one({"_id": ObjectId(session_id)})
@@ -0,0 +1,39 @@
+"""Shared fixtures: the app on a fresh mongomock database per test.
+
+mongomock collection calls are recorded by the query profiler
+(`instrument_mongomock`), so `query_budget` counts them like the listener
+counts real commands.
+"""
+import mongomock
+import pytest
+from fastapi.testclient import TestClient
+import database
+from services import query_profiler, response_cache, storage as storage_service, video_repository
+
+query_profiler.instrument_mongomock()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "_client", client)
+    # Each test starts with an empty cache and re-reads the migration state
+    monkeypatch.setattr(response_cache, "_backend", response_cache.MemoryBackend(100))
+    monkeypatch.setattr(response_cache, "_stats", {})
+    monkeypatch.setattr(video_repository, "_fields_migrated", False)
+    monkeypatch.setattr(video_repository, "_migration_checked_at", 0.0)
+    return client[database.DB_NAME]
+
+
+@pytest.fixture
+def client(db):
+    from main import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    """Local content-addressed storage in a temp dir."""
+    local = storage_service.LocalStorage(str(tmp_path / "uploads"))
+    monkeypatch.setattr(storage_service, "_storage", local)
+    return local
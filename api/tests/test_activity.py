@@ -0,0 +1,82 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from services import activity
+
+USER = str(ObjectId())
+
+
+@pytest.fixture(autouse=True)
+def buffer(monkeypatch):
+    monkeypatch.setattr(activity, "_pending", {})
+    # mongomock can't upsert with $bit; the ledger is covered in test_analytics
+    monkeypatch.setattr(activity, "record_activity", lambda db, touches: None)
+    monkeypatch.setattr(activity, "_last_recorded", {})
+    monkeypatch.setattr(activity, "_attempts", {})
+    monkeypatch.setattr(activity, "_last_flush", float("inf"))  # no flush from update_last_active
+
+
+def test_touches_are_coalesced(db):
+    db.users.insert_one({"_id": ObjectId(USER)})
+    for _ in range(5):
+        activity.update_last_active(USER)
+    activity.update_last_active("not-an-object-id")
+    assert activity.flush_activity() == 1
+    user = db.users.find_one({"_id": ObjectId(USER)})
+    assert user["streak_count"] == 1
+    assert user["last_streak_date"] == datetime.utcnow().date().isoformat()
+    assert activity.flush_activity() == 0
+
+
+def test_streak_extends_from_yesterday(db):
+    db.users.insert_one({"_id": ObjectId(USER), "streak_count": 4, "last_streak_date": "2024-03-01"})
+    db.users.update_one({"_id": ObjectId(USER)}, activity.streak_update("2024-03-02", "2024-03-02T10:00:00"))
+    db.users.update_one({"_id": ObjectId(USER)}, activity.streak_update("2024-03-02", "2024-03-02T11:00:00"))
+    user = db.users.find_one({"_id": ObjectId(USER)})
+    assert (user["streak_count"], user["last_streak_date"]) == (5, "2024-03-02")
+    db.users.update_one({"_id": ObjectId(USER)}, activity.streak_update("2024-03-05", "2024-03-05T10:00:00"))
+    assert db.users.find_one({"_id": ObjectId(USER)})["streak_count"] == 1
+
+
+def test_failed_flush_is_requeued_then_dropped(db, monkeypatch):
+    db.users.insert_one({"_id": ObjectId(USER)})
+    activity.update_last_active(USER)
+    monkeypatch.setattr(activity, "get_db", lambda: None)
+    for attempt in range(1, activity.MAX_RETRIES + 1):
+        activity.flush_activity()
+        assert USER in activity._pending and activity._attempts[USER] == attempt
+    activity.flush_activity()
+    assert activity._pending == {} and activity._attempts == {}
+
+
+def test_requeued_touch_is_written_on_the_next_flush(db, monkeypatch):
+    db.users.insert_one({"_id": ObjectId(USER)})
+    activity.update_last_active(USER)
+    get_db = activity.get_db
+    monkeypatch.setattr(activity, "get_db", lambda: None)
+    activity.flush_activity()
+    monkeypatch.setattr(activity, "get_db", get_db)
+    assert activity.flush_activity() == 1
+    assert db.users.find_one({"_id": ObjectId(USER)})["streak_count"] == 1
+    assert activity._attempts == {}
+
+
+def test_write_error_requeues_only_the_failed_user(db, monkeypatch):
+    other = str(ObjectId())
+    db.users.insert_many([{"_id": ObjectId(USER)}, {"_id": ObjectId(other)}])
+    activity.update_last_active(USER)
+    activity.update_last_active(other)
+    users = type(db.users)
+    bulk_write = users.bulk_write
+
+    def first_op_fails(self, ops, *args, **kwargs):
+        if self.name == "users" and ops[0]._filter == {"_id": ObjectId(USER)}:
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 121, "errmsg": "validation failed"}]})
+        return bulk_write(self, ops, *args, **kwargs)
+
+    monkeypatch.setattr(users, "bulk_write", first_op_fails)
+    assert activity.flush_activity() == 2
+    assert db.users.find_one({"_id": ObjectId(other)})["streak_count"] == 1
+    assert "streak_count" not in db.users.find_one({"_id": ObjectId(USER)})
+    assert list(activity._pending) == [USER] and activity._attempts == {USER: 1}
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from services import admin_stats
+from services.admin_stats import reconcile, status_changed, user_created
+from services.moderation_queue import apply_moderation_side_effects, bulk_moderate
+from services.video_repository import VideoRepository, new_video_doc
+
+
+def seed(db):
+    db.users.insert_many([{"email": "a@example.com", "mobile": None}, {"email": None, "mobile": "+100"}])
+    db.posts.insert_many([{"status": "pending"}, {"status": "flagged"}, {"status": "approved"}])
+    db.user_videos.insert_many([{"status": "Pending"}, {"status": "approved"}])
+
+
+def counts(db):
+    snapshot = db.admin_stats.find_one({"_id": admin_stats.SNAPSHOT_ID})
+    return {name: snapshot[name] for name in admin_stats.COUNTERS}
+
+
+def test_reconcile_counts_everything_including_legacy_statuses(db):
+    seed(db)
+    reconcile(db)
+    assert counts(db) == {"total_users": 2, "email_users": 1, "mobile_users": 1,
+                          "pending_posts": 1, "flagged_posts": 1, "pending_videos": 1}
+
+
+def test_adjustments_wait_for_the_first_reconcile(db):
+    user_created(db, {"email": "a@example.com"})
+    assert db.admin_stats.count_documents({}) == 0
+
+
+def test_incremental_updates_match_a_recount(db):
+    seed(db)
+    reconcile(db)
+    user_created(db, {"email": "b@example.com"})
+    db.users.insert_one({"email": "b@example.com"})
+    status_changed(db, "posts", "pending", "approved")
+    db.posts.update_one({"status": "pending"}, {"$set": {"status": "approved"}})
+    status_changed(db, "posts", "approved", "approved")  # no-op
+
+    repo = VideoRepository(db)
+    repo.insert(new_video_doc("u", "https://cdn.example.com/new.mp4"))  # pending
+    video_id = db.user_videos.find_one({"status": "approved"})["_id"]
+    repo.set_status(video_id, "pending")
+    _, changes = bulk_moderate(db, "videos", [{"id": str(video_id), "status": "rejected"}])
+    apply_moderation_side_effects(db, "videos", changes)
+
+    incremental = counts(db)
+    reconcile(db)
+    assert incremental == counts(db)
+    assert incremental["pending_videos"] == 2 and incremental["pending_posts"] == 0
+
+
+def test_stats_endpoint_serves_the_snapshot_and_recounts_when_stale(db, client):
+    seed(db)
+    assert client.get("/api/admin/stats", params={"role": "user"}).status_code == 403
+
+    body = client.get("/api/admin/stats", params={"role": "admin"}).json()  # first read reconciles
+    assert body["pending_moderation"] == 2 and body["total_users"] == 2
+
+    db.users.insert_one({"email": "bypassed@example.com"})  # a write that skips the counters
+    stale = datetime.utcnow() - admin_stats.STALE_AFTER - timedelta(seconds=1)
+    db.admin_stats.update_one({}, {"$set": {"computed_at": stale}})
+    body = client.get("/api/admin/stats", params={"role": "admin"}).json()
+    assert body["total_users"] == 2  # stale snapshot served, recount runs after the response
+    assert client.get("/api/admin/stats", params={"role": "admin"}).json()["total_users"] == 3
@@ -0,0 +1,43 @@
+ADMIN = {"role": "admin"}
+
+
+def seed(db, n):
+    return [str(db.users.insert_one({"email": f"user{i}@example.com", "full_name": f"User {i}",
+                                     "password_hash": "x"}).inserted_id) for i in range(n)]
+
+
+def pages(client, **params):
+    cursor, seen = None, []
+    while True:
+        response = client.get("/api/admin/users", params={**ADMIN, **params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        seen.append([u["id"] for u in page["items"]])
+        cursor = page["next_cursor"]
+        if not cursor:
+            return seen
+
+
+def test_users_are_paged_newest_first(db, client):
+    ids = seed(db, 5)
+    assert pages(client, limit=2) == [ids[4:2:-1], ids[2:0:-1], ids[:1]]
+
+
+def test_search_filters_server_side(db, client):
+    ids = seed(db, 12)
+    db.users.insert_one({"mobile": "+15550100", "full_name": None})
+    assert pages(client, search_user="USER1", limit=2) == [[ids[11], ids[10]], [ids[1]]]
+    assert pages(client, search_user="5550")[0] != []
+    assert pages(client, search_user=ids[3]) == [[ids[3]]]
+
+
+def test_sensitive_fields_are_not_returned(db, client):
+    seed(db, 1)
+    [user] = client.get("/api/admin/users", params=ADMIN).json()["items"]
+    assert "password_hash" not in user and user["email"] == "user0@example.com"
+
+
+def test_bad_requests(db, client):
+    assert client.get("/api/admin/users", params={"role": "user"}).status_code == 403
+    assert client.get("/api/admin/users", params={**ADMIN, "cursor": "nope"}).status_code == 400
+    assert client.get("/api/admin/users", params={**ADMIN, "limit": 1000}).status_code == 422
@@ -0,0 +1,51 @@
+from datetime import date
+import pytest
+from services import analytics
+
+
+def ledger(db, user_id: str, *days: str):
+    """What record_activity leaves behind (mongomock can't upsert with $bit)."""
+    for day in days:
+        d = date.fromisoformat(day)
+        month = d.strftime("%Y-%m")
+        doc = db.activity_ledger.find_one({"_id": f"{user_id}:{month}"}) or {"days": 0}
+        db.activity_ledger.replace_one({"_id": f"{user_id}:{month}"}, {
+            "user_id": user_id, "month": month, "days": doc["days"] | 1 << (d.day - 1)}, upsert=True)
+        db.activity_cohorts.update_one({"_id": user_id}, {"$min": {"cohort_month": month}}, upsert=True)
+
+
+@pytest.fixture
+def activity(db):
+    ledger(db, "u1", "2024-02-28", "2024-02-29", "2024-03-01", "2024-03-02")
+    ledger(db, "u2", "2024-02-10", "2024-03-02")
+    ledger(db, "u3", "2024-03-02")
+    return db
+
+
+def test_ledger_ops_set_one_bit_per_day():
+    ledger_op, cohort_op = analytics.ledger_ops("u1", "2024-03-05")
+    assert ledger_op._filter == {"_id": "u1:2024-03"}
+    assert ledger_op._doc["$bit"] == {"days": {"or": 1 << 4}}
+    assert cohort_op._doc == {"$min": {"cohort_month": "2024-03"}}
+
+
+def test_range_filter_masks_days_per_month():
+    # active_users matches these with $bitsAnySet, which mongomock doesn't implement
+    assert analytics._range_filter(date(2024, 2, 28), date(2024, 3, 2)) == [
+        {"month": "2024-02", "days": {"$bitsAnySet": 1 << 27 | 1 << 28}},
+        {"month": "2024-03", "days": {"$bitsAnySet": 0b11}},
+    ]
+
+
+def test_rollup_retention_by_cohort(activity):
+    analytics.rollup_retention(activity, through=date(2024, 3, 31))
+    rows = {r["_id"]: (r["offset"], r["active"]) for r in activity.analytics_retention.find()}
+    assert rows == {"2024-02:2024-02": (0, 2), "2024-02:2024-03": (1, 2), "2024-03:2024-03": (0, 1)}
+
+
+def test_compute_streak_from_ledger(activity):
+    assert analytics.compute_streak(activity, "u1", today=date(2024, 3, 2)) == (4, "2024-03-02")
+    # Not active yet today: yesterday's streak still counts
+    assert analytics.compute_streak(activity, "u1", today=date(2024, 3, 3)) == (4, "2024-03-02")
+    assert analytics.compute_streak(activity, "u1", today=date(2024, 3, 4)) == (0, None)
+    assert analytics.compute_streak(activity, "u2", today=date(2024, 3, 2)) == (1, "2024-03-02")
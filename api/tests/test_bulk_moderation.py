@@ -0,0 +1,52 @@
+from services import moderation_queue
+
+ADMIN = {"role": "admin"}
+
+
+def seed_posts(db, n, status="pending"):
+    return [str(db.posts.insert_one({"user_id": f"author{i}", "content": "x", "status": status,
+                                     "created_at": f"2026-01-0{i + 1}T00:00:00"}).inserted_id) for i in range(n)]
+
+
+def bulk(client, kind, items, **params):
+    return client.post(f"/api/admin/queue/{kind}/bulk", params={**ADMIN, **params}, json={"items": items})
+
+
+def test_bulk_moderation_reports_each_item(db, client):
+    a, b = seed_posts(db, 2)
+    missing = "0" * 24
+    response = bulk(client, "posts", [
+        {"id": a, "status": "Approved"},
+        {"id": b, "status": "rejected", "rejection_reason": "spam"},
+        {"id": missing, "status": "approved"},
+        {"id": "bad", "status": "approved"},
+        {"id": a, "status": "deleted"},  # a later invalid action cancels the earlier one
+    ])
+    assert response.status_code == 200
+    assert response.json() == {"results": {a: "invalid_status", b: "updated", missing: "not_found", "bad": "invalid_id"},
+                               "updated": 1}
+    assert db.posts.find_one({"user_id": "author0"})["status"] == "pending"
+
+
+def test_side_effects_log_notify_and_count(db, client):
+    a, b = seed_posts(db, 2)
+    client.get("/api/admin/stats", params=ADMIN)  # creates the counter snapshot
+    assert bulk(client, "posts", [{"id": a, "status": "approved"}, {"id": b, "status": "rejected"}]).json()["updated"] == 2
+
+    assert db.moderation_events.count_documents({"target_id": {"$in": [a, b]}}) == 2
+    assert sorted(n["user_id"] for n in db.notifications.find({"type": "moderation"})) == ["author0", "author1"]
+    assert client.get("/api/admin/stats", params=ADMIN).json()["pending_moderation"] == 0
+
+
+def test_repeating_a_bulk_action_changes_nothing_twice(db, client):
+    [a] = seed_posts(db, 1)
+    bulk(client, "posts", [{"id": a, "status": "approved"}])
+    assert bulk(client, "posts", [{"id": a, "status": "approved"}]).json()["results"] == {a: "updated"}
+    assert db.notifications.count_documents({}) == 1  # same-status writes send no new notification
+
+
+def test_request_limits(db, client, monkeypatch):
+    assert bulk(client, "posts", [], role="user").status_code == 403
+    assert bulk(client, "stories", []).status_code == 404
+    monkeypatch.setattr(moderation_queue, "MAX_BULK", 2)
+    assert bulk(client, "posts", [{"id": "0" * 24, "status": "approved"}] * 3).status_code == 400
@@ -0,0 +1,85 @@
+from collections import Counter, defaultdict
+import pytest
+from pymongo.errors import BulkWriteError
+from services import counters
+from services.counters import flush_counters, increment, pending_counts
+
+
+@pytest.fixture(autouse=True)
+def fresh_buffer(db, monkeypatch):
+    monkeypatch.setattr(counters, "_pending", defaultdict(lambda: defaultdict(Counter)))
+    monkeypatch.setattr(counters, "_attempts", {})
+    monkeypatch.setattr(counters, "FLUSH_INTERVAL", 3600)
+    monkeypatch.setattr(counters, "_last_flush", counters.time.monotonic())
+
+
+def seed_videos(db, n):
+    return [str(db.user_videos.insert_one({"view_count": 0}).inserted_id) for _ in range(n)]
+
+
+def fail_bulk_write(db, monkeypatch, fail_ids=None):
+    """Make user_videos.bulk_write fail for `fail_ids` (BulkWriteError) or entirely (None)."""
+    original = type(db.user_videos).bulk_write
+
+    def bulk_write(self, requests, *args, **kwargs):
+        if self.name != "user_videos":
+            return original(self, requests, *args, **kwargs)
+        if fail_ids is None:
+            raise ConnectionError("network down")
+        ok = [r for r in requests if str(r._filter["_id"]) not in fail_ids]
+        if ok:
+            original(self, ok, *args, **kwargs)
+        errors = [{"index": i, "code": 121, "errmsg": "fail"} for i, r in enumerate(requests)
+                  if str(r._filter["_id"]) in fail_ids]
+        raise BulkWriteError({"writeErrors": errors})
+
+    monkeypatch.setattr(type(db.user_videos), "bulk_write", bulk_write)
+    return original
+
+
+def test_increments_coalesce_into_one_write_per_document(db):
+    a, b = seed_videos(db, 2)
+    for _ in range(3):
+        increment("user_videos", a, "view_count")
+    increment("user_videos", b, "view_count", 2)
+    assert pending_counts("user_videos", [a, b]) == {a: Counter(view_count=3), b: Counter(view_count=2)}
+
+    assert flush_counters() == 2
+    assert [d["view_count"] for d in db.user_videos.find()] == [3, 2]
+    assert all(d.get("stats_updated_at") for d in db.user_videos.find())
+    assert pending_counts("user_videos", [a, b]) == {}
+    assert flush_counters() == 0
+
+
+def test_invalid_ids_are_ignored(db):
+    increment("user_videos", "not-an-id", "view_count")
+    assert flush_counters() == 0
+
+
+def test_only_failed_documents_are_requeued(db, monkeypatch):
+    a, b = seed_videos(db, 2)
+    increment("user_videos", a, "view_count", 5)
+    increment("user_videos", b, "view_count", 7)
+    original = fail_bulk_write(db, monkeypatch, fail_ids={b})
+
+    assert flush_counters() == 1
+    assert pending_counts("user_videos", [a, b]) == {b: Counter(view_count=7)}
+
+    increment("user_videos", b, "view_count")  # merges with the requeued count
+    monkeypatch.setattr(type(db.user_videos), "bulk_write", original)
+    assert flush_counters() == 1
+    assert {str(d["_id"]): d["view_count"] for d in db.user_videos.find()} == {a: 5, b: 8}
+    assert counters._attempts == {}
+
+
+def test_counts_are_dropped_after_max_retries(db, monkeypatch):
+    [a] = seed_videos(db, 1)
+    increment("user_videos", a, "view_count", 4)
+    fail_bulk_write(db, monkeypatch)
+
+    for _ in range(counters.MAX_RETRIES):
+        assert flush_counters() == 0
+        assert pending_counts("user_videos", [a]) == {a: Counter(view_count=4)}
+    assert flush_counters() == 0
+    assert pending_counts("user_videos", [a]) == {}
+    assert counters._attempts == {}
@@ -0,0 +1,71 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+
+RECEIVER = str(ObjectId())
+SENDERS = [str(ObjectId()) for _ in range(4)]
+
+
+@pytest.fixture
+def requests(db):
+    db.users.insert_many([{"_id": ObjectId(uid), "email": f"user{i}@example.com", "full_name": f"User {i}"}
+                          for i, uid in enumerate([RECEIVER, *SENDERS])])
+    now = datetime.utcnow()
+    return [str(i) for i in db.friends.insert_many([
+        {"sender_id": sender, "receiver_id": RECEIVER, "status": "pending", "created_at": now}
+        for sender in SENDERS
+    ]).inserted_ids]
+
+
+def respond(client, responses, user_id=RECEIVER):
+    response = client.post("/api/friends/respond/bulk", json={"user_id": user_id, "responses": [
+        {"request_id": request_id, "action": action} for request_id, action in responses
+    ]})
+    assert response.status_code == 200, response.text
+    return response.json()["results"]
+
+
+def test_bulk_respond(client, db, requests):
+    results = respond(client, [(requests[0], "accept"), (requests[1], "accept"), (requests[2], "reject"),
+                               (requests[3], "block"), ("not-an-id", "accept"), (str(ObjectId()), "reject")])
+    assert results[requests[0]] == results[requests[1]] == "accepted"
+    assert results[requests[2]] == "rejected"
+    assert results[requests[3]] == "invalid_action"
+    assert results["not-an-id"] == "invalid_id"
+    assert list(results.values()).count("not_found") == 1
+
+    assert db.friends.count_documents({"status": "accepted"}) == 2
+    assert db.friends.count_documents({"_id": ObjectId(requests[2])}) == 0
+    assert db.friends.count_documents({"_id": ObjectId(requests[3]), "status": "pending"}) == 1
+    notified = sorted(n["user_id"] for n in db.notifications.find({"type": "request_accepted"}))
+    assert notified == sorted(SENDERS[:2])
+
+
+def test_only_the_receiver_can_respond(client, db, requests):
+    results = respond(client, [(requests[0], "accept")], user_id=SENDERS[1])
+    assert results == {requests[0]: "not_found"}
+    assert db.friends.count_documents({"status": "pending"}) == 4
+
+
+def test_answered_requests_are_not_found(client, db, requests):
+    respond(client, [(requests[0], "accept"), (requests[1], "reject")])
+    assert respond(client, [(requests[0], "accept"), (requests[1], "reject")]) == {
+        requests[0]: "not_found", requests[1]: "not_found"}
+    assert db.notifications.count_documents({"type": "request_accepted"}) == 1
+
+
+def test_lost_race_is_reported_and_not_notified(client, db, requests, monkeypatch):
+    friends = type(db.friends)
+    bulk_write = friends.bulk_write
+
+    def answered_first(self, ops, *args, **kwargs):
+        # Another response lands between the read and this write
+        if self.name == "friends":
+            self.update_many({"_id": {"$in": [ObjectId(requests[0]), ObjectId(requests[1])]}},
+                             {"$set": {"status": "accepted"}})
+        return bulk_write(self, ops, *args, **kwargs)
+
+    monkeypatch.setattr(friends, "bulk_write", answered_first)
+    results = respond(client, [(requests[0], "accept"), (requests[1], "reject"), (requests[2], "accept")])
+    assert results == {requests[0]: "not_found", requests[1]: "not_found", requests[2]: "accepted"}
+    assert [n["user_id"] for n in db.notifications.find({"type": "request_accepted"})] == [SENDERS[2]]
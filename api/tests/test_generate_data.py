@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+import pytest
+import generate_data
+from generate_data import TAGS, oid, plan, tasks, zipf
+from services.video_repository import VIDEO_STATUSES
+
+END = datetime(2026, 6, 1)
+
+
+@pytest.fixture
+def opts(monkeypatch):
+    o = {"seed": 7, "users": 300, "avg_degree": 8, "posts_per_user": 2, "likes_per_post": 3,
+         "comments_per_post": 1, "videos_per_user": 0.5, "journals_per_user": 1,
+         "start": END - timedelta(days=30), "end": END, "password_hash": "x"}
+    o["counts"] = plan(o)
+    monkeypatch.setattr(generate_data, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(generate_data, "_opts", o)
+    monkeypatch.setattr(generate_data, "_db", None)
+    return o
+
+
+def generate(o):
+    docs = {}
+    for task in tasks(o["counts"]):
+        name, chunk, start, stop = task
+        rng = generate_data.random.Random(f"{o['seed']}:{name}:{chunk}")
+        for collection, batch in generate_data.GENERATORS[name](rng, o, start, stop).items():
+            docs.setdefault(collection, []).extend(batch)
+    return docs
+
+
+def test_ids_encode_collection_and_index():
+    at = datetime(2026, 1, 1)
+    a, b = oid("posts", 5, at), oid("likes", 5, at)
+    assert a != b and a.generation_time.replace(tzinfo=None) == at
+    assert a.binary[4] == TAGS["posts"] and int.from_bytes(a.binary[5:], "big") == 5
+
+
+def test_zipf_stays_in_range():
+    rng = generate_data.random.Random(1)
+    assert all(0 <= zipf(rng, 50) < 50 for _ in range(5000))
+
+
+def test_tasks_cover_every_document_once(opts):
+    work = tasks(opts["counts"])
+    for name, total in opts["counts"].items():
+        spans = sorted((start, stop) for n, _, start, stop in work if n == name)
+        assert spans[0][0] == 0 and spans[-1][1] == total
+        assert all(prev[1] == nxt[0] for prev, nxt in zip(spans, spans[1:]))
+
+
+def test_output_is_deterministic_and_consistent(opts):
+    docs = generate(opts)
+    assert docs == generate(opts)
+
+    counts = opts["counts"]
+    for name in ("users", "posts", "comments", "user_videos", "journals", "rooms", "products"):
+        assert len(docs[name]) == counts[name], name
+    assert len(docs["likes"]) <= counts["likes"]  # duplicate (post, user) pairs are skipped
+
+    user_ids = {str(u["_id"]) for u in docs["users"]}
+    post_ids = {str(p["_id"]) for p in docs["posts"]}
+    assert {f["receiver_id"] for f in docs["friends"]} <= user_ids
+    assert {d["post_id"] for d in docs["likes"] + docs["comments"]} <= post_ids
+    assert {p["user_id"] for p in docs["posts"]} <= user_ids
+    assert {r["host_id"] for r in docs["rooms"]} <= user_ids
+    assert {p["seller_id"] for p in docs["products"]} <= user_ids
+    for collection, batch in docs.items():
+        assert len({d["_id"] for d in batch}) == len(batch), collection
+
+    for video in docs["user_videos"]:
+        assert video["status"] in VIDEO_STATUSES and isinstance(video["created_at"], datetime)
+        assert "rank_score" in video
+
+
+def test_rerun_skips_documents_already_written(db, opts, monkeypatch):
+    monkeypatch.setattr(generate_data, "_db", db)
+    task = tasks(opts["counts"])[0]
+    first = generate_data._run_task(task)
+    assert first["users"] == 100 and first["friends"] > 0
+    assert generate_data._run_task(task) == {"users": 0, "friends": 0}
+    assert db.users.count_documents({}) == 100
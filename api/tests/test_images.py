@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import io
+import pytest
+from PIL import Image
+from services import images
+from services.images import process_post_images, stored_image
+from services.storage import read_bytes
+
+pytestmark = pytest.mark.skipif(not images.available_formats(), reason="Pillow without WebP/AVIF")
+
+
+def png_bytes(width=800, height=600):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), (16, 120, 90)).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def data_url(data):
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+def test_data_url_is_replaced_by_stored_original(storage):
+    data = png_bytes()
+    url, variants = stored_image(data_url(data))
+    key = hashlib.sha256(data).hexdigest() + ".png"
+    assert url == f"/static/{key}"
+    assert storage.exists(key)
+    assert set(variants) == {f"{size}_{fmt}" for size in images.DERIVATIVE_SIZES for fmt in images.available_formats()}
+    with Image.open(io.BytesIO(read_bytes(variants["thumb_webp"].rsplit("/", 1)[1]))) as thumb:
+        assert thumb.size == (320, 240)
+
+
+def test_data_url_kept_when_storage_is_ephemeral(storage, monkeypatch):
+    monkeypatch.setattr(images, "is_durable", lambda: False)
+    url = data_url(png_bytes())
+    assert stored_image(url) == (url, {})
+
+
+def test_undecodable_data_url_is_left_alone(storage):
+    url = data_url(b"not an image")
+    assert stored_image(url) == (url, {})
+
+
+def test_cloudinary_url_gets_transformation_variants():
+    url = "https://res.cloudinary.com/demo/image/upload/v1/pic.jpg"
+    same, variants = stored_image(url)
+    assert same == url
+    assert variants["card_webp"] == "https://res.cloudinary.com/demo/image/upload/w_640,c_limit,f_webp,q_auto/v1/pic.jpg"
+
+
+def test_feed_serves_stored_url_and_variants(db, client, storage):
+    user_id = str(db.users.insert_one({"email": "a@example.com", "full_name": "A",
+                                       "profile_pic_variants": {"avatar_webp": "/static/av_avatar.webp"}}).inserted_id)
+    post_id = str(db.posts.insert_one({"user_id": user_id, "content": "hi", "status": "approved",
+                                       "image_url": data_url(png_bytes()), "created_at": "2026-01-01T00:00:00"}).inserted_id)
+    process_post_images(post_id)
+
+    [post] = client.get("/api/posts/").json()
+    assert post["image_url"].startswith("/static/")
+    assert post["image_variants"]["card_webp"].startswith("/static/")
+    assert post["author_profile_pic_thumb"] == "/static/av_avatar.webp"
+
+    profile = client.get(f"/api/users/{user_id}").json()
+    assert "data:" not in str(profile["posts"])
+
+
+def test_concurrent_edit_is_not_overwritten(db, storage, monkeypatch):
+    post_id = db.posts.insert_one({"user_id": "u", "image_url": data_url(png_bytes())}).inserted_id
+
+    def edited_meanwhile(url):
+        db.posts.update_one({"_id": post_id}, {"$set": {"image_url": "https://example.com/new.png"}})
+        return "/static/stale.png", {"thumb_webp": "/static/stale_thumb.webp"}
+
+    monkeypatch.setattr(images, "stored_image", edited_meanwhile)
+    process_post_images(str(post_id))
+    assert db.posts.find_one({"_id": post_id})["image_url"] == "https://example.com/new.png"
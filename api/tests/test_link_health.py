@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import pytest
+from services import link_health
+from services.link_health import _check, apply_visibility, record_results
+
+
+def seed(db, collection, url, status="approved", **extra):
+    return db[collection].insert_one({"video_url": url, "status": status, **extra}).inserted_id
+
+
+def fail(db, url, times=link_health.FAIL_THRESHOLD):
+    for _ in range(times):
+        record_results(db, [{"url": url, "ok": False, "http_status": 404, "error": None}])
+
+
+@pytest.fixture
+def in_queries(db, monkeypatch):
+    """Sizes of the `video_url: {$in: ...}` lists sent to the content collections."""
+    sizes = []
+    for method in ("count_documents", "update_many"):
+        original = getattr(type(db.posts), method)
+
+        def wrapper(self, filter, *args, _original=original, **kwargs):
+            if self.name in ("user_videos", "posts") and "$in" in (filter.get("video_url") or {}):
+                sizes.append(len(filter["video_url"]["$in"]))
+            return _original(self, filter, *args, **kwargs)
+
+        monkeypatch.setattr(type(db.posts), method, wrapper)
+    return sizes
+
+
+def test_broken_links_are_paged(db, monkeypatch, in_queries):
+    monkeypatch.setattr(link_health, "BATCH_SIZE", 2)
+    urls = [f"https://cdn.example.com/{i}.mp4" for i in range(5)]
+    for url in urls:
+        seed(db, "user_videos", url)
+        fail(db, url)
+    seed(db, "posts", urls[0])
+    fail(db, "https://cdn.example.com/flaky.mp4", times=1)
+
+    summary = apply_visibility(db, dry_run=True)
+    assert summary == {"user_videos": {"hidden": 5, "restored": 0}, "posts": {"hidden": 1, "restored": 0}}
+    assert max(in_queries) <= 2
+
+
+def test_recovered_links_are_restored_in_pages(db, monkeypatch, in_queries):
+    monkeypatch.setattr(link_health, "BATCH_SIZE", 2)
+    hidden = dict(status="hidden", hidden_reason=link_health.HIDDEN_REASON, hidden_from_status="approved")
+    urls = [f"https://cdn.example.com/{i}.mp4" for i in range(4)]
+    for url in urls:
+        seed(db, "user_videos", url, **hidden)
+    fail(db, urls[0])  # still broken
+    seed(db, "posts", urls[1], status="hidden", hidden_reason="admin")  # hidden for another reason
+
+    summary = apply_visibility(db, dry_run=True)
+    assert summary["user_videos"]["restored"] == 3
+    assert summary["posts"]["restored"] == 0
+    assert max(in_queries) <= 2
+
+
+def test_busy_host_does_not_hold_global_slots():
+    async def scenario():
+        async def handler(request):
+            return httpx.Response(200)
+
+        limit = asyncio.Semaphore(1)
+        busy = asyncio.Semaphore(0)  # every slot for this host is taken
+        host_limits = {"busy.example.com": busy}
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            waiting = asyncio.create_task(_check(client, "https://busy.example.com/a.mp4", limit, host_limits))
+            await asyncio.sleep(0)
+            result = await asyncio.wait_for(_check(client, "https://free.example.com/b.mp4", limit, host_limits), 1)
+            busy.release()
+            return result, await waiting
+
+    other, queued = asyncio.run(scenario())
+    assert other["ok"] and queued["ok"]
+
+
+
+def test_broken_link_is_hidden(db):
+    url = "https://cdn.example.com/a.mp4"
+    video_id = seed(db, "user_videos", url)
+    fail(db, url)
+    assert apply_visibility(db)["user_videos"]["hidden"] == 1
+    video = db.user_videos.find_one({"_id": video_id})
+    assert (video["status"], video["hidden_from_status"], video["hidden_reason"]) == ("hidden", "approved", "broken_link")
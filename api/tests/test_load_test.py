@@ -0,0 +1,82 @@
+import asyncio
+import json
+import random
+from collections import Counter
+import pytest
+import main
+from benchmarks import load_test
+from benchmarks.load_test import (
+    SCENARIOS, build_request, compare_results, find_baseline, percentile, run_load, seed_dataset, summarize
+)
+
+
+def test_percentile_nearest_rank():
+    values = [float(v) for v in range(1, 101)]
+    assert [percentile(values, p) for p in (50, 95, 99, 100)] == [50.0, 95.0, 99.0, 100.0]
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_zipf_index_is_skewed_and_in_range():
+    rng = random.Random(1)
+    picks = Counter(load_test._zipf_index(rng, 100) for _ in range(10_000))
+    assert min(picks) >= 0 and max(picks) < 100
+    assert picks[0] > picks[50] * 10
+
+
+def test_every_scenario_builds_a_request():
+    data = {"user_ids": ["a" * 24], "post_ids": ["b" * 24], "emails": ["u@loadtest.local"]}
+    for route, _ in SCENARIOS:
+        method, url, _ = build_request(route, random.Random(0), data)
+        assert route.startswith(method + " ")
+        assert url.split("?")[0] == route.split(" ", 1)[1].replace("{post_id}", "b" * 24)
+    with pytest.raises(ValueError):
+        build_request("GET /nope", random.Random(0), data)
+
+
+def endpoint(p95, queries=2.0, requests=10):
+    return {"requests": requests, "errors": 0, "p50_ms": 1.0, "p95_ms": p95, "p99_ms": p95,
+            "mean_ms": 1.0, "queries_per_request": queries, "max_queries": 3}
+
+
+def test_compare_results_flags_latency_and_query_regressions(capsys):
+    baseline = {"commit": "abc", "endpoints": {
+        "GET /api/posts/": endpoint(10.0), "GET /api/videos/": endpoint(10.0), "POST /api/auth/login": endpoint(10.0)}}
+    result = {"endpoints": {
+        "GET /api/posts/": endpoint(12.0, queries=2.05),  # within both thresholds
+        "GET /api/videos/": endpoint(13.0),
+        "POST /api/auth/login": endpoint(10.0, queries=3.0),
+        "GET /api/videos/for-you": endpoint(99.0),  # no baseline, not compared
+    }}
+    regressions = compare_results(baseline, result, threshold=0.25)
+    assert regressions == ["GET /api/videos/: p95 10.0 -> 13.0 ms",
+                           "POST /api/auth/login: queries per request 2.0 -> 3.0"]
+    assert "compared with abc" in capsys.readouterr().out
+
+
+def test_find_baseline_picks_the_newest_matching_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(load_test, "RESULTS_DIR", tmp_path)
+    config = {"backend": "mongomock", "users": 10}
+    runs = {"old": ("2026-01-01", config), "new": ("2026-02-01", config),
+            "other": ("2026-03-01", {**config, "users": 20}), "head": ("2026-04-01", config)}
+    for commit, (recorded_at, cfg) in runs.items():
+        (tmp_path / f"{commit}.json").write_text(json.dumps({"commit": commit, "recorded_at": recorded_at, "config": cfg}))
+    (tmp_path / "broken.json").write_text("{")
+
+    result = {"commit": "head", "config": config}
+    assert find_baseline(result, None)["commit"] == "new"
+    assert find_baseline(result, "old")["commit"] == "old"
+    with pytest.raises(SystemExit):
+        find_baseline(result, "missing")
+
+
+def test_small_run_end_to_end(db):
+    data = seed_dataset(db, n_users=12, avg_degree=3, posts_per_user=2, seed=7)
+    assert data["counts"]["users"] == 12 and len(data["post_ids"]) == data["counts"]["posts"]
+
+    samples, elapsed = asyncio.run(run_load(main.app, data, n_clients=2, n_requests=30, warmup=5, seed=7))
+    summary = summarize(samples, elapsed)
+    assert summary["requests"] == 30
+    for route, stats in summary["endpoints"].items():
+        assert stats["errors"] == 0, route
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
@@ -0,0 +1,70 @@
+import re
+import threading
+import pytest
+import main
+from services import metrics
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{(?:[a-z_]+="(?:[^"\\]|\\.)*",?)*\})? (-?[0-9.e+-]+)$')
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, "_shards", [])
+    monkeypatch.setattr(metrics, "_local", threading.local())
+
+
+def scrape(client, **headers):
+    response = client.get("/api/metrics", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    return response.text
+
+
+def samples(text):
+    out = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        out[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    return out
+
+
+def test_exposition_format(db, client, fresh_metrics):
+    client.get("/api/health")
+    text = scrape(client)
+    assert text.endswith("\n")
+    for name, (kind, _) in metrics.HELP.items():
+        assert text.count(f"# TYPE {name} {kind}\n") == 1
+        assert text.count(f"# HELP {name} ") == 1
+    samples(text)  # every sample line parses
+
+
+def test_requests_are_counted_by_route_template(db, client, fresh_metrics):
+    for _ in range(3):
+        client.get("/api/posts/000000000000000000000000/status")
+    values = samples(scrape(client))
+    labels = 'method="GET",route="/api/posts/{post_id}/status"'
+    [status] = [k for k in values if k.startswith(f"http_requests_total{{{labels}")]
+    assert values[status] == 3
+
+    buckets = [values[f'http_request_duration_seconds_bucket{{{labels},le="{b!r}"}}'] for b in metrics.LATENCY_BUCKETS]
+    assert buckets == sorted(buckets)  # cumulative
+    assert values[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 3
+    assert values[f"http_request_duration_seconds_count{{{labels}}}"] == 3
+    assert values["http_requests_in_flight"] == 1  # the scrape itself
+
+
+def test_external_calls_and_label_escaping(fresh_metrics):
+    with metrics.external_call('cloud"inary\n'):
+        pass
+    values = samples(metrics.render())
+    assert values['external_request_duration_seconds_count{service="cloud\\"inary\\n"}'] == 1
+
+
+def test_metrics_token(db, client, fresh_metrics, monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    scrape(client, Authorization="Bearer s3cret")
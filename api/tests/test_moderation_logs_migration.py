@@ -0,0 +1,50 @@
+from bson import ObjectId
+import migrate_moderation_logs
+from services.moderation_log import history
+
+
+def test_moderation_logs_migration(db):
+    post_id, video_id = ObjectId(), ObjectId()
+    db.posts.insert_one({"_id": post_id, "content": "Hello", "moderation_logs": [
+        {"action": "AI Approved", "operator": "AI", "timestamp": "2024-03-01T10:00:00", "reason": "clean"},
+        "not a log entry",
+        {"action": "Rejected", "operator": "admin@example.com", "timestamp": "2024-03-02T10:00:00"},
+    ]})
+    db.user_videos.insert_one({"_id": video_id, "video_url": "https://cdn.example.com/1.mp4",
+                               "moderation_logs": [{"action": "Reported"}]})
+    db.posts.insert_one({"content": "Never moderated"})
+
+    assert migrate_moderation_logs.migrate(db, batch_size=1) == 3
+    assert db.posts.count_documents({"moderation_logs": {"$exists": True}}) == 0
+    assert db.user_videos.count_documents({"moderation_logs": {"$exists": True}}) == 0
+
+    page = history(db, "post", str(post_id))
+    assert [(e["action"], e["operator"], e["timestamp"]) for e in page["items"]] == [
+        ("Rejected", "admin@example.com", "2024-03-02T10:00:00"),
+        ("AI Approved", "AI", "2024-03-01T10:00:00"),
+    ]
+    assert page["items"][1]["reason"] == "clean"
+    video_events = history(db, "video", str(video_id))["items"]
+    assert [(e["action"], e["operator"]) for e in video_events] == [("Reported", "UNKNOWN")]
+    assert video_events[0]["timestamp"] == video_id.generation_time.replace(tzinfo=None).isoformat()
+    # History is per target type, even for an id that matches an item of the other kind
+    assert history(db, "video", str(post_id))["items"] == []
+    assert migrate_moderation_logs.migrate(db) == 0
+
+
+def test_moderation_logs_migration_rerun_does_not_duplicate(db):
+    logs = [{"action": "AI Approved", "operator": "AI", "timestamp": "2024-03-01T10:00:00"}]
+    post_id = db.posts.insert_one({"content": "Hello", "moderation_logs": logs}).inserted_id
+    migrate_moderation_logs.migrate(db)
+    # An interrupted run can leave an array behind after its events were written
+    db.posts.update_one({"_id": post_id}, {"$set": {"moderation_logs": logs}})
+    assert migrate_moderation_logs.migrate(db, restart=True) == 1
+    assert db.moderation_events.count_documents({"target_id": str(post_id)}) == 1
+
+
+def test_moderation_logs_dry_run_writes_nothing(db):
+    db.posts.insert_one({"content": "Hello", "moderation_logs": [{"action": "AI Approved", "operator": "AI"}]})
+    assert migrate_moderation_logs.migrate(db, dry_run=True) == 1
+    assert db.moderation_events.count_documents({}) == 0
+    assert db.posts.count_documents({"moderation_logs": {"$exists": True}}) == 1
+
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+import pytest
+from services import moderation_queue, video_repository
+from services.moderation_queue import bulk_moderate, claim, release
+from services.video_repository import new_video_doc
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    tags = []
+    monkeypatch.setattr(video_repository, "invalidate", lambda *t: tags.extend(t))
+    monkeypatch.setattr(moderation_queue, "invalidate", lambda *t: tags.extend(t))
+    return tags
+
+
+def seed_videos(db, n, status="pending"):
+    start = datetime.utcnow() - timedelta(hours=1)
+    ids = []
+    for i in range(n):
+        doc = new_video_doc(f"user{i}", f"https://cdn.example.com/{i}.mp4")
+        doc.update(status=status, created_at=start + timedelta(minutes=i))
+        ids.append(str(db.user_videos.insert_one(doc).inserted_id))
+    return ids
+
+
+def test_claims_never_overlap_and_release_frees_the_item(db):
+    ids = seed_videos(db, 3)
+    first = [item["id"] for item in claim(db, "videos", "mod-a", count=2)]
+    second = [item["id"] for item in claim(db, "videos", "mod-b", count=2)]
+    assert first == ids[:2] and second == ids[2:]
+
+    assert not release(db, "videos", ids[0], "mod-b")
+    assert release(db, "videos", ids[0], "mod-a")
+    assert db.user_videos.find_one({"user_id": "user0"})["claimed_by"] is None
+    # A moderator's own leases are handed back to them along with new ones
+    assert [item["id"] for item in claim(db, "videos", "mod-b")] == [ids[0], ids[2]]
+
+
+def test_expired_claims_can_be_taken_over(db):
+    [video_id] = seed_videos(db, 1)
+    claim(db, "videos", "mod-a")
+    db.user_videos.update_one({}, {"$set": {"claim_expires_at": datetime.utcnow() - timedelta(seconds=1)}})
+    assert [item["id"] for item in claim(db, "videos", "mod-b")] == [video_id]
+
+
+def test_bulk_moderate_videos_writes_through_the_repository(db, invalidated):
+    a, b = seed_videos(db, 2)
+    claim(db, "videos", "mod-a", count=2)
+    results, changes = bulk_moderate(db, "videos", [
+        {"id": a, "status": "approved"},
+        {"id": b, "status": "rejected", "rejection_reason": "spam"},
+        {"id": "nope", "status": "approved"},
+    ])
+    assert results == {a: "updated", b: "updated", "nope": "invalid_id"}
+    assert {c["new"] for c in changes} == {"approved", "rejected"}
+    rejected = db.user_videos.find_one({"user_id": "user1"})
+    assert (rejected["status"], rejected["rejection_reason"], rejected["claimed_by"]) == ("rejected", "spam", None)
+    assert invalidated == ["videos"]
+
+
+def test_bulk_moderate_reports_concurrent_changes_as_conflicts(db, invalidated, monkeypatch):
+    a, b = seed_videos(db, 2)
+    original = type(db.user_videos).bulk_write
+
+    def racing_bulk_write(self, requests, *args, **kwargs):
+        if self.name == "user_videos":
+            # Another moderator rejects `b` between our read and our write
+            original(self, [moderation_queue.UpdateOne({"user_id": "user1"}, {"$set": {"status": "rejected"}})])
+        return original(self, requests, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.user_videos), "bulk_write", racing_bulk_write)
+    results, changes = bulk_moderate(db, "videos", [{"id": a, "status": "approved"}, {"id": b, "status": "approved"}])
+    assert results == {a: "updated", b: "conflict"}
+    assert [c["id"] for c in changes] == [a]
+    assert db.user_videos.find_one({"user_id": "user1"})["status"] == "rejected"
+    assert invalidated == ["videos"]
+
+
+def test_bulk_moderate_posts_invalidates_author_profiles(db, invalidated):
+    post_id = str(db.posts.insert_one({"user_id": "author", "status": "pending", "created_at": "2026-01-01"}).inserted_id)
+    results, _ = bulk_moderate(db, "posts", [{"id": post_id, "status": "approved"}])
+    assert results == {post_id: "updated"}
+    assert invalidated == ["profile:author"]
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from services.notifications import (READ_RETENTION, UNREAD_RETENTION, mark_read, migrate_legacy_ttl, notify,
+                                    notify_like, unread_count)
+from services.schema import apply_indexes
+
+USER = "recipient"
+
+
+def test_pages_with_next_cursor(client, db):
+    for i in range(5):
+        notify(db, USER, "general", f"Message {i}")
+    seen = []
+    before = None
+    while True:
+        response = client.get("/api/friends/notifications", params={"user_id": USER, "limit": 2,
+                                                                    **({"before": before} if before else {})})
+        assert response.status_code == 200
+        page = response.json()
+        seen += [n["message"] for n in page["items"]]
+        before = page["next_cursor"]
+        if before is None:
+            break
+    assert seen == [f"Message {i}" for i in reversed(range(5))]
+
+
+def test_bad_cursor_is_a_400(client, db):
+    response = client.get("/api/friends/notifications", params={"user_id": USER, "before": "garbage"})
+    assert response.status_code == 400
+
+
+def test_likes_fold_into_one_unread_row(db):
+    apply_indexes(db, ["notifications"])  # re-like dedup goes through the unique partial index
+    for actor in ("a", "b", "a"):
+        notify_like(db, USER, "post1", actor, actor.upper())
+    rows = list(db.notifications.find({"user_id": USER}))
+    assert len(rows) == 1 and rows[0]["count"] == 2
+    assert unread_count(db, USER) == 1
+    mark_read(db, USER)
+    assert unread_count(db, USER) == 0
+
+
+def test_unread_count_recounts_after_expiry(db):
+    notify(db, USER, "general", "Soon gone")
+    assert unread_count(db, USER) == 1
+    # What the TTL monitor does once expires_at passes
+    db.notifications.delete_many({})
+    db.notification_counters.update_one({"_id": USER}, {"$set": {"next_expiry": datetime.utcnow()}})
+    assert unread_count(db, USER) == 0
+
+
+def test_legacy_ttl_migration_keeps_read_state(db):
+    created = (datetime.utcnow() - timedelta(hours=1)).replace(microsecond=0)
+    db.notifications.create_index("created_at", expireAfterSeconds=86400)
+    read_id, unread_id, untracked_id = db.notifications.insert_many([
+        {"user_id": USER, "type": "general", "message": "Read", "is_read": True, "created_at": created},
+        {"user_id": USER, "type": "general", "message": "Unread", "is_read": False, "created_at": created},
+        {"user_id": USER, "type": "general", "message": "Before read state", "created_at": created},
+    ]).inserted_ids
+
+    assert migrate_legacy_ttl(db) == 3
+    rows = {n["_id"]: n for n in db.notifications.find()}
+    assert [rows[i]["is_read"] for i in (read_id, unread_id, untracked_id)] == [True, False, False]
+    assert rows[read_id]["expires_at"] == created + READ_RETENTION
+    assert rows[unread_id]["expires_at"] == created + UNREAD_RETENTION
+    assert all(n["updated_at"] == created for n in rows.values())
+    assert "created_at_1" not in db.notifications.index_information()
+    assert unread_count(db, USER) == 2
+    assert migrate_legacy_ttl(db) == 0
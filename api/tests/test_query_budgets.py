@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from services.query_profiler import QUERY_BUDGETS, query_budget
+from services.ranking import score_video
+from services.schema import MIGRATIONS
+
+USERS = [ObjectId() for _ in range(6)]
+VIEWER = str(USERS[0])
+
+
+@pytest.fixture
+def seeded(db):
+    now = datetime.utcnow()
+    db.users.insert_many([{"_id": oid, "email": f"user{i}@example.com", "full_name": f"User {i}", "role": "user"}
+                          for i, oid in enumerate(USERS)])
+    db.friends.insert_many([{"sender_id": VIEWER, "receiver_id": str(oid), "status": "accepted",
+                             "created_at": now, "updated_at": now} for oid in USERS[1:]])
+    posts = [{"user_id": str(USERS[i % len(USERS)]), "author_name": f"User {i}", "content": f"Post {i}",
+              "status": "approved", "created_at": (now - timedelta(minutes=i)).isoformat()} for i in range(30)]
+    db.posts.insert_many(posts)
+    db.likes.insert_many([{"post_id": str(p["_id"]), "user_id": VIEWER, "created_at": now} for p in posts[::3]])
+    db.comments.insert_many([{"post_id": str(p["_id"]), "user_id": VIEWER, "content": "Nice",
+                              "created_at": now} for p in posts[::2]])
+    videos = []
+    for i in range(30):
+        video = {"user_id": str(USERS[i % len(USERS)]), "video_url": f"https://cdn.example.com/{i}.mp4",
+                 "caption": f"Video {i}", "status": "approved" if i % 5 else "pending",
+                 "created_at": now - timedelta(minutes=i), "view_count": i * 10, "like_count": i, "comment_count": 0}
+        video["rank_score"] = score_video(video)
+        videos.append(video)
+    db.user_videos.insert_many(videos)
+    db.video_likes.insert_many([{"video_id": str(v["_id"]), "user_id": VIEWER, "created_at": now}
+                                for v in videos[::4]])
+    db.notifications.insert_many([{"user_id": VIEWER, "type": "like", "actor_ids": [str(USERS[1])],
+                                   "is_read": False, "created_at": now, "updated_at": now - timedelta(seconds=i),
+                                   "expires_at": now + timedelta(days=30)}
+                                  for i in range(30)])
+    db.friend_suggestions.insert_one({"_id": VIEWER, "suggestions": [{"user_id": str(USERS[5])}]})
+    return db
+
+
+@pytest.mark.parametrize("route, url", [
+    ("GET /api/posts/", f"/api/posts/?user_id={VIEWER}&limit=15"),
+    ("GET /api/videos/", f"/api/videos/?user_id={VIEWER}&limit=10"),
+    ("GET /api/videos/for-you", f"/api/videos/for-you?user_id={VIEWER}&limit=10"),
+    ("GET /api/friends/suggestions", f"/api/friends/suggestions?user_id={VIEWER}"),
+    ("GET /api/friends/notifications", f"/api/friends/notifications?user_id={VIEWER}&limit=20"),
+    ("GET /api/admin/queue/{kind}", "/api/admin/queue/videos?role=admin&status=pending&limit=20"),
+    ("GET /api/admin/queue/{kind}", "/api/admin/queue/posts?role=admin&status=approved&limit=20"),
+])
+def test_endpoint_within_budget(client, seeded, route, url):
+    with query_budget(QUERY_BUDGETS[route]) as issued:
+        response = client.get(url)
+    assert response.status_code == 200, response.text
+    assert response.json()
+    assert {r for r, *_ in issued} == {route}
+
+
+def test_migration_lookup_is_cached_once_recorded(client, seeded):
+    # The legacy-status fallback checks schema_migrations until it finds the migration recorded
+    version = next(v for v, name, _, _ in MIGRATIONS if name == "video_fields")
+    seeded.schema_migrations.insert_one({"_id": version})
+    client.get(f"/api/videos/for-you?user_id={VIEWER}&limit=10")
+    with query_budget(QUERY_BUDGETS["GET /api/videos/for-you"] - 1):
+        assert client.get(f"/api/videos/for-you?user_id={VIEWER}&limit=10").status_code == 200
+
+
+def test_query_budget_reports_overrun(db):
+    with pytest.raises(AssertionError, match="3 queries issued, budget is 2"):
+        with query_budget(2):
+            for _ in range(3):
+                db.users.find_one({"email": "nobody@example.com"})
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+from services import ranking
+from services.moderation_queue import bulk_moderate
+from services.ranking import _changed_authors, run_ranking_job
+from services.video_repository import VideoRepository, new_video_doc
+
+SINCE = datetime.utcnow() - timedelta(minutes=5)
+
+
+def seed(db, user_id, status="approved", **fields):
+    doc = new_video_doc(user_id, f"https://cdn.example.com/{user_id}.mp4")
+    doc.update(status=status, rank_score=1.0, **fields)
+    return db.user_videos.insert_one(doc).inserted_id
+
+
+def test_status_writes_mark_the_author_changed(db):
+    quiet = seed(db, "quiet")
+    rejected = seed(db, "rejected")
+    seed(db, "stale-iso", updated_at=datetime.utcnow().isoformat())  # legacy string stamps are ignored
+    VideoRepository(db).set_status(rejected, "rejected")
+
+    assert _changed_authors(db, SINCE) == ["rejected"]
+    assert db.user_videos.find_one({"_id": quiet}).get("status_changed_at") is None
+
+
+def test_bulk_moderation_marks_the_author_changed(db):
+    video_id = seed(db, "author", status="pending")
+    results, _ = bulk_moderate(db, "videos", [{"id": str(video_id), "status": "approved"}])
+    assert results == {str(video_id): "updated"}
+    assert isinstance(db.user_videos.find_one({"_id": video_id})["status_changed_at"], datetime)
+    assert _changed_authors(db, SINCE) == ["author"]
+
+
+def test_change_scan_only_uses_datetime_fields(db, monkeypatch):
+    queries = []
+    original = type(db.user_videos).distinct
+
+    def spy(self, key, filter=None, *args, **kwargs):
+        queries.append(filter)
+        return original(self, key, filter, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.user_videos), "distinct", spy)
+    _changed_authors(db, SINCE)
+    [query] = queries
+    fields = {field for branch in query["$or"] for field in branch}
+    assert "updated_at" not in fields
+    assert all(isinstance(branch[f]["$gte"], datetime) for branch in query["$or"]
+               for f in ("stats_updated_at", "status_changed_at") if f in branch)
+
+
+def test_incremental_run_rescores_changed_authors_only(db):
+    db.job_state.insert_one({"_id": ranking.JOB_ID, "last_run": SINCE})
+    seed(db, "quiet")
+    changed = seed(db, "changed", like_count=10, stats_updated_at=datetime.utcnow())
+    assert run_ranking_job(db) == 1
+    assert db.user_videos.find_one({"_id": changed})["rank_score"] > 1.0
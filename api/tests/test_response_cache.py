@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+import pytest
+from services import response_cache
+from services.video_repository import VideoRepository
+
+FEED = "/api/videos/?limit=10"
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def backend(request, db, monkeypatch):
+    backend = response_cache.MemoryBackend(100) if request.param == "memory" else response_cache.MongoBackend()
+    monkeypatch.setattr(response_cache, "_backend", backend)
+    return backend
+
+
+@pytest.fixture
+def videos(db):
+    now = datetime.utcnow()
+    return [str(i) for i in db.user_videos.insert_many([
+        {"user_id": "u1", "video_url": f"https://cdn.example.com/{i}.mp4", "status": status,
+         "created_at": now - timedelta(minutes=i), "rank_score": 1.0}
+        for i, status in enumerate(["approved", "approved", "pending"])
+    ]).inserted_ids]
+
+
+def test_miss_then_hit_with_stable_etag(client, backend, videos):
+    first = client.get(FEED)
+    second = client.get(FEED)
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert first.json() == second.json()
+    assert [v["id"] for v in first.json()] == videos[:2]
+    assert first.headers["etag"] == second.headers["etag"] == response_cache.etag_for(first.content)
+    assert first.headers["cache-control"] == "public, no-cache"
+
+
+def test_matching_if_none_match_gets_304(client, backend, videos):
+    etag = client.get(FEED).headers["etag"]
+    response = client.get(FEED, headers={"If-None-Match": f'"stale", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(FEED, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_viewer_is_left_out_of_the_key_and_personalized(client, backend, db, videos):
+    db.video_likes.insert_one({"video_id": videos[1], "user_id": "fan", "created_at": datetime.utcnow()})
+    anonymous = client.get(FEED)
+    fan = client.get(FEED + "&user_id=fan")
+    other = client.get(FEED + "&user_id=other")
+    assert fan.headers["x-cache"] == other.headers["x-cache"] == "HIT"
+    assert [v["is_liked_by_me"] for v in fan.json()] == [False, True]
+    assert [v["is_liked_by_me"] for v in other.json()] == [False, False]
+    assert fan.headers["etag"] != anonymous.headers["etag"]
+    assert fan.headers["cache-control"] == "private, no-cache"
+
+
+def test_status_change_invalidates(client, backend, videos):
+    before = client.get(FEED)
+    response = client.put(f"/api/admin/videos/{videos[2]}/status?role=admin", json={"status": "approved"})
+    assert response.status_code == 200, response.text
+    after = client.get(FEED, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["x-cache"] == "MISS"
+    assert [v["id"] for v in after.json()] == videos
+    assert client.get(FEED).headers["x-cache"] == "HIT"
+
+
+def test_render_that_overlaps_an_invalidation_is_not_cached(client, backend, db, videos, monkeypatch):
+    latest = VideoRepository.latest
+
+    def latest_then_write(self, *args):
+        docs = latest(self, *args)
+        # A write lands after the render read the old data
+        VideoRepository(db).set_status(videos[2], "approved")
+        return docs
+
+    monkeypatch.setattr(VideoRepository, "latest", latest_then_write)
+    stale = client.get(FEED)
+    assert [v["id"] for v in stale.json()] == videos[:2]
+    monkeypatch.setattr(VideoRepository, "latest", latest)
+    fresh = client.get(FEED)
+    assert fresh.headers["x-cache"] == "MISS"
+    assert [v["id"] for v in fresh.json()] == videos
+
+
+def test_deeper_pages_bypass_the_cache(client, backend, videos):
+    response = client.get(FEED + "&skip=10")
+    assert response.status_code == 200
+    assert "x-cache" not in response.headers
+    assert response_cache.stats()["routes"]["/api/videos/"]["bypass"] == 1
@@ -0,0 +1,80 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from services import sampling_profiler
+
+
+def busy_endpoint(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def capture(monkeypatch):
+    """A finished capture taken while a thread runs `busy_endpoint`."""
+    monkeypatch.setattr(sampling_profiler, "_capture", None)
+    route = SimpleNamespace(endpoint=busy_endpoint, methods={"GET"}, path="/api/busy")
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_endpoint, args=(stop,), name="worker")
+    worker.start()
+    try:
+        taken = sampling_profiler.start([route], seconds=0.2, interval=0.005)
+        assert sampling_profiler.start([route]) is None  # one capture at a time
+        assert taken.done.wait(5)
+    finally:
+        stop.set()
+        worker.join()
+    return taken
+
+
+def test_samples_are_tagged_with_the_endpoint_route(capture):
+    tags = {tag for tag, _ in capture.stacks}
+    assert tags == {"GET /api/busy"}  # idle threads are dropped
+    assert capture.samples == sum(capture.stacks.values()) > 0
+    status = capture.status()
+    assert status["running"] is False and status["samples"] == capture.samples
+
+
+def test_collapsed_output(capture):
+    lines = sampling_profiler.collapsed(capture).splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        frames = stack.split(";")
+        assert frames[0] == "GET /api/busy" and int(count) > 0
+        assert "test_sampling_profiler.py:busy_endpoint" in frames
+
+
+def test_speedscope_output(capture):
+    doc = sampling_profiler.speedscope(capture)
+    [profile] = doc["profiles"]
+    assert profile["type"] == "sampled" and profile["name"] == "GET /api/busy"
+    assert len(profile["samples"]) == len(profile["weights"])
+    frame_count = len(doc["shared"]["frames"])
+    assert all(0 <= i < frame_count for sample in profile["samples"] for i in sample)
+    assert profile["endValue"] == pytest.approx(capture.samples * capture.interval)
+
+
+def test_all_threads_tags_by_thread_name(monkeypatch):
+    monkeypatch.setattr(sampling_profiler, "_capture", None)
+    stop = threading.Event()
+    idle = threading.Thread(target=stop.wait, name="idle-worker")
+    idle.start()
+    try:
+        taken = sampling_profiler.start([], seconds=0.1, interval=0.01, all_threads=True)
+        taken.done.wait(5)
+    finally:
+        stop.set()
+        idle.join()
+    assert "thread:idle-worker" in {tag for tag, _ in taken.stacks}
+
+
+def test_admin_endpoints(db, client, monkeypatch):
+    monkeypatch.setattr(sampling_profiler, "_capture", None)
+    assert client.get("/api/admin/profiler/sample", params={"role": "admin"}).status_code == 404
+    assert client.post("/api/admin/profiler/sample", params={"role": "user"}).status_code == 403
+    started = client.post("/api/admin/profiler/sample", params={"role": "admin", "seconds": 0.1}).json()
+    assert started["running"] is True
+    sampling_profiler.latest().done.wait(5)
+    assert client.get("/api/admin/profiler/sample", params={"role": "admin", "format": "status"}).json()["running"] is False
+    assert client.get("/api/admin/profiler/sample", params={"role": "admin", "format": "svg"}).status_code == 400
@@ -0,0 +1,82 @@
+import sys
+import types
+import pytest
+from services import schema
+from services.schema import apply_indexes, diff, run_migrations
+
+
+def names(db, collection):
+    return set(db[collection].index_information()) - {"_id_"}
+
+
+def test_everything_is_missing_on_an_empty_database(db):
+    report = diff(db, validators=False)
+    assert set(report) == set(schema.INDEXES)
+    assert report["users"] == {"missing": ["email_1", "mobile_1", "phone_number_1", "seller_status_1"],
+                               "conflicting": [], "extra": []}
+
+
+def test_apply_indexes_builds_missing_ones_once(db):
+    created = apply_indexes(db, ["users", "friend_graph_changes"])
+    assert set(created["users"]) == names(db, "users")
+    assert names(db, "friend_graph_changes") == {"at_1"}
+    assert diff(db, ["users"], validators=False)["users"]["missing"] == []
+    assert apply_indexes(db, ["users"]) == {}
+
+
+def test_constraints_only_builds_unique_and_ttl_indexes(db):
+    created = apply_indexes(db, ["users", "video_likes", "friend_graph_changes"], constraints_only=True)
+    assert "users" not in created
+    assert created == {"video_likes": ["video_id_1_user_id_1"], "friend_graph_changes": ["at_1"]}
+
+
+def test_indexes_match_by_keys_and_options(db):
+    db.users.create_index("email", name="legacy_email")  # same keys, old name: still counts
+    db.users.create_index("mobile", unique=True)  # same keys, different options
+    db.users.create_index("full_name")  # undeclared
+    entry = diff(db, ["users"], validators=False)["users"]
+    assert "email_1" not in entry["missing"]
+    assert entry["conflicting"] == ["mobile_1"]
+    assert entry["extra"] == ["full_name_1"]
+
+    apply_indexes(db, ["users"])
+    assert db.users.index_information()["mobile_1"].get("unique")  # left for a deliberate drop
+
+
+@pytest.fixture
+def fake_migrations(db, monkeypatch):
+    calls = []
+    module = types.ModuleType("fake_migrations")
+    module.first = lambda db: calls.append("first") or 3
+    module.second = lambda db: calls.append("second") or {"moved": 1}
+
+    def broken(db):
+        calls.append("broken")
+        raise RuntimeError("boom")
+
+    module.broken = broken
+    monkeypatch.setitem(sys.modules, "fake_migrations", module)
+    monkeypatch.setattr(schema, "MIGRATIONS", [
+        (1, "first", "fake_migrations:first", True),
+        (2, "second", "fake_migrations:second", False),
+    ])
+    return calls
+
+
+def test_migrations_run_once_in_order(db, fake_migrations):
+    assert run_migrations(db, startup_only=True) == ["first"]
+    assert run_migrations(db) == ["second"]
+    assert run_migrations(db) == []
+    assert fake_migrations == ["first", "second"]
+    assert [m["result"] for m in db.schema_migrations.find().sort("_id", 1)] == [3, {"moved": 1}]
+
+
+def test_a_failed_migration_stops_the_run(db, fake_migrations, monkeypatch):
+    monkeypatch.setattr(schema, "MIGRATIONS", [
+        (1, "broken", "fake_migrations:broken", False),
+        (2, "second", "fake_migrations:second", False),
+    ])
+    with pytest.raises(RuntimeError):
+        run_migrations(db)
+    assert fake_migrations == ["broken"]
+    assert schema.applied_migrations(db) == set()
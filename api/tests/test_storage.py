@@ -0,0 +1,59 @@
+import hashlib
+import os
+import pytest
+from services.storage import key_from_url, public_url, read_bytes, store_bytes
+
+DATA = b"hello, content-addressed world"
+DIGEST = hashlib.sha256(DATA).hexdigest()
+
+
+def upload(client, data=DATA, filename="note.txt"):
+    response = client.post("/api/upload", files={"file": (filename, data, "text/plain")})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_upload_is_keyed_by_content(client, storage):
+    assert upload(client) == {"url": f"/static/{DIGEST}.txt", "variants": {}}
+    assert read_bytes(f"{DIGEST}.txt") == DATA
+
+
+def test_identical_uploads_are_stored_once(client, storage):
+    first, second = upload(client), upload(client, filename="copy.txt")
+    assert first["url"] == second["url"]
+    assert sorted(os.listdir(storage.root)) == [f"{DIGEST}.txt"]
+
+
+def test_unsafe_extensions_are_dropped(client, storage):
+    assert upload(client, filename="../../evil.php%00.txt/")["url"] == f"/static/{DIGEST}"
+    assert upload(client, filename="archive.TAR.GZ")["url"] == f"/static/{DIGEST}.gz"
+
+
+def test_oversized_upload_is_rejected(client, storage, monkeypatch):
+    import services.storage
+    from routes import upload as upload_routes
+
+    async def small_store(file):
+        return await services.storage.store_upload(file, max_bytes=10)
+
+    monkeypatch.setattr(upload_routes, "store_upload", small_store)
+    response = client.post("/api/upload", files={"file": ("big.txt", DATA, "text/plain")})
+    assert response.status_code == 413
+    assert os.listdir(storage.root) == []  # the temp file is cleaned up
+
+
+def test_store_bytes_matches_store_upload(storage):
+    assert store_bytes(DATA, ".txt") == f"{DIGEST}.txt"
+    assert store_bytes(DATA, ".no/pe") == DIGEST
+
+
+@pytest.mark.parametrize("url, key", [
+    (public_url(f"{DIGEST}.png"), f"{DIGEST}.png"),
+    (f"https://api.example.com/static/{DIGEST}", DIGEST),
+    ("/static/../config.py", None),
+    ("/static/.hidden", None),
+    ("https://res.cloudinary.com/demo/image/upload/x.png", None),
+    (None, None),
+])
+def test_key_from_url(url, key):
+    assert key_from_url(url) == key
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from services.suggestions import (CHANGE_RETENTION, JOB_ID, TOP_K, compute_suggestions, record_graph_changes,
+                                  run_suggestion_job)
+
+# a - b - c - d, and a - e - c: c is a's friend-of-friend through both b and e
+USERS = {name: str(ObjectId()) for name in "abcde"}
+
+
+def befriend(db, x, y, at=None):
+    at = at or datetime.utcnow()
+    db.friends.insert_one({"sender_id": USERS[x], "receiver_id": USERS[y], "status": "accepted",
+                           "created_at": at, "updated_at": at})
+
+
+@pytest.fixture
+def graph(db):
+    db.users.insert_many([{"_id": ObjectId(uid), "email": f"{name}@example.com", "full_name": name.upper()}
+                          for name, uid in USERS.items()])
+    for x, y in ("ab", "bc", "cd", "ae", "ec"):
+        befriend(db, x, y, datetime.utcnow() - timedelta(days=1))
+    run_suggestion_job(db, full=True)
+    return db
+
+
+def suggested(db, name):
+    doc = db.friend_suggestions.find_one({"_id": USERS[name]}) or {}
+    return [(s["full_name"], s["mutual_count"]) for s in doc.get("suggestions", [])]
+
+
+def test_compute_suggestions_ranks_by_mutual_friends():
+    adjacency = {"a": ["b", "e"], "b": ["a", "c"], "e": ["a", "c", "f"], "c": ["b", "e"], "f": ["e"]}
+    assert compute_suggestions(adjacency, "a") == [("c", 2), ("f", 1)]
+    assert compute_suggestions(adjacency, "a", exclude={"c"}) == [("f", 1)]
+    assert compute_suggestions(adjacency, "a", k=1) == [("c", 2)]
+
+
+def test_full_run(graph):
+    assert suggested(graph, "a") == [("C", 2)]
+    assert suggested(graph, "d") == [("B", 1), ("E", 1)]
+
+
+def test_incremental_run_only_recomputes_changed_users(graph):
+    befriend(graph, "d", "a")
+    result = run_suggestion_job(graph)
+    assert result["processed"] == 5 and not result["full"]
+    assert suggested(graph, "b") == [("D", 2), ("E", 2)]
+    assert run_suggestion_job(graph)["processed"] == 0
+
+
+def test_pending_request_marks_both_users(graph, client):
+    response = client.post(f"/api/friends/request?from_user_id={USERS['a']}&to_user_id={USERS['c']}")
+    assert response.status_code == 200
+    assert run_suggestion_job(graph)["processed"] == 2
+    assert suggested(graph, "a") == []
+    assert suggested(graph, "c") == []
+
+
+def test_rejected_request_marks_both_users(graph, client):
+    client.post(f"/api/friends/request?from_user_id={USERS['a']}&to_user_id={USERS['c']}")
+    run_suggestion_job(graph)
+    request_id = str(graph.friends.find_one({"status": "pending"})["_id"])
+    assert client.post(f"/api/friends/respond?request_id={request_id}&action=reject").status_code == 200
+    assert run_suggestion_job(graph)["processed"] == 2
+    assert suggested(graph, "a") == [("C", 2)]
+
+
+def test_removed_friendship_marks_both_sides_and_their_friends(graph):
+    graph.friends.delete_one({"sender_id": USERS["c"], "receiver_id": USERS["d"]})
+    record_graph_changes(graph, [(USERS["c"], USERS["d"])], removed=True)
+    assert run_suggestion_job(graph)["processed"] == 4  # c, d and c's remaining friends b and e
+    assert suggested(graph, "b") == [("E", 2)]
+    assert suggested(graph, "d") == []
+
+
+def test_stale_state_falls_back_to_a_full_run(graph):
+    graph.job_state.update_one({"_id": JOB_ID}, {"$set": {
+        "last_run_at": datetime.utcnow() - CHANGE_RETENTION - timedelta(hours=1)}})
+    assert run_suggestion_job(graph)["full"]
+
+
+@pytest.mark.parametrize("limit, status", [(1, 200), (TOP_K, 200), (0, 422), (-1, 422), (TOP_K + 1, 422)])
+def test_suggestions_limit_is_bounded(graph, client, limit, status):
+    response = client.get(f"/api/friends/suggestions?user_id={USERS['a']}&limit={limit}")
+    assert response.status_code == status
@@ -0,0 +1,71 @@
+import cloudinary
+import cloudinary.utils
+import pytest
+from routes import upload
+from services.video_upload import is_upload_url
+
+CLOUD = "mindrise-test"
+SECRET = "test-secret"
+PUBLIC_ID = "MindRise_Videos/abc123"
+VERSION = 1712345678
+URL = f"https://res.cloudinary.com/{CLOUD}/video/upload/v{VERSION}/{PUBLIC_ID}.mp4"
+
+
+@pytest.fixture
+def cloud(monkeypatch):
+    monkeypatch.setattr(upload, "CLOUDINARY_CLOUD_NAME", CLOUD)
+    monkeypatch.setattr(upload, "CLOUDINARY_API_KEY", "key")
+    monkeypatch.setattr(upload, "CLOUDINARY_API_SECRET", SECRET)
+    monkeypatch.setattr(upload, "process_video_media", lambda *args: None)
+    previous = cloudinary.config().api_secret
+    yield
+    cloudinary.config(api_secret=previous)
+
+
+def signed(public_id=PUBLIC_ID, version=VERSION) -> str:
+    return cloudinary.utils.api_sign_request({"public_id": public_id, "version": version}, SECRET,
+                                             signature_version=1)
+
+
+def register(client, **payload):
+    return client.post("/api/upload-video/register", json={"user_id": "u1", "video_url": URL, **payload})
+
+
+def test_signed_upload_is_registered(client, db, cloud):
+    response = register(client, public_id=PUBLIC_ID, version=VERSION, signature=signed())
+    assert response.status_code == 200, response.text
+    video = db.user_videos.find_one()
+    assert (video["video_url"], video["status"]) == (URL, "pending")
+    assert str(video["_id"]) == response.json()["videoId"]
+
+
+@pytest.mark.parametrize("video_url", [
+    f"https://res.cloudinary.com/{CLOUD}/video/upload/v{VERSION}/MindRise_Videos/other.mp4",
+    f"https://res.cloudinary.com/{CLOUD}/video/upload/v1/{PUBLIC_ID}.mp4",
+    f"https://res.cloudinary.com/another-cloud/video/upload/v{VERSION}/{PUBLIC_ID}.mp4",
+    f"https://evil.example.com/{CLOUD}/video/upload/v{VERSION}/{PUBLIC_ID}.mp4",
+    "https://evil.example.com/video.mp4",
+])
+def test_signature_only_vouches_for_its_own_upload(client, db, cloud, video_url):
+    response = register(client, video_url=video_url, public_id=PUBLIC_ID, version=VERSION, signature=signed())
+    assert response.status_code == 400
+    assert db.user_videos.count_documents({}) == 0
+
+
+def test_bad_signature_is_rejected(client, db, cloud):
+    response = register(client, public_id=PUBLIC_ID, version=VERSION, signature=signed(version=VERSION + 1))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid upload signature"
+
+
+def test_unsigned_url_must_be_in_our_cloud(client, db, cloud):
+    assert register(client, video_url="https://evil.example.com/video.mp4").status_code == 400
+    assert register(client).status_code == 200
+
+
+def test_is_upload_url():
+    assert is_upload_url(URL, CLOUD, PUBLIC_ID, VERSION)
+    assert is_upload_url(URL[:-len(".mp4")], CLOUD, PUBLIC_ID, VERSION)
+    assert not is_upload_url(URL + "?x=1", CLOUD, PUBLIC_ID, VERSION)
+    assert not is_upload_url(URL.replace("https", "http"), CLOUD, PUBLIC_ID, VERSION)
+    assert not is_upload_url(f"{URL[:-4]}.mp4/extra.mp4", CLOUD, PUBLIC_ID, VERSION)
@@ -0,0 +1,78 @@
+from datetime import datetime
+import pytest
+from bson import ObjectId
+import migrate_video_fields
+from services.video_repository import VIDEO_VALIDATOR, VideoRepository
+
+
+@pytest.fixture
+def db_commands(db, monkeypatch):
+    """Record the validator commands mongomock can't run."""
+    calls = []
+    monkeypatch.setattr(db, "command", lambda *args, **kwargs: calls.append((args, kwargs)), raising=False)
+    monkeypatch.setattr(db, "create_collection", lambda *args, **kwargs: calls.append((args, kwargs)), raising=False)
+    return calls
+
+
+def legacy_videos(db) -> list[ObjectId]:
+    return db.user_videos.insert_many([
+        {"user_id": "u1", "video_url": "https://cdn.example.com/1.mp4", "status": "Approved",
+         "created_at": "2024-03-01T10:00:00Z", "view_count": 40, "like_count": 4},
+        {"user_id": "u1", "video_url": "https://cdn.example.com/2.mp4", "status": "PENDING"},
+        {"user_id": "u2", "video_url": "https://cdn.example.com/3.mp4", "status": "bogus",
+         "created_at": "not a date", "rank_score": 1.5},
+        {"user_id": "u2", "video_url": "https://cdn.example.com/4.mp4", "status": "approved",
+         "created_at": datetime(2024, 3, 2), "rank_score": 2.0},
+    ]).inserted_ids
+
+
+def test_video_fields_migration(db, db_commands):
+    ids = legacy_videos(db)
+    assert migrate_video_fields.migrate(db, batch_size=2) == 3
+
+    docs = {d["_id"]: d for d in db.user_videos.find()}
+    assert [docs[i]["status"] for i in ids] == ["approved", "pending", "pending", "approved"]
+    assert all(isinstance(d["created_at"], datetime) for d in docs.values())
+    assert docs[ids[0]]["created_at"] == datetime(2024, 3, 1, 10, 0)
+    # Missing or unparseable dates fall back to the ObjectId's insert time
+    assert docs[ids[1]]["created_at"] == ids[1].generation_time.replace(tzinfo=None)
+    assert docs[ids[2]]["created_at"] == ids[2].generation_time.replace(tzinfo=None)
+    # rank_score is backfilled where missing and left alone otherwise
+    assert docs[ids[0]]["rank_score"] > 0
+    assert "rank_score" in docs[ids[1]]
+    assert docs[ids[2]]["rank_score"] == 1.5
+
+    assert db_commands == [(("collMod", "user_videos"), {"validator": VIDEO_VALIDATOR, "validationLevel": "moderate"})]
+    assert db.job_state.find_one({"_id": migrate_video_fields.JOB_ID})["completed"]
+    assert migrate_video_fields.migrate(db) == 0
+
+
+def test_video_fields_migration_resumes_after_checkpoint(db, db_commands):
+    ids = legacy_videos(db)
+    db.job_state.insert_one({"_id": migrate_video_fields.JOB_ID, "last_id": ids[1]})
+    assert migrate_video_fields.migrate(db) == 1
+    assert db.user_videos.find_one({"_id": ids[0]})["status"] == "Approved"
+    assert db.user_videos.find_one({"_id": ids[2]})["status"] == "pending"
+
+
+def test_video_fields_dry_run_writes_nothing(db, db_commands):
+    legacy_videos(db)
+    before = list(db.user_videos.find())
+    assert migrate_video_fields.migrate(db, dry_run=True) == 3
+    assert list(db.user_videos.find()) == before
+    assert db.job_state.count_documents({}) == 0
+    assert db_commands == []
+
+
+def test_validator_on_missing_collection_is_created(db, db_commands):
+    migrate_video_fields.migrate(db)
+    assert db_commands == [(("user_videos",), {"validator": VIDEO_VALIDATOR, "validationLevel": "moderate"})]
+
+
+def test_reads_match_legacy_statuses_until_migrated(db, db_commands):
+    legacy_videos(db)
+    repo = VideoRepository(db)
+    assert {v["video_url"] for v in repo.latest(10)} == {"https://cdn.example.com/1.mp4",
+                                                         "https://cdn.example.com/4.mp4"}
+    assert repo.count("pending") == 1
+    assert [v["status"] for v in repo.hydrate(repo.by_user("u1"))] == ["approved", "pending"]
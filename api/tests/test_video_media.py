@@ -0,0 +1,72 @@
+import json
+import subprocess
+from services import video_media
+from services.storage import store_bytes
+from services.video_media import cloudinary_media, media_source, parse_cloudinary_video, probe, process_video_media
+
+CLOUD_URL = "https://res.cloudinary.com/demo/video/upload/q_auto,f_auto/v1700000000/clips/walk.mp4"
+
+
+def test_parse_cloudinary_video_strips_transformations_and_version():
+    assert parse_cloudinary_video(CLOUD_URL) == ("https://res.cloudinary.com/demo/video/upload/", "clips/walk")
+    assert parse_cloudinary_video("https://example.com/video/upload/v1/x.mp4") is None
+
+
+def test_cloudinary_media_uses_the_upload_result():
+    media = cloudinary_media(CLOUD_URL, {"duration": "12.3456", "width": 1280, "height": 720})
+    assert media["poster_url"].endswith("/so_auto,w_640,c_limit,q_auto/clips/walk.jpg")
+    assert "du_6" in media["preview_url"] and media["preview_url"].endswith("/clips/walk.mp4")
+    assert (media["duration"], media["width"], media["height"]) == (12.346, 1280, 720)
+
+
+def test_media_source_reads_stored_files_from_disk(storage):
+    key = store_bytes(b"\x00\x00\x00\x18ftypmp42", ".mp4")
+    with media_source(f"/static/{key}") as resolved:
+        path, protocols = resolved
+        assert protocols == "file" and path.endswith(key)
+    with media_source("/static/" + "0" * 64 + ".mp4") as resolved:
+        assert resolved is None
+
+
+def test_media_source_only_fetches_allowed_https_hosts(storage, monkeypatch):
+    monkeypatch.setattr(video_media, "MEDIA_FETCH_HOSTS", {"media.example.com"})
+    with media_source("https://media.example.com/a.mp4") as resolved:
+        assert resolved == ("https://media.example.com/a.mp4", "https,tls,tcp")
+    for url in ("http://media.example.com/a.mp4", "https://evil.example.com/a.mp4",
+                "file:///etc/passwd", "concat:/etc/passwd", None):
+        with media_source(url) as resolved:
+            assert resolved is None, url
+
+
+def test_probe_restricts_protocols_and_parses_output(monkeypatch):
+    calls = []
+
+    def fake_run(args, **kwargs):
+        calls.append(args)
+        out = {"streams": [{"width": 640, "height": 360}], "format": {"duration": "4.5"}}
+        return subprocess.CompletedProcess(args, 0, stdout=json.dumps(out).encode())
+
+    monkeypatch.setattr(video_media.shutil, "which", lambda name: f"/usr/bin/{name}")
+    monkeypatch.setattr(video_media.subprocess, "run", fake_run)
+    assert probe("/data/a.mp4", "file") == {"duration": 4.5, "width": 640, "height": 360}
+    [args] = calls
+    assert args[args.index("-protocol_whitelist") + 1] == "file"
+    assert args[-2:] == ["-i", "/data/a.mp4"]
+
+
+def test_probe_failure_yields_no_fields(monkeypatch):
+    def failing_run(args, **kwargs):
+        raise subprocess.TimeoutExpired(args, video_media.PROBE_TIMEOUT)
+
+    monkeypatch.setattr(video_media.shutil, "which", lambda name: f"/usr/bin/{name}")
+    monkeypatch.setattr(video_media.subprocess, "run", failing_run)
+    assert probe("/data/a.mp4") == {}
+
+
+def test_process_video_media_stores_fields(db):
+    video_id = db.user_videos.insert_one({"user_id": "u", "video_url": CLOUD_URL}).inserted_id
+    process_video_media(str(video_id), {"duration": 3, "width": 320, "height": 240})
+    video = db.user_videos.find_one({"_id": video_id})
+    assert video["duration"] == 3.0 and video["width"] == 320
+    assert video["poster_url"].endswith("clips/walk.jpg")
+    assert video["media_processed_at"] is not None
@@ -3,6 +3,7 @@ import { useNavigate } from "react-router-dom";
 import { Heart, MessageCircle, Send, Trash2, AlertCircle } from "lucide-react";
 import { Post, Comment } from "../types";
 import VideoPlayer from "./VideoPlayer";
+import ResponsiveImage, { resolveMediaUrl } from "./ResponsiveImage";
 
 interface PostCardProps {
     post: Post;
@@ -63,7 +64,7 @@ export default function PostCard({ post, currentUserId, activeVideoId, onLikeTog
                         onClick={() => navigate(`/profile/${post.user_id}`)}
                     >
                         {post.author_profile_pic ? (
-                            <img src={post.author_profile_pic} alt={post.author_name} className="w-full h-full object-cover" />
+                            <img src={resolveMediaUrl(post.author_profile_pic_thumb || post.author_profile_pic)} alt={post.author_name} className="w-full h-full object-cover" loading="lazy" />
                         ) : (
                             <div className="w-full h-full flex items-center justify-center text-emerald-900 bg-emerald-50 font-premium text-xl">
                                 {post.author_name?.charAt(0) || "B"}
@@ -114,7 +115,7 @@ export default function PostCard({ post, currentUserId, activeVideoId, onLikeTog
                 <div className="w-full rounded-2xl overflow-hidden shadow-sm mb-4 border border-slate-100/50">
                     {post.image_url && (
                         <div className="w-full aspect-[4/3] bg-slate-50">
-                            <img src={post.image_url} alt="Post content" className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105" />
+                            <ResponsiveImage src={post.image_url} variants={post.image_variants} size="card" alt="Post content" className="w-full h-full object-cover transition-transform duration-700 group-hover:scale-105" />
                         </div>
                     )}
                     {post.video_url && (
@@ -0,0 +1,26 @@
+interface ResponsiveImageProps {
+    src: string;
+    variants?: Record<string, string>;
+    size: "avatar" | "thumb" | "card";
+    alt?: string;
+    className?: string;
+}
+
+const apiBase = import.meta.env.VITE_API_BASE_URL || (import.meta.env.DEV ? "http://localhost:8000/api" : "/api");
+const BASE_URL = apiBase.endsWith("/api") ? apiBase.slice(0, -4) : apiBase;
+
+// Derivatives from the API are "/static/<key>" paths served by the backend.
+export const resolveMediaUrl = (url: string) => (url.startsWith("/static") ? `${BASE_URL}${url}` : url);
+
+/** Renders the AVIF/WebP derivative of `size` when the API has one, falling back to the original. */
+export default function ResponsiveImage({ src, variants = {}, size, alt = "", className }: ResponsiveImageProps) {
+    const avif = variants[`${size}_avif`];
+    const webp = variants[`${size}_webp`];
+    return (
+        <picture>
+            {avif && <source srcSet={resolveMediaUrl(avif)} type="image/avif" />}
+            {webp && <source srcSet={resolveMediaUrl(webp)} type="image/webp" />}
+            <img src={resolveMediaUrl(src)} alt={alt} className={className} loading="lazy" decoding="async" />
+        </picture>
+    );
+}
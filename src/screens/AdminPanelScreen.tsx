@@ -28,41 +28,89 @@ export default function AdminPanelScreen() {
   const [searchTerm, setSearchTerm] = useState("");
   const [activeVideoId, setActiveVideoId] = useState<string | null>(null);
   const [showLogs, setShowLogs] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchData();
   }, [user, activeTab, historyFilter, searchTerm]);
 
+  // Moderation tabs page through /admin/queue and the users tab through
+  // /admin/users; the other tabs load in one request
+  function queueRequest(): { kind: "posts" | "videos"; status: string } | null {
+    if (activeTab === "pending") return { kind: "posts", status: "pending" };
+    if (activeTab === "flagged") return { kind: "posts", status: "flagged" };
+    if (activeTab === "videos") return { kind: "videos", status: "pending" };
+    if (activeTab === "history") return { kind: "posts", status: historyFilter === "all" ? "approved,rejected" : historyFilter };
+    return null;
+  }
+
+  async function fetchQueuePage(cursor: string | null) {
+    const request = queueRequest();
+    if (!request || !user) return null;
+    const searchParam = searchTerm ? `&search_user=${encodeURIComponent(searchTerm)}` : "";
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+    const res = await fetch(`${API_BASE}/admin/queue/${request.kind}?status=${request.status}&role=${user.role}${searchParam}${cursorParam}`);
+    if (!res.ok) return null;
+    const page: { items: any[]; next_cursor: string | null } = await res.json();
+    return { kind: request.kind, ...page };
+  }
+
+  async function fetchUsersPage(cursor: string | null) {
+    if (!user) return null;
+    const searchParam = searchTerm ? `&search_user=${encodeURIComponent(searchTerm)}` : "";
+    const cursorParam = cursor ? `&cursor=${encodeURIComponent(cursor)}` : "";
+    const res = await fetch(`${API_BASE}/admin/users?role=${user.role}${searchParam}${cursorParam}`);
+    if (!res.ok) return null;
+    const page: { items: User[]; next_cursor: string | null } = await res.json();
+    return page;
+  }
+
+  async function loadMore() {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      if (activeTab === "users") {
+        const page = await fetchUsersPage(nextCursor);
+        if (page) {
+          setUsers(prev => [...prev, ...page.items]);
+          setNextCursor(page.next_cursor);
+        }
+        return;
+      }
+      const page = await fetchQueuePage(nextCursor);
+      if (page) {
+        if (page.kind === "videos") setVideos(prev => [...prev, ...page.items]);
+        else setPosts(prev => [...prev, ...page.items]);
+        setNextCursor(page.next_cursor);
+      }
+    } catch (err) {
+      console.error("Failed to load more:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   async function fetchData() {
     if (!user) return;
     setLoading(true);
+    setNextCursor(null);
     try {
       const statsRes = await fetch(`${API_BASE}/admin/stats?role=${user.role}`);
       if (statsRes.ok) setStats(await statsRes.json());
 
-      const searchParam = searchTerm ? `&search_user=${encodeURIComponent(searchTerm)}` : "";
-
       if (activeTab === "users") {
-        const usersRes = await fetch(`${API_BASE}/admin/users?role=${user.role}${searchParam}`);
-        if (usersRes.ok) setUsers(await usersRes.json());
-      } else if (activeTab === "pending") {
-        const postsRes = await fetch(`${API_BASE}/admin/posts?status=pending&role=${user.role}${searchParam}`);
-        if (postsRes.ok) setPosts(await postsRes.json());
-      } else if (activeTab === "flagged") {
-        const postsRes = await fetch(`${API_BASE}/admin/posts?status=flagged&role=${user.role}${searchParam}`);
-        if (postsRes.ok) setPosts(await postsRes.json());
-      } else if (activeTab === "videos") {
-        const videosRes = await fetch(`${API_BASE}/admin/videos?status=pending&role=${user.role}${searchParam}`);
-        if (videosRes.ok) setVideos(await videosRes.json());
-      } else if (activeTab === "history") {
-        const statusParam = historyFilter === "all" ? "all" : historyFilter;
-        const postsRes = await fetch(`${API_BASE}/admin/posts?status=${statusParam}&role=${user.role}${searchParam}`);
-        if (postsRes.ok) {
-          let data = await postsRes.json();
-          if (historyFilter === "all" && !searchTerm) {
-            data = data.filter((p: Post) => p.status !== "pending" && p.status !== "flagged");
-          }
-          setPosts(data);
+        const page = await fetchUsersPage(null);
+        if (page) {
+          setUsers(page.items);
+          setNextCursor(page.next_cursor);
+        }
+      } else if (queueRequest()) {
+        const page = await fetchQueuePage(null);
+        if (page) {
+          if (page.kind === "videos") setVideos(page.items);
+          else setPosts(page.items);
+          setNextCursor(page.next_cursor);
         }
       } else if (activeTab === "sessions") {
         const res = await fetch(`${API_BASE}/sessions/rooms?status=live`);
@@ -390,6 +438,15 @@ export default function AdminPanelScreen() {
               ))}
             </div>
           )}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="w-full py-3 text-sm font-bold text-slate-600 border-t border-slate-100 hover:bg-slate-50 transition disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       ) : activeTab === "videos" ? (
         <div className="space-y-4">
@@ -434,6 +491,15 @@ export default function AdminPanelScreen() {
               </div>
             ))
           )}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="w-full py-3 rounded-xl text-sm font-bold text-slate-600 bg-white border border-slate-200 hover:bg-slate-50 transition disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       ) : activeTab === "sessions" ? (
         <div className="space-y-4">
@@ -695,6 +761,15 @@ export default function AdminPanelScreen() {
               </div>
             ))
           )}
+          {nextCursor && (
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="w-full py-3 rounded-xl text-sm font-bold text-slate-600 bg-white border border-slate-200 hover:bg-slate-50 transition disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          )}
         </div>
       )}
     </div>
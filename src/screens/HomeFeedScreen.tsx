@@ -114,7 +114,8 @@ export default function HomeFeedScreen() {
     queryFn: async () => {
       const res = await fetch(`${API_BASE}/friends/notifications?user_id=${user?.id}`);
       if (!res.ok) throw new Error("Failed to fetch notifications");
-      return res.json() as Promise<AppNotification[]>;
+      const page = await res.json() as { items: AppNotification[]; next_cursor: string | null };
+      return page.items;
     },
     enabled: !!user,
     refetchInterval: 30000
@@ -276,6 +277,7 @@ export default function HomeFeedScreen() {
     if (!pendingItem || pendingItem.status !== 'pending') return;
 
     const itemId = pendingItem.id;
+    const itemType = pendingItem.type;
     let pollCounter = 0;
 
     const mainInterval = setInterval(async () => {
@@ -291,8 +293,9 @@ export default function HomeFeedScreen() {
       if (pollCounter >= 6) {
         pollCounter = 0;
         try {
-          // Both videos and posts are now registered in the posts collections
-          const endpoint = `${API_BASE}/posts/${itemId}/status`;
+          const endpoint = itemType === 'video'
+            ? `${API_BASE}/videos/${itemId}/status`
+            : `${API_BASE}/posts/${itemId}/status`;
 
           const res = await fetch(endpoint);
           if (res.ok) {
@@ -360,15 +363,18 @@ export default function HomeFeedScreen() {
         // VIDEO UPLOAD FLOW
         console.log("Starting video upload process...");
 
-        // 1. Get cloud name from backend (safest way to get the config)
+        // 1. Get a signed upload config from the backend
         const configRes = await fetch(`${API_BASE}/upload/signature`);
-        const { cloud_name } = await configRes.json();
+        if (!configRes.ok) throw new Error("Could not get upload signature");
+        const { cloud_name, api_key, timestamp, signature, folder } = await configRes.json();
 
-        // 2. Upload directly to Cloudinary (Unsigned)
+        // 2. Upload directly to Cloudinary (Signed) - the file never passes through our API
         const cloudFormData = new FormData();
         cloudFormData.append("file", selectedFile);
-        cloudFormData.append("upload_preset", "mind_rise_unsigned"); // Updated to match user config
-        cloudFormData.append("resource_type", "video");
+        cloudFormData.append("api_key", api_key);
+        cloudFormData.append("timestamp", String(timestamp));
+        cloudFormData.append("signature", signature);
+        cloudFormData.append("folder", folder);
 
         const cloudinaryUrl = `https://api.cloudinary.com/v1_1/${cloud_name || 'mindrise'}/video/upload`;
         const cloudRes = await fetch(cloudinaryUrl, {
@@ -382,28 +388,27 @@ export default function HomeFeedScreen() {
         }
 
         const cloudData = await cloudRes.json();
-        const videoUrl = cloudData.secure_url;
 
-        // 3. Register as a post with our backend
-        const queryParams = new URLSearchParams({
-          user_id: user?.id || "",
-          author_name: user?.full_name || user?.email || "Bodham User"
-        }).toString();
-
-        const response = await fetch(`${API_BASE}/posts/?${queryParams}`, {
+        // 3. Register the video; the backend checks Cloudinary's response signature
+        const response = await fetch(`${API_BASE}/upload-video/register`, {
           method: "POST",
           headers: { "Content-Type": "application/json" },
           body: JSON.stringify({
-            content: postContent,
-            video_url: videoUrl
+            video_url: cloudData.secure_url,
+            public_id: cloudData.public_id,
+            version: cloudData.version,
+            signature: cloudData.signature,
+            user_id: user?.id || "",
+            author_name: user?.full_name || user?.email || "Bodham User",
+            caption: postContent
           }),
         });
 
         if (!response.ok) throw new Error("Failed to submit video post");
 
-        const postData = await response.json();
+        const { videoId } = await response.json();
         setPendingItem({
-          id: postData.id,
+          id: videoId,
           type: 'video',
           status: 'pending',
           progress: 30
@@ -23,6 +23,7 @@ import { motion, AnimatePresence } from "framer-motion";
 import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import GrowthTree from "../components/GrowthTree";
 import PostCard from "../components/PostCard";
+import ResponsiveImage from "../components/ResponsiveImage";
 import ProfileSkeleton from "../components/ProfileSkeleton";
 
 const API_BASE = (import.meta.env.VITE_API_BASE_URL || (import.meta.env.DEV ? "http://localhost:8000/api" : "/api")).startsWith("http")
@@ -655,7 +656,7 @@ export default function ProfileScreen() {
                       onClick={() => setSelectedPost(post)}
                     >
                       {post.image_url ? (
-                        <img src={post.image_url} alt="" className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500" />
+                        <ResponsiveImage src={post.image_url} variants={post.image_variants} size="thumb" className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-500" />
                       ) : post.video_url ? (
                         <div className="w-full h-full relative">
                           <video src={post.video_url} className="w-full h-full object-cover" />
@@ -914,7 +915,7 @@ export default function ProfileScreen() {
               {/* Media Section */}
               <div className="md:w-3/5 bg-slate-900 flex items-center justify-center relative min-h-[300px]">
                 {selectedPost.image_url ? (
-                  <img src={selectedPost.image_url} alt="" className="max-w-full max-h-full object-contain" />
+                  <ResponsiveImage src={selectedPost.image_url} variants={selectedPost.image_variants} size="card" className="max-w-full max-h-full object-contain" />
                 ) : selectedPost.video_url ? (
                   <video src={selectedPost.video_url} controls autoPlay className="max-w-full max-h-full" />
                 ) : (
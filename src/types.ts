@@ -78,6 +78,7 @@ export interface Post {
     author_email?: string;
     content: string;
     image_url?: string;
+    image_variants?: Record<string, string>; // e.g. {"thumb_webp": url}
     video_url?: string;
     status: "pending" | "approved" | "rejected" | "flagged";
     created_at: string;
@@ -94,6 +95,7 @@ export interface Post {
         details?: string[];
     }[];
     author_profile_pic?: string | null;
+    author_profile_pic_thumb?: string | null;
     likes_count: number;
     comments_count: number;
     is_liked_by_me: boolean;
@@ -23,7 +23,7 @@ def test_admin_stats():
         response = requests.get(f"{API_BASE}/admin/users", params={"role": role})
         print(f"Status Code: {response.status_code}")
         # Print first 2 users to avoid spam
-        users = response.json()
+        users = response.json()["items"]
         print(f"User Count: {len(users)}")
         if users:
             print(f"First User: {users[0]}")
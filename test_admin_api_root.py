@@ -25,7 +25,7 @@ def test_admin_stats():
         print(f"Status Code: {response.status_code}")
         # Print first 2 users to avoid spam
         try:
-            users = response.json()
+            users = response.json()["items"]
             print(f"User Count: {len(users)}")
             if users:
                 print(f"First User: {users[0]}")